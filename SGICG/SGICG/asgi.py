@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'SGICG.settings')
+os.environ.setdefault('SGICG_ASGI', '1')  # Ajusta las conexiones a la base de datos (ver settings)
 
 application = get_asgi_application()
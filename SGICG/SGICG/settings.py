@@ -1,5 +1,6 @@
 # SGICG/settings.py
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,12 +51,100 @@ TEMPLATES = [
 WSGI_APPLICATION = 'SGICG.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SGICG_DB_MOTOR=postgresql activa PostgreSQL (varias estaciones de trabajo);
+# por defecto se usa el archivo SQLite local.
+DB_MOTOR = os.environ.get('SGICG_DB_MOTOR', 'sqlite').lower()
+
+if DB_MOTOR in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('SGICG_DB_NOMBRE', 'sgicg'),
+            'USER': os.environ.get('SGICG_DB_USUARIO', 'sgicg'),
+            'PASSWORD': os.environ.get('SGICG_DB_CLAVE', ''),
+            'HOST': os.environ.get('SGICG_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('SGICG_DB_PUERTO', '5432'),
+            'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        },
+        # Base SQLite anterior: origen de 'manage.py migrar_sqlite_a_postgres'
+        'sqlite': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SGICG_SQLITE_ORIGEN', BASE_DIR / 'db.sqlite3'),
+        },
+    }
+
+    # SGICG_DB_POOL: 'psycopg' (pool en proceso, requiere psycopg[pool]),
+    # 'pgbouncer' (pool externo en modo transacción) o 'ninguno'
+    DB_POOL = os.environ.get('SGICG_DB_POOL', 'psycopg').lower()
+    if DB_POOL == 'psycopg':
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('SGICG_DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('SGICG_DB_POOL_MAX', 10)),
+            'timeout': 10,
+        }
+    elif DB_POOL == 'pgbouncer':
+        # Los cursores del lado del servidor no sobreviven entre transacciones en pgbouncer
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = 600
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': 600,  # Reutilizar conexiones entre peticiones
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
+
+# Bajo ASGI (SGICG/asgi.py) cada petición usa su propio hilo para el ORM y las
+# conexiones persistentes quedarían abiertas por hilo: se cierran al terminar la
+# petición. El pool de psycopg sí es compatible con ASGI.
+ASGI = os.environ.get('SGICG_ASGI') == '1'
+if ASGI and 'pool' not in DATABASES['default'].get('OPTIONS', {}):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Perfil de producción de SQLite: PRAGMAs aplicados al abrir cada conexión
+# (ver certificacion/base_datos.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',          # Lectores no bloquean al escritor
+    'synchronous': 'NORMAL',        # Seguro con WAL, sin fsync en cada commit
+    'busy_timeout': 20000,          # ms de espera por el bloqueo antes de fallar
+    'cache_size': -65536,           # 64 MB (valor negativo = KiB)
+    'mmap_size': 268435456,         # 256 MB
+    'temp_store': 'MEMORY',
 }
+# avanzar_etapa y asignar_excel abren sus transacciones con BEGIN IMMEDIATE
+SQLITE_ESCRITURA_INMEDIATA = True
+
+# Cache en dos niveles (ver certificacion/cache_niveles.py):
+# 'local' es el L1 en memoria de cada worker, 'default' el L2 compartido entre workers.
+# Con SGICG_REDIS_URL se usa Redis como L2; si no, archivos en disco.
+if os.environ.get('SGICG_REDIS_URL'):
+    CACHE_COMPARTIDA = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['SGICG_REDIS_URL'],
+    }
+else:
+    CACHE_COMPARTIDA = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('SGICG_CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+
+CACHES = {
+    'default': dict(CACHE_COMPARTIDA, TIMEOUT=3600, KEY_PREFIX='sgicg'),
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sgicg-l1',
+        'TIMEOUT': 30,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+CACHE_L1_TIMEOUT = 30       # Segundos que un valor vive en el L1 de cada worker
+CACHE_VERSION_TIMEOUT = 2   # Segundos máximos que un worker tarda en ver una invalidación
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -81,6 +170,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # 1. Archivos Estáticos (CSS, JS) y Plantillas Excel
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# collectstatic copia aquí los estáticos con hash en el nombre y sus variantes .gz/.br
+# (certificacion/estaticos.py); las librerías de terceros se descargan con vendorizar_estaticos
+STATIC_ROOT = os.environ.get('SGICG_STATIC_ROOT', BASE_DIR / 'staticfiles')
 PLANTILLAS_ROOT = BASE_DIR / 'plantillas'
 
 # 2. Archivos de Usuario (Excels, QRs, Fotos)
@@ -89,6 +181,30 @@ MEDIA_URL = '/media/'
 # RUTA FÍSICA: La ubicación REAL en tu disco duro donde se guardarán las carpetas.
 MEDIA_ROOT = r'C:\Users\Usuario\Desktop\ordenes'
 
+# Spool local (disco rápido) para las subidas de QR y fotos: se guardan ahí y se
+# replican a MEDIA_ROOT en segundo plano (certificacion/almacenamiento.py). Las
+# copias de Excel se escriben directo en MEDIA_ROOT, donde el personal las edita.
+# Sin SGICG_MEDIA_SPOOL todo se escribe directo en MEDIA_ROOT.
+MEDIA_SPOOL_ROOT = os.environ.get('SGICG_MEDIA_SPOOL') or None
+STORAGES = {
+    'default': {'BACKEND': 'certificacion.almacenamiento.AlmacenamientoSpool'},
+    'staticfiles': {'BACKEND': 'certificacion.estaticos.EstaticosComprimidos'},
+}
+
+# Entrega de medios por la vista protegida (certificacion/servidor_medios.py):
+# '' = FileResponse (sendfile del servidor WSGI), 'nginx' = X-Accel-Redirect hacia
+# una location internal con alias a MEDIA_ROOT, 'apache' = X-Sendfile (mod_xsendfile)
+MEDIA_SERVIDOR = os.environ.get('SGICG_MEDIA_SERVIDOR', '')
+MEDIA_ACCEL_PREFIJO = '/media-interna/'
+MEDIA_ACCEL_PREFIJO_SPOOL = None   # location internal del spool; sin ella lo sirve Django
+MEDIA_REQUIERE_LOGIN = False
+
+# URL codificada en los QR generados por el sistema ({codigo} = número de certificado)
+QR_VERIFICACION_URL = 'https://sgicg.local/verificar/{codigo}'
+
+# Días desde el cierre tras los cuales una orden FINALIZADA se archiva (archivar_ordenes)
+ARCHIVO_DIAS_FINALIZADAS = 90
+
 # ¡HEMOS ELIMINADO MEDIA_ROOT_UNC y ORDENES_ROOT PORQUE NO SON NECESARIOS EN MODO LOCAL!
 
 # 3. Tiempos de Etapa
@@ -0,0 +1,312 @@
+# certificacion/almacenamiento.py
+
+import os
+import queue
+import shutil
+import threading
+import time
+import logging
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 8           # Reintentos de una réplica antes de dejarla al barrido
+ESPERA_MAXIMA = 300        # Segundos máximos entre reintentos
+TAMANO_BLOQUE_COPIA = 1024 * 1024
+
+
+def _fsync_directorio(ruta):
+    """Persiste la entrada del directorio tras un rename (no disponible en Windows)"""
+    try:
+        descriptor = os.open(ruta, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def replicar_archivo(origen, destino):
+    """
+    Copia origen a destino de forma atómica: escribe un temporal junto al
+    destino, lo sincroniza a disco y lo renombra. Conserva la fecha de
+    modificación, que las firmas de impresión y de Excel usan para detectar
+    cambios.
+    """
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(origen, 'rb') as lectura, open(temporal, 'wb') as escritura:
+            shutil.copyfileobj(lectura, escritura, TAMANO_BLOQUE_COPIA)
+            escritura.flush()
+            os.fsync(escritura.fileno())
+        shutil.copystat(origen, temporal)
+        os.replace(temporal, destino)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+    _fsync_directorio(os.path.dirname(destino))
+
+
+ANTIGUEDAD_BARRIDO = 60    # Segundos: las copias más nuevas las replica la cola
+TOLERANCIA_MTIME = 2       # Los recursos SMB/FAT guardan la fecha con resolución de 2 segundos
+MARCA_CONFLICTO = '.conflicto-'
+
+
+def _misma_version(info_origen, info_destino):
+    return (
+        info_origen.st_size == info_destino.st_size
+        and abs(info_origen.st_mtime - info_destino.st_mtime) <= TOLERANCIA_MTIME
+    )
+
+
+def replicar_pendiente(origen, destino):
+    """
+    Lleva una copia del spool al recurso compartido y la quita del spool: una
+    vez replicado, el recurso compartido es la fuente de verdad (el personal
+    edita allí los Excel).
+
+    Si el archivo del recurso compartido es más reciente que la copia del
+    spool no se sobrescribe: se registra el conflicto y la copia del spool se
+    aparta con la marca MARCA_CONFLICTO para revisarla a mano.
+
+    Returns:
+        str: 'replicado', 'al_dia' (ya estaba replicado) o 'conflicto'
+    """
+    info_origen = os.stat(origen)
+    try:
+        info_destino = os.stat(destino)
+    except FileNotFoundError:
+        info_destino = None
+
+    if info_destino is not None and _misma_version(info_origen, info_destino):
+        estado = 'al_dia'
+    elif info_destino is not None and info_destino.st_mtime > info_origen.st_mtime + TOLERANCIA_MTIME:
+        apartado = f"{origen}{MARCA_CONFLICTO}{time.strftime('%Y%m%d%H%M%S')}"
+        os.replace(origen, apartado)
+        logger.error(
+            f"Conflicto de replicación: {destino} es más reciente que la copia del spool; "
+            f"no se sobrescribe y la copia queda en {apartado}"
+        )
+        return 'conflicto'
+    else:
+        replicar_archivo(origen, destino)
+        estado = 'replicado'
+
+    try:
+        os.remove(origen)
+    except FileNotFoundError:
+        # Otra réplica (cola o barrido) ya la quitó, o se eliminó mientras se
+        # copiaba. No se borra el destino: no se distingue un caso del otro, y
+        # un archivo sobrante lo detecta conciliar_medios
+        pass
+    except OSError as e:
+        # Abierto por otro proceso (Windows): el barrido lo quitará después
+        logger.warning(f"No se pudo quitar {origen} del spool tras replicarlo: {str(e)}")
+    return estado
+
+
+class ColaReplicacion:
+    """
+    Hilo de fondo que replica los archivos del spool al recurso compartido y
+    los quita del spool (ver replicar_pendiente). Los fallos se reintentan con
+    espera exponencial; tras MAX_INTENTOS el archivo queda en el spool hasta
+    el siguiente barrido (replicar_spool).
+    """
+
+    def __init__(self):
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._pid = None
+        self._bloqueo = threading.Lock()
+
+    def _asegurar_hilo(self):
+        # Tras un fork (workers con preload) el hilo del proceso padre no existe
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            return
+        with self._bloqueo:
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._cola = queue.Queue()
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._trabajar, name='replicacion-medios', daemon=True)
+            self._hilo.start()
+
+    def encolar(self, origen, destino, intento=0):
+        self._asegurar_hilo()
+        self._cola.put((origen, destino, intento))
+
+    def pendientes(self):
+        return self._cola.unfinished_tasks
+
+    def esperar(self, timeout=None):
+        """Espera a que la cola se vacíe (pruebas y cierre ordenado)"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._cola.unfinished_tasks:
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _trabajar(self):
+        while True:
+            origen, destino, intento = self._cola.get()
+            try:
+                self._replicar(origen, destino, intento)
+            finally:
+                self._cola.task_done()
+
+    def _replicar(self, origen, destino, intento):
+        try:
+            replicar_pendiente(origen, destino)
+        except FileNotFoundError:
+            return  # Eliminado antes de replicarse
+        except OSError as e:
+            if intento + 1 >= MAX_INTENTOS:
+                logger.error(f"No se pudo replicar {origen} a {destino} tras {MAX_INTENTOS} intentos: {str(e)}")
+                return
+            espera = min(ESPERA_MAXIMA, 2 ** intento)
+            logger.warning(f"Error al replicar {origen} (intento {intento + 1}), reintento en {espera}s: {str(e)}")
+            temporizador = threading.Timer(espera, self.encolar, (origen, destino, intento + 1))
+            temporizador.daemon = True
+            temporizador.start()
+
+
+cola_replicacion = ColaReplicacion()
+
+
+class AlmacenamientoSpool(FileSystemStorage):
+    """
+    Almacenamiento de medios con spool local. MEDIA_ROOT suele ser una carpeta
+    compartida en red: las subidas (QR y fotos) van al spool en disco local y
+    se replican a MEDIA_ROOT en segundo plano, tras lo cual salen del spool.
+    Las lecturas usan la copia del spool solo mientras está pendiente de
+    replicar. Las copias de Excel, que el personal edita en el recurso
+    compartido, no pasan por el spool.
+
+    Sin MEDIA_SPOOL_ROOT se comporta como FileSystemStorage sobre MEDIA_ROOT.
+    """
+
+    def __init__(self, spool_location=None, **kwargs):
+        super().__init__(**kwargs)
+        self._spool_location = spool_location
+
+    @cached_property
+    def spool(self):
+        raiz = self._spool_location or getattr(settings, 'MEDIA_SPOOL_ROOT', None)
+        if not raiz:
+            return None
+        return FileSystemStorage(
+            location=raiz,
+            file_permissions_mode=self.file_permissions_mode,
+            directory_permissions_mode=self.directory_permissions_mode,
+        )
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'MEDIA_SPOOL_ROOT':
+            self.__dict__.pop('spool', None)
+
+    def path(self, name):
+        # exists, size y las fechas de FileSystemStorage se basan en path()
+        if self.spool is not None:
+            ruta_spool = self.spool.path(name)
+            if os.path.exists(ruta_spool):
+                return ruta_spool
+        return super().path(name)
+
+    def ruta_compartida(self, name):
+        """Ruta del archivo en MEDIA_ROOT, aunque aún esté solo en el spool"""
+        return super().path(name)
+
+    def _replicar(self, name):
+        cola_replicacion.encolar(self.spool.path(name), self.ruta_compartida(name))
+
+    def _save(self, name, content):
+        if self.spool is None:
+            return super()._save(name, content)
+        name = self.spool._save(name, content)
+        self._replicar(name)
+        return name
+
+    def guardar_copia(self, ruta_origen, name):
+        """
+        Copia un archivo local con el nombre indicado, reemplazando el que
+        hubiera (a diferencia de save, que buscaría un nombre libre). Se
+        escribe directamente en el recurso compartido: son los Excel que el
+        personal edita allí, y una copia en el spool ocultaría sus cambios.
+
+        Returns:
+            str: Nombre guardado
+        """
+        replicar_archivo(ruta_origen, self.ruta_compartida(name))
+        if self.spool is not None:
+            self.spool.delete(name)
+        return name
+
+    def delete(self, name):
+        if self.spool is not None:
+            self.spool.delete(name)
+        try:
+            os.remove(self.ruta_compartida(name))
+        except FileNotFoundError:
+            pass
+
+
+class BarridoSpool:
+    """
+    Clase para recorrer el spool y replicar lo que no llegó al recurso
+    compartido (reinicios, fallos agotados). Cada copia replicada o ya al
+    día sale del spool; las que chocan con un archivo más reciente del
+    recurso compartido se apartan (ver replicar_pendiente).
+    """
+
+    def __init__(self, almacenamiento):
+        self.almacenamiento = almacenamiento
+        self.resumen = {'revisados': 0, 'replicados': 0, 'purgados': 0, 'conflictos': 0, 'errores': []}
+
+    def ejecutar(self):
+        """
+        Returns:
+            dict: Resumen con contadores y errores
+        """
+        spool = self.almacenamiento.spool
+        if spool is None:
+            raise ValueError("MEDIA_SPOOL_ROOT no está configurado")
+
+        raiz = spool.location
+        limite = time.time() - ANTIGUEDAD_BARRIDO
+        for actual, _, archivos in os.walk(raiz):
+            for archivo in archivos:
+                if archivo.endswith('.tmp') or MARCA_CONFLICTO in archivo:
+                    continue
+                origen = os.path.join(actual, archivo)
+                nombre = os.path.relpath(origen, raiz)
+                self.resumen['revisados'] += 1
+                try:
+                    if os.stat(origen).st_mtime > limite:
+                        continue
+                    estado = replicar_pendiente(origen, self.almacenamiento.ruta_compartida(nombre))
+                except FileNotFoundError:
+                    continue  # Replicado por la cola o eliminado mientras tanto
+                except OSError as e:
+                    self.resumen['errores'].append(f"{nombre}: {str(e)}")
+                    continue
+                if estado == 'replicado':
+                    self.resumen['replicados'] += 1
+                elif estado == 'al_dia':
+                    self.resumen['purgados'] += 1
+                else:
+                    self.resumen['conflictos'] += 1
+                    self.resumen['errores'].append(f"{nombre}: conflicto, el recurso compartido es más reciente")
+        return self.resumen
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CertificacionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'certificacion'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .base_datos import aplicar_pragmas_sqlite
+
+        connection_created.connect(aplicar_pragmas_sqlite, dispatch_uid='certificacion_pragmas_sqlite')
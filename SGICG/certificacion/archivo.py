@@ -0,0 +1,163 @@
+# certificacion/archivo.py
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Orden, Item, FotoItem, DatosExcelItem,
+    OrdenArchivada, ItemArchivado, FotoItemArchivada,
+)
+
+logger = logging.getLogger(__name__)
+
+DIAS_ARCHIVO_DEFAULT = 90
+TAMANO_LOTE = 200  # Órdenes por transacción
+
+CAMPOS_ITEM_COPIADOS = [
+    'numero_item', 'tipo_certificado', 'que_es', 'codigo_referencia', 'tipo_joya',
+    'metal', 'cantidad_gemas', 'componentes_set', 'gema_principal', 'forma_gema',
+    'peso_gema', 'comentarios', 'nombre_excel', 'archivo_impresion', 'texto_para_copiar',
+]
+
+
+class ArchivadorOrdenes:
+    """Clase para mover órdenes finalizadas antiguas a las tablas de archivo"""
+
+    def __init__(self, dias=None, tamano_lote=TAMANO_LOTE, dry_run=False):
+        if dias is None:
+            dias = getattr(settings, 'ARCHIVO_DIAS_FINALIZADAS', DIAS_ARCHIVO_DEFAULT)
+        self.dias = dias
+        self.tamano_lote = tamano_lote
+        self.dry_run = dry_run
+        self.resumen = {'ordenes': 0, 'items': 0, 'fotos': 0}
+
+    def ordenes_a_archivar(self):
+        """QuerySet de órdenes finalizadas hace más de N días"""
+        limite = timezone.now() - timedelta(days=self.dias)
+        return Orden.objects.filter(
+            estado_actual='FINALIZADA',
+            fecha_cierre__lt=limite
+        ).order_by('id')
+
+    def _archivar_lote(self):
+        """
+        Reclama un lote de órdenes, lo copia a las tablas de archivo y lo elimina
+        de las activas.
+
+        En PostgreSQL las filas se bloquean con SKIP LOCKED, así varios procesos
+        de archivo pueden trabajar a la vez sin tomar las mismas órdenes (en
+        SQLite select_for_update no tiene efecto).
+
+        Returns:
+            int: Órdenes archivadas en el lote (0 si no quedan)
+        """
+        with transaction.atomic():
+            ordenes = list(
+                self.ordenes_a_archivar().select_for_update(skip_locked=True)[:self.tamano_lote]
+            )
+            if not ordenes:
+                return 0
+            orden_ids = [orden.id for orden in ordenes]
+            items = list(Item.objects.filter(orden_id__in=orden_ids))
+            item_ids = [item.id for item in items]
+            fotos = list(FotoItem.objects.filter(item_id__in=item_ids))
+            datos_excel = DatosExcelItem.objects.in_bulk(item_ids, field_name='item_id')
+
+            ordenes_archivadas = OrdenArchivada.objects.bulk_create([
+                OrdenArchivada(
+                    id_original=orden.id,
+                    numero_orden_facturacion=orden.numero_orden_facturacion,
+                    estado_actual=orden.estado_actual,
+                    fecha_creacion=orden.fecha_creacion,
+                    fecha_cierre=orden.fecha_cierre,
+                )
+                for orden in ordenes
+            ])
+            # bulk_create no devuelve PK en todos los backends: se releen por id_original
+            mapa_ordenes = dict(
+                OrdenArchivada.objects.filter(
+                    id_original__in=[o.id_original for o in ordenes_archivadas]
+                ).values_list('id_original', 'id')
+            )
+
+            nuevos_items = []
+            for item in items:
+                datos = datos_excel.get(item.id)
+                valores = {campo: getattr(item, campo) for campo in CAMPOS_ITEM_COPIADOS}
+                nuevos_items.append(ItemArchivado(
+                    orden_id=mapa_ordenes[item.orden_id],
+                    id_original=item.id,
+                    qr_cargado=item.qr_cargado.name or None,
+                    numero_certificado=datos.numero_certificado if datos else None,
+                    datos_excel=datos.datos if datos else {},
+                    **valores
+                ))
+            ItemArchivado.objects.bulk_create(nuevos_items, batch_size=500)
+            mapa_items = dict(
+                ItemArchivado.objects.filter(id_original__in=item_ids).values_list('id_original', 'id')
+            )
+
+            FotoItemArchivada.objects.bulk_create([
+                FotoItemArchivada(
+                    item_id=mapa_items[foto.item_id],
+                    imagen=foto.imagen.name,
+                    fecha_subida=foto.fecha_subida,
+                    descripcion=foto.descripcion,
+                )
+                for foto in fotos
+            ], batch_size=500)
+
+            # El borrado en cascada elimina ítems, fotos y datos de Excel
+            Orden.objects.filter(id__in=orden_ids).delete()
+
+        self.resumen['ordenes'] += len(ordenes)
+        self.resumen['items'] += len(items)
+        self.resumen['fotos'] += len(fotos)
+        return len(ordenes)
+
+    def ejecutar(self):
+        """
+        Archiva todas las órdenes elegibles en lotes.
+
+        Returns:
+            dict: Resumen con los contadores archivados (o a archivar en dry-run)
+        """
+        queryset = self.ordenes_a_archivar()
+
+        if self.dry_run:
+            self.resumen['ordenes'] = queryset.count()
+            self.resumen['items'] = Item.objects.filter(orden__in=queryset).count()
+            self.resumen['fotos'] = FotoItem.objects.filter(item__orden__in=queryset).count()
+            return self.resumen
+
+        while True:
+            archivadas = self._archivar_lote()
+            if not archivadas:
+                break
+            logger.info(f"Archivadas {archivadas} órdenes (total: {self.resumen['ordenes']})")
+
+        return self.resumen
+
+
+def buscar_orden_historica(numero_orden_facturacion):
+    """
+    Busca una orden por número de facturación en las tablas activas y, si no
+    está, en el archivo histórico.
+
+    Returns:
+        Orden | OrdenArchivada | None
+    """
+    numero = numero_orden_facturacion.strip().upper()
+    orden = Orden.objects.prefetch_related('items__fotos').filter(
+        numero_orden_facturacion=numero
+    ).first()
+    if orden:
+        return orden
+
+    return OrdenArchivada.objects.prefetch_related('items__fotos').filter(
+        numero_orden_facturacion=numero
+    ).first()
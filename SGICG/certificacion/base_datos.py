@@ -0,0 +1,60 @@
+# certificacion/base_datos.py
+
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def aplicar_pragmas_sqlite(sender, connection, **kwargs):
+    """
+    Receptor de connection_created: aplica settings.SQLITE_PRAGMAS a cada
+    conexión SQLite nueva (WAL, synchronous, busy_timeout, cache, mmap...).
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for nombre, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
+
+
+@contextmanager
+def transaccion_escritura(using=DEFAULT_DB_ALIAS):
+    """
+    transaction.atomic() para transacciones que leen y luego escriben.
+
+    En SQLite la transacción se abre con BEGIN IMMEDIATE, así toma el bloqueo de
+    escritura al empezar y espera con busy_timeout. Con el BEGIN diferido por
+    defecto, la lectura inicial y luego la escritura fallan con "database is
+    locked" sin esperar si otro escritor se adelantó. En otros motores, o dentro
+    de un bloque atómico ya abierto, equivale a transaction.atomic().
+    """
+    conexion = connections[using]
+    inmediata = (
+        conexion.vendor == 'sqlite'
+        and not conexion.in_atomic_block
+        and getattr(settings, 'SQLITE_ESCRITURA_INMEDIATA', True)
+    )
+    if inmediata:
+        # transaction_mode (Django 5.1+) se lee al abrir la conexión: conectar antes de cambiarlo
+        conexion.ensure_connection()
+        inmediata = hasattr(conexion, 'transaction_mode')
+
+    if not inmediata:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    modo_anterior = conexion.transaction_mode
+    conexion.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            conexion.transaction_mode = modo_anterior
+            yield
+    finally:
+        conexion.transaction_mode = modo_anterior
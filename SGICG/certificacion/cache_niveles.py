@@ -0,0 +1,174 @@
+# certificacion/cache_niveles.py
+
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+# Espacios de nombres usados por la aplicación
+ESPACIOS = ('tiempos', 'catalogos', 'estadisticas')
+
+INTERVALO_CONTADORES = 10  # Segundos entre envíos de contadores al nivel compartido
+
+_FALTA = object()
+
+
+class CacheDosNiveles:
+    """
+    Cache en dos niveles por espacio de nombres.
+
+    L1 es la cache en memoria del proceso ('local'), con TTL corto. L2 es la
+    cache compartida entre workers ('default': archivos o Redis). Cada espacio
+    tiene un número de versión en L2 que forma parte de las llaves: invalidar
+    un espacio incrementa la versión, y todos los workers dejan de usar las
+    llaves anteriores en cuanto su copia local de la versión expira
+    (settings.CACHE_VERSION_TIMEOUT).
+    """
+
+    def __init__(self, alias_l1='local', alias_l2='default'):
+        self.alias_l1 = alias_l1
+        self.alias_l2 = alias_l2
+        self.lock = threading.Lock()
+        self.contadores = defaultdict(Counter)
+        self._pendientes = defaultdict(Counter)
+        self._ultimo_envio = time.monotonic()
+
+    @property
+    def l1(self):
+        return caches[self.alias_l1]
+
+    @property
+    def l2(self):
+        return caches[self.alias_l2]
+
+    @property
+    def ttl_l1(self):
+        return getattr(settings, 'CACHE_L1_TIMEOUT', 30)
+
+    @property
+    def ttl_version(self):
+        return getattr(settings, 'CACHE_VERSION_TIMEOUT', 2)
+
+    # --- Versiones ---
+
+    def _version(self, espacio):
+        llave = f"{espacio}:version"
+        version = self.l1.get(llave)
+        if version is None:
+            version = self.l2.get(llave)
+            if version is None:
+                self.l2.add(llave, 1, timeout=None)
+                version = self.l2.get(llave) or 1
+            self.l1.set(llave, version, self.ttl_version)
+        return version
+
+    def _llave(self, espacio, clave):
+        return f"{espacio}:v{self._version(espacio)}:{clave}"
+
+    def invalidar(self, *espacios):
+        """Invalida los espacios indicados en todos los workers"""
+        for espacio in espacios:
+            llave = f"{espacio}:version"
+            try:
+                self.l2.incr(llave)
+            except ValueError:
+                # Sin versión guardada equivale a la versión 1
+                self.l2.add(llave, 2, timeout=None)
+            self.l1.delete(llave)
+
+    # --- Lectura y escritura ---
+
+    def get(self, espacio, clave, default=None):
+        llave = self._llave(espacio, clave)
+
+        valor = self.l1.get(llave, _FALTA)
+        if valor is not _FALTA:
+            self._contar(espacio, 'l1')
+            return valor
+
+        valor = self.l2.get(llave, _FALTA)
+        if valor is not _FALTA:
+            self.l1.set(llave, valor, self.ttl_l1)
+            self._contar(espacio, 'l2')
+            return valor
+
+        self._contar(espacio, 'fallos')
+        return default
+
+    def set(self, espacio, clave, valor, timeout):
+        llave = self._llave(espacio, clave)
+        self.l2.set(llave, valor, timeout)
+        self.l1.set(llave, valor, min(self.ttl_l1, timeout) if timeout else self.ttl_l1)
+
+    # Variantes para vistas asíncronas: L1 y L2 son bloqueantes (disco o red),
+    # se consultan en el pool de hilos sin ocupar el hilo de la base de datos
+
+    async def aget(self, espacio, clave, default=None):
+        return await sync_to_async(self.get, thread_sensitive=False)(espacio, clave, default)
+
+    async def aset(self, espacio, clave, valor, timeout):
+        await sync_to_async(self.set, thread_sensitive=False)(espacio, clave, valor, timeout)
+
+    # --- Contadores ---
+
+    def _contar(self, espacio, tipo):
+        with self.lock:
+            self.contadores[espacio][tipo] += 1
+            self._pendientes[espacio][tipo] += 1
+            enviar = time.monotonic() - self._ultimo_envio > INTERVALO_CONTADORES
+        if enviar:
+            self.enviar_contadores()
+
+    def enviar_contadores(self):
+        """Suma al nivel compartido los contadores acumulados en este proceso"""
+        with self.lock:
+            pendientes, self._pendientes = self._pendientes, defaultdict(Counter)
+            self._ultimo_envio = time.monotonic()
+
+        for espacio, contador in pendientes.items():
+            for tipo, n in contador.items():
+                llave = f"contadores:{espacio}:{tipo}"
+                try:
+                    try:
+                        self.l2.incr(llave, n)
+                    except ValueError:
+                        if not self.l2.add(llave, n, timeout=None):
+                            self.l2.incr(llave, n)
+                except Exception as e:
+                    logger.warning(f"No se pudieron enviar los contadores de cache {llave}: {str(e)}")
+
+    def estadisticas(self):
+        """
+        Aciertos L1, aciertos L2 y fallos por espacio, de este proceso y de todos
+        los workers (los contadores compartidos son aproximados).
+
+        Returns:
+            dict: {'proceso': {...}, 'compartido': {...}}
+        """
+        self.enviar_contadores()
+        tipos = ('l1', 'l2', 'fallos')
+
+        with self.lock:
+            proceso = {espacio: {tipo: self.contadores[espacio][tipo] for tipo in tipos} for espacio in ESPACIOS}
+
+        llaves = [f"contadores:{espacio}:{tipo}" for espacio in ESPACIOS for tipo in tipos]
+        valores = self.l2.get_many(llaves)
+        compartido = {
+            espacio: {tipo: valores.get(f"contadores:{espacio}:{tipo}", 0) for tipo in tipos}
+            for espacio in ESPACIOS
+        }
+
+        for datos in list(proceso.values()) + list(compartido.values()):
+            total = datos['l1'] + datos['l2'] + datos['fallos']
+            datos['tasa_aciertos'] = round((datos['l1'] + datos['l2']) / total, 4) if total else None
+
+        return {'proceso': proceso, 'compartido': compartido}
+
+
+cache_niveles = CacheDosNiveles()
@@ -0,0 +1,290 @@
+# certificacion/calibracion.py
+
+import logging
+import time
+
+from django.db import transaction
+
+from .cache_niveles import cache_niveles
+from .models import (
+    ConfiguracionTiempos, Orden, Item, OrdenArchivada, ItemArchivado, TransicionEtapa, ETAPAS_ACTIVAS,
+)
+from .plazos import expresion_tipo_item, registrar_cambios
+from .views import TIEMPO_DEFAULT_SEGUNDOS, TiempoCalculator
+
+logger = logging.getLogger(__name__)
+
+TIPOS_ITEM = [clave for clave, _ in ConfiguracionTiempos.TIPO_ITEM_CHOICES]
+TIPOS_CERT = [clave for clave, _ in ConfiguracionTiempos.TIPO_CERT_CHOICES]
+ESTIMADORES = {'p50': 0.5, 'p80': 0.8}
+
+MIN_SEGUNDOS = 60        # Límites de ConfiguracionTiempos.clean()
+MAX_SEGUNDOS = 2592000   # 30 días
+CHUNK_LECTURA = 20000
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("La calibración de tiempos requiere el paquete 'numpy' (pip install numpy)")
+    return numpy
+
+
+class CalibradorTiempos:
+    """
+    Estima los tiempos por (tipo de ítem, tipo de certificado, etapa) a partir
+    de las órdenes finalizadas, activas y archivadas.
+
+    Cada orden aporta una observación por ítem y etapa. Si la orden tiene
+    transiciones registradas para las cuatro etapas, la duración de cada etapa
+    se reparte entre sus ítems según el tiempo configurado de cada uno (igual
+    que el resumen diario). Si no, se reparte así la duración total
+    (fecha_creacion -> fecha_cierre) entre ítems y etapas. El cálculo se hace
+    con NumPy en una sola pasada sobre todo el historial.
+    """
+
+    def __init__(self, estimador='p80', min_muestras=30, desde=None, redondeo=60):
+        if estimador not in ESTIMADORES:
+            raise ValueError(f"Estimador no válido: {estimador} (use {', '.join(ESTIMADORES)})")
+        self.estimador = estimador
+        self.min_muestras = min_muestras
+        self.desde = desde
+        self.redondeo = max(1, redondeo)
+        self.np = _numpy()
+        self.resumen = {
+            'ordenes': 0, 'ordenes_con_transiciones': 0, 'items': 0,
+            'segundos_lectura': 0, 'segundos_calculo': 0,
+        }
+
+    # --- Lectura ---
+
+    def _ordenes(self):
+        """
+        Returns:
+            tuple: (ids ordenados, duración total en segundos) de las órdenes finalizadas
+        """
+        np = self.np
+        filtros = {'fecha_cierre__isnull': False}
+        if self.desde:
+            filtros['fecha_cierre__gte'] = self.desde
+
+        filas = list(
+            Orden.objects.filter(estado_actual='FINALIZADA', **filtros)
+            .values_list('id', 'fecha_creacion', 'fecha_cierre').iterator(chunk_size=CHUNK_LECTURA)
+        )
+        filas += list(
+            OrdenArchivada.objects.filter(**filtros)
+            .values_list('id_original', 'fecha_creacion', 'fecha_cierre').iterator(chunk_size=CHUNK_LECTURA)
+        )
+
+        ids = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+        totales = np.fromiter(
+            ((f[2] - f[1]).total_seconds() for f in filas), dtype=np.float64, count=len(filas)
+        )
+        orden = np.argsort(ids, kind='stable')
+        return ids[orden], totales[orden]
+
+    def _items(self, ids):
+        """
+        Returns:
+            tuple: (índice de la orden en ids, índice del par tipo/certificado) por ítem
+        """
+        np = self.np
+        codigo_tipo = {tipo: i for i, tipo in enumerate(TIPOS_ITEM)}
+        codigo_cert = {cert: i for i, cert in enumerate(TIPOS_CERT)}
+
+        consultas = [
+            Item.objects.filter(orden__estado_actual='FINALIZADA', orden__fecha_cierre__isnull=False)
+            .annotate(tipo_item_calculado=expresion_tipo_item())
+            .values_list('orden_id', 'tipo_item_calculado', 'tipo_certificado'),
+            ItemArchivado.objects.annotate(tipo_item_calculado=expresion_tipo_item())
+            .values_list('orden__id_original', 'tipo_item_calculado', 'tipo_certificado'),
+        ]
+        orden_ids, pares = [], []
+        for consulta in consultas:
+            for orden_id, tipo, cert in consulta.iterator(chunk_size=CHUNK_LECTURA):
+                if cert in codigo_cert:
+                    orden_ids.append(orden_id)
+                    pares.append(codigo_tipo[tipo] * len(TIPOS_CERT) + codigo_cert[cert])
+
+        orden_ids = np.asarray(orden_ids, dtype=np.int64)
+        pares = np.asarray(pares, dtype=np.int64)
+        posiciones = np.searchsorted(ids, orden_ids)
+        validos = posiciones < len(ids)
+        validos[validos] = ids[posiciones[validos]] == orden_ids[validos]
+        return posiciones[validos], pares[validos]
+
+    def _duraciones_etapa(self, ids):
+        """
+        Returns:
+            ndarray: (órdenes x etapas) con la duración registrada de cada etapa, NaN si falta
+        """
+        np = self.np
+        indice_etapa = {etapa: i for i, etapa in enumerate(ETAPAS_ACTIVAS)}
+        duraciones = np.full((len(ids), len(ETAPAS_ACTIVAS)), np.nan)
+
+        filas = TransicionEtapa.objects.filter(
+            item__isnull=True, etapa_origen__in=ETAPAS_ACTIVAS, duracion_segundos__isnull=False
+        ).order_by('fecha').values_list('orden_id', 'etapa_origen', 'duracion_segundos')
+        orden_ids, etapas, segundos = [], [], []
+        for orden_id, etapa, duracion in filas.iterator(chunk_size=CHUNK_LECTURA):
+            orden_ids.append(orden_id)
+            etapas.append(indice_etapa[etapa])
+            segundos.append(duracion)
+        if not orden_ids:
+            return duraciones
+
+        orden_ids = np.asarray(orden_ids, dtype=np.int64)
+        posiciones = np.searchsorted(ids, orden_ids)
+        validos = posiciones < len(ids)
+        validos[validos] = ids[posiciones[validos]] == orden_ids[validos]
+        # Por fecha ascendente: si una etapa se repite, queda la última transición
+        duraciones[posiciones[validos], np.asarray(etapas)[validos]] = np.asarray(segundos, dtype=np.float64)[validos]
+        return duraciones
+
+    def _matriz_config(self):
+        """
+        Returns:
+            tuple: (matriz pares x etapas con los segundos actuales, {par: ConfiguracionTiempos})
+        """
+        np = self.np
+        matriz = np.full((len(TIPOS_ITEM) * len(TIPOS_CERT), len(ETAPAS_ACTIVAS)), float(TIEMPO_DEFAULT_SEGUNDOS))
+        configs = {}
+        for config in ConfiguracionTiempos.objects.all():
+            if config.tipo_item not in TIPOS_ITEM or config.tipo_certificado not in TIPOS_CERT:
+                continue
+            par = TIPOS_ITEM.index(config.tipo_item) * len(TIPOS_CERT) + TIPOS_CERT.index(config.tipo_certificado)
+            tiempos = TiempoCalculator.tiempos_config(config)
+            matriz[par] = [tiempos[etapa] for etapa in ETAPAS_ACTIVAS]
+            configs[par] = config
+        return matriz, configs
+
+    # --- Cálculo ---
+
+    def _cuantiles(self, grupos, valores, n_grupos, fracciones):
+        """
+        Cuantiles por grupo con interpolación lineal, sin bucles en Python.
+
+        Returns:
+            tuple: (conteos por grupo, {fracción: array de cuantiles por grupo (NaN si vacío)})
+        """
+        np = self.np
+        orden = np.lexsort((valores, grupos))
+        grupos, valores = grupos[orden], valores[orden]
+        conteos = np.bincount(grupos, minlength=n_grupos)
+        inicios = np.concatenate(([0], np.cumsum(conteos)[:-1]))
+
+        resultados = {}
+        con_datos = conteos > 0
+        for fraccion in fracciones:
+            posicion = inicios[con_datos] + (conteos[con_datos] - 1) * fraccion
+            bajo = np.floor(posicion).astype(np.int64)
+            alto = np.ceil(posicion).astype(np.int64)
+            cuantil = np.full(n_grupos, np.nan)
+            cuantil[con_datos] = valores[bajo] + (valores[alto] - valores[bajo]) * (posicion - bajo)
+            resultados[fraccion] = cuantil
+        return conteos, resultados
+
+    def ejecutar(self):
+        """
+        Calcula las estimaciones y la propuesta para cada (tipo, certificado, etapa).
+
+        Returns:
+            list: dicts con tipo_item, tipo_certificado, etapa, muestras, actual,
+                  p50, p80, propuesto y cambio_pct (propuesto None si no hay muestras suficientes)
+        """
+        np = self.np
+        inicio = time.perf_counter()
+        ids, totales = self._ordenes()
+        posiciones, pares = self._items(ids)
+        duraciones = self._duraciones_etapa(ids)
+        matriz, configs = self._matriz_config()
+        self.resumen['segundos_lectura'] = round(time.perf_counter() - inicio, 3)
+
+        inicio = time.perf_counter()
+        n_ordenes, n_etapas = len(ids), len(ETAPAS_ACTIVAS)
+        esperado = matriz[pares]  # ítems x etapas
+
+        # Tiempo configurado de cada orden por etapa y en total, para repartir lo observado
+        suma_etapa = np.stack([
+            np.bincount(posiciones, weights=esperado[:, e], minlength=n_ordenes) for e in range(n_etapas)
+        ], axis=1)
+        suma_total = suma_etapa.sum(axis=1)
+
+        completas = ~np.isnan(duraciones).any(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            por_etapa = np.nan_to_num(duraciones)[posiciones] * esperado / suma_etapa[posiciones]
+            por_total = (totales[posiciones] / suma_total[posiciones])[:, None] * esperado
+        observado = np.where(completas[posiciones][:, None], por_etapa, por_total)
+
+        grupos = (pares[:, None] * n_etapas + np.arange(n_etapas)[None, :]).ravel()
+        valores = observado.ravel()
+        validos = np.isfinite(valores) & (valores >= 0)
+        n_grupos = matriz.shape[0] * n_etapas
+        conteos, cuantiles = self._cuantiles(grupos[validos], valores[validos], n_grupos, (0.5, 0.8))
+        self.resumen['segundos_calculo'] = round(time.perf_counter() - inicio, 3)
+
+        self.resumen['ordenes'] = int(len(np.unique(posiciones)))
+        self.resumen['ordenes_con_transiciones'] = int(completas[np.unique(posiciones)].sum())
+        self.resumen['items'] = int(len(posiciones))
+
+        propuestas = []
+        for par in range(matriz.shape[0]):
+            for e, etapa in enumerate(ETAPAS_ACTIVAS):
+                grupo = par * n_etapas + e
+                if not conteos[grupo]:
+                    continue
+                actual = int(matriz[par, e])
+                p50, p80 = cuantiles[0.5][grupo], cuantiles[0.8][grupo]
+                estimado = p50 if self.estimador == 'p50' else p80
+                propuesto = None
+                if conteos[grupo] >= self.min_muestras and par in configs:
+                    propuesto = int(round(estimado / self.redondeo) * self.redondeo)
+                    propuesto = min(MAX_SEGUNDOS, max(MIN_SEGUNDOS, propuesto))
+                propuestas.append({
+                    'tipo_item': TIPOS_ITEM[par // len(TIPOS_CERT)],
+                    'tipo_certificado': TIPOS_CERT[par % len(TIPOS_CERT)],
+                    'etapa': etapa,
+                    'muestras': int(conteos[grupo]),
+                    'actual': actual,
+                    'p50': int(round(p50)),
+                    'p80': int(round(p80)),
+                    'propuesto': propuesto,
+                    'cambio_pct': round((propuesto - actual) / actual * 100, 1) if propuesto is not None else None,
+                })
+        return propuestas
+
+    def aplicar(self, propuestas):
+        """
+        Guarda los valores propuestos que cambian y registra el recálculo de
+        plazos de las órdenes en curso (ver plazos.py).
+
+        Returns:
+            tuple: (configuraciones actualizadas, RecalculoPlazos o None)
+        """
+        por_par = {}
+        for propuesta in propuestas:
+            if propuesta['propuesto'] is not None and propuesta['propuesto'] != propuesta['actual']:
+                par = (propuesta['tipo_item'], propuesta['tipo_certificado'])
+                por_par.setdefault(par, {})[propuesta['etapa']] = propuesta['propuesto']
+        if not por_par:
+            return 0, None
+
+        with transaction.atomic():
+            anteriores, nuevos = {}, {}
+            for config in ConfiguracionTiempos.objects.select_for_update():
+                par = (config.tipo_item, config.tipo_certificado)
+                if par not in por_par:
+                    continue
+                anteriores[par] = TiempoCalculator.tiempos_config(config)
+                for etapa, segundos in por_par[par].items():
+                    setattr(config, f'tiempo_{etapa.lower()}', segundos)
+                config.full_clean()
+                config.save()
+                nuevos[par] = TiempoCalculator.tiempos_config(config)
+            recalculo = registrar_cambios(anteriores, nuevos)
+
+        transaction.on_commit(lambda: cache_niveles.invalidar('tiempos', 'estadisticas'))
+        logger.info(f"Calibración aplicada a {len(nuevos)} configuraciones")
+        return len(nuevos), recalculo
@@ -0,0 +1,346 @@
+# certificacion/conciliacion.py
+
+import os
+import re
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import Orden, Item, FotoItem, OrdenArchivada, ItemArchivado, FotoItemArchivada
+from .impresion import CARPETA_IMPRESIONES
+from .base_datos import transaccion_escritura
+
+logger = logging.getLogger(__name__)
+
+CARPETA_ORDEN = re.compile(r'^ORDEN-(\d+)$')
+ANTIGUEDAD_MINIMA_MINUTOS = 60
+LOTE_IDS = 500
+# Si faltan más referencias que esta proporción se asume un problema de
+# montaje o de --ruta y no se limpia nada sin forzar
+PROPORCION_MAXIMA_FALTANTES = 0.05
+
+
+def _clave(ruta):
+    """Ruta relativa normalizada para comparar disco y base de datos (sin distinguir mayúsculas en Windows)"""
+    return os.path.normcase(os.path.normpath(ruta))
+
+
+def _ruta_excel(orden_id, numero_item, nombre_excel):
+    return os.path.join(f"ORDEN-{orden_id:04d}", f"ITEM-{numero_item}", nombre_excel)
+
+
+def _leer_directorio(ruta, relativa, referenciadas, limite_mtime):
+    """
+    Lee un directorio (hilo de trabajo). Solo se consulta stat de los archivos
+    no referenciados, que son los candidatos a huérfanos.
+
+    Returns:
+        tuple: (subdirectorios, archivos, encontrados, huérfanos, recientes)
+    """
+    subdirectorios, encontrados, huerfanos = [], [], []
+    archivos = recientes = 0
+    with os.scandir(ruta) as entradas:
+        for entrada in entradas:
+            relativa_entrada = os.path.join(relativa, entrada.name)
+            if entrada.is_dir(follow_symlinks=False):
+                subdirectorios.append((entrada.path, relativa_entrada))
+                continue
+            if not entrada.is_file(follow_symlinks=False):
+                continue
+            archivos += 1
+            clave = _clave(relativa_entrada)
+            if clave in referenciadas:
+                encontrados.append(clave)
+                continue
+            info = entrada.stat(follow_symlinks=False)
+            if info.st_mtime > limite_mtime:
+                recientes += 1  # Puede ser una subida cuya transacción aún no terminó
+            else:
+                huerfanos.append((relativa_entrada, info.st_size))
+    return subdirectorios, archivos, encontrados, huerfanos, recientes
+
+
+def _eliminar(ruta):
+    try:
+        os.remove(ruta)
+        return None
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        return f"{ruta}: {str(e)}"
+
+
+class ConciliadorMedios:
+    """
+    Clase para conciliar MEDIA_ROOT con las referencias de la base de datos.
+
+    Carga en un set todas las rutas referenciadas (ítems, fotos y sus copias
+    archivadas), recorre las carpetas de órdenes y de impresiones con
+    os.scandir en un pool de hilos y clasifica:
+      - huérfanos: archivos que nada referencia (QR reemplazados cuyo borrado
+        falló, Excel copiados en transacciones revertidas, órdenes eliminadas)
+      - referencias colgantes: rutas en la base de datos sin archivo
+
+    Otras carpetas de MEDIA_ROOT no se tocan.
+
+    La limpieza de referencias guarda antes cada fila afectada en el archivo
+    de respaldo (JSON Lines) y se rechaza, salvo con forzar, si el recorrido
+    tuvo errores, no encontró carpetas gestionadas o faltan demasiados
+    archivos: un recurso compartido sin montar o una raíz equivocada no
+    deben vaciar la base de datos.
+    """
+
+    def __init__(self, raiz=None, hilos=None, antiguedad_minutos=ANTIGUEDAD_MINIMA_MINUTOS,
+                 eliminar=False, limpiar_referencias=False, respaldo=None, forzar=False,
+                 proporcion_maxima_faltantes=PROPORCION_MAXIMA_FALTANTES):
+        self.raiz = str(raiz or settings.MEDIA_ROOT)
+        self.hilos = hilos or min(32, (os.cpu_count() or 1) * 4)
+        self.antiguedad_minutos = antiguedad_minutos
+        self.eliminar = eliminar
+        self.limpiar_referencias = limpiar_referencias
+        self.respaldo = respaldo
+        self.forzar = forzar
+        self.proporcion_maxima_faltantes = proporcion_maxima_faltantes
+        self.huerfanos = []
+        self.colgantes = []
+        self.resumen = {
+            'directorios': 0, 'archivos': 0, 'referenciados': 0, 'huerfanos': 0,
+            'bytes_huerfanos': 0, 'recientes': 0, 'colgantes': 0, 'carpetas_huerfanas': 0,
+            'eliminados': 0, 'directorios_eliminados': 0, 'referencias_limpiadas': 0,
+            'limpieza_rechazada': None, 'segundos': 0, 'errores': [],
+        }
+
+    # --- Base de datos ---
+
+    def _filas_referencias(self):
+        """
+        Genera (modelo, id, campo, clave) de cada referencia a archivo, leyendo
+        proyecciones por bloques.
+        """
+        filas = Item.objects.values_list(
+            'id', 'orden_id', 'numero_item', 'qr_cargado', 'nombre_excel', 'archivo_impresion'
+        )
+        for item_id, orden_id, numero_item, qr, excel, impresion in filas.iterator(chunk_size=5000):
+            if qr:
+                yield 'Item', item_id, 'qr_cargado', _clave(qr)
+            if excel:
+                yield 'Item', item_id, 'nombre_excel', _clave(_ruta_excel(orden_id, numero_item, excel))
+            if impresion:
+                yield 'Item', item_id, 'archivo_impresion', _clave(impresion)
+
+        for foto_id, imagen in FotoItem.objects.values_list('id', 'imagen').iterator(chunk_size=5000):
+            if imagen:
+                yield 'FotoItem', foto_id, 'imagen', _clave(imagen)
+
+        # Los archivos de las órdenes archivadas siguen en la carpeta con su id original
+        filas = ItemArchivado.objects.values_list(
+            'id', 'orden__id_original', 'numero_item', 'qr_cargado', 'nombre_excel', 'archivo_impresion'
+        )
+        for item_id, orden_id, numero_item, qr, excel, impresion in filas.iterator(chunk_size=5000):
+            if qr:
+                yield 'ItemArchivado', item_id, 'qr_cargado', _clave(qr)
+            if excel:
+                yield 'ItemArchivado', item_id, 'nombre_excel', _clave(_ruta_excel(orden_id, numero_item, excel))
+            if impresion:
+                yield 'ItemArchivado', item_id, 'archivo_impresion', _clave(impresion)
+
+        for foto_id, imagen in FotoItemArchivada.objects.values_list('id', 'imagen').iterator(chunk_size=5000):
+            if imagen:
+                yield 'FotoItemArchivada', foto_id, 'imagen', _clave(imagen)
+
+    def _ordenes_existentes(self):
+        ids = set(Orden.objects.values_list('id', flat=True).iterator(chunk_size=5000))
+        ids.update(OrdenArchivada.objects.values_list('id_original', flat=True).iterator(chunk_size=5000))
+        return ids
+
+    # --- Disco ---
+
+    def _raices(self, ordenes):
+        """Carpetas gestionadas de primer nivel y carpetas de órdenes que ya no existen"""
+        raices, huerfanas = [], []
+        try:
+            with os.scandir(self.raiz) as entradas:
+                for entrada in entradas:
+                    if not entrada.is_dir(follow_symlinks=False):
+                        continue
+                    coincidencia = CARPETA_ORDEN.match(entrada.name)
+                    if coincidencia:
+                        raices.append((entrada.path, entrada.name))
+                        if int(coincidencia.group(1)) not in ordenes:
+                            huerfanas.append(entrada.path)
+                    elif entrada.name == CARPETA_IMPRESIONES:
+                        raices.append((entrada.path, entrada.name))
+        except FileNotFoundError:
+            raise ValueError(f"No existe MEDIA_ROOT: {self.raiz}")
+        return raices, huerfanas
+
+    def _existe(self, clave):
+        if os.path.exists(os.path.join(self.raiz, clave)):
+            return True
+        spool = getattr(default_storage, 'spool', None)
+        return spool is not None and spool.exists(clave)
+
+    def _escanear(self, raices, referenciadas):
+        """
+        Recorre las carpetas en paralelo: cada directorio leído encola sus
+        subdirectorios en el pool. Las rutas encontradas se descartan de
+        referenciadas, que al terminar contiene solo las que faltan (ninguna
+        ruta aparece dos veces en disco, así que los hilos que consultan el set
+        no ven afectado su resultado).
+        """
+        limite_mtime = time.time() - self.antiguedad_minutos * 60
+        with ThreadPoolExecutor(max_workers=self.hilos) as executor:
+            pendientes = {
+                executor.submit(_leer_directorio, ruta, relativa, referenciadas, limite_mtime): ruta
+                for ruta, relativa in raices
+            }
+            while pendientes:
+                hechos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    ruta = pendientes.pop(futuro)
+                    try:
+                        subdirectorios, archivos, encontrados, huerfanos, recientes = futuro.result()
+                    except OSError as e:
+                        self.resumen['errores'].append(f"{ruta}: {str(e)}")
+                        continue
+                    self.resumen['directorios'] += 1
+                    self.resumen['archivos'] += archivos
+                    self.resumen['referenciados'] += len(encontrados)
+                    self.resumen['recientes'] += recientes
+                    self.huerfanos.extend(huerfanos)
+                    referenciadas.difference_update(encontrados)
+                    for sub_ruta, sub_relativa in subdirectorios:
+                        pendientes[executor.submit(
+                            _leer_directorio, sub_ruta, sub_relativa, referenciadas, limite_mtime
+                        )] = sub_ruta
+
+            # Confirma las faltantes una a una: pueden estar fuera de las carpetas
+            # recorridas, haberse creado después de leer su directorio o seguir
+            # en el spool local pendientes de replicar
+            faltantes = list(referenciadas)
+            existen = executor.map(self._existe, faltantes)
+            return {clave for clave, existe in zip(faltantes, existen) if not existe}
+
+    def _eliminar_huerfanos(self, carpetas_huerfanas):
+        with ThreadPoolExecutor(max_workers=self.hilos) as executor:
+            rutas = (os.path.join(self.raiz, relativa) for relativa, _ in self.huerfanos)
+            for error in executor.map(_eliminar, rutas, chunksize=256):
+                if error:
+                    self.resumen['errores'].append(error)
+                else:
+                    self.resumen['eliminados'] += 1
+
+        # Solo se podan las carpetas de órdenes inexistentes; las vacías de
+        # órdenes en curso se crean al registrar la orden
+        for carpeta in carpetas_huerfanas:
+            for actual, _, _ in os.walk(carpeta, topdown=False):
+                try:
+                    os.rmdir(actual)
+                    self.resumen['directorios_eliminados'] += 1
+                except OSError:
+                    pass  # No está vacía (archivos recientes o con error)
+
+    def _motivo_rechazo(self, raices, total_referencias, faltantes):
+        """Motivo para no limpiar referencias, o None si el recorrido es fiable"""
+        if self.resumen['errores']:
+            return f"hubo {len(self.resumen['errores'])} errores al recorrer el disco"
+        if total_referencias and not raices:
+            return f"no hay carpetas de órdenes ni de impresiones en {self.raiz} (¿recurso compartido sin montar?)"
+        proporcion = len(faltantes) / total_referencias if total_referencias else 0
+        if proporcion > self.proporcion_maxima_faltantes:
+            return (
+                f"faltan los archivos del {proporcion:.1%} de las referencias "
+                f"(máximo {self.proporcion_maxima_faltantes:.1%})"
+            )
+        return None
+
+    def _limpiar_referencias(self):
+        """
+        Quita de la base de datos las referencias sin archivo (las fotos se
+        eliminan). Cada fila se escribe en el respaldo antes de modificarla.
+        """
+        por_campo = {}
+        for referencia in self.colgantes:
+            por_campo.setdefault((referencia['modelo'], referencia['campo']), []).append(referencia['id'])
+
+        modelos = {
+            'Item': Item, 'FotoItem': FotoItem,
+            'ItemArchivado': ItemArchivado, 'FotoItemArchivada': FotoItemArchivada,
+        }
+        with open(self.respaldo, 'a', encoding='utf-8') as respaldo:
+            for (modelo, campo), ids in por_campo.items():
+                for inicio in range(0, len(ids), LOTE_IDS):
+                    lote = ids[inicio:inicio + LOTE_IDS]
+                    with transaccion_escritura():
+                        queryset = modelos[modelo].objects.filter(id__in=lote)
+                        for fila in queryset.values():
+                            respaldo.write(json.dumps(
+                                {'modelo': modelo, 'campo': campo, 'fila': fila},
+                                ensure_ascii=False, default=str,
+                            ) + '\n')
+                        respaldo.flush()
+                        os.fsync(respaldo.fileno())
+
+                        if campo == 'imagen':
+                            queryset.delete()
+                        elif modelo == 'Item' and campo == 'qr_cargado':
+                            # Sin hash, generar_qrs vuelve a crear el QR
+                            queryset.update(qr_cargado='', qr_payload_hash=None)
+                        else:
+                            queryset.update(**{campo: None})
+                    self.resumen['referencias_limpiadas'] += len(lote)
+
+    def ejecutar(self):
+        """
+        Concilia MEDIA_ROOT con la base de datos y, según las opciones,
+        elimina los huérfanos y limpia las referencias colgantes.
+
+        Returns:
+            dict: Resumen con contadores y errores
+        """
+        if self.limpiar_referencias and not self.respaldo:
+            raise ValueError("Limpiar referencias requiere un archivo de respaldo")
+
+        inicio = time.perf_counter()
+        referenciadas = {clave for _, _, _, clave in self._filas_referencias()}
+        total_referencias = len(referenciadas)
+        ordenes = self._ordenes_existentes()
+        raices, carpetas_huerfanas = self._raices(ordenes)
+        del ordenes
+        self.resumen['carpetas_huerfanas'] = len(carpetas_huerfanas)
+
+        faltantes = self._escanear(raices, referenciadas)
+        del referenciadas
+
+        self.huerfanos.sort()
+        self.resumen['huerfanos'] = len(self.huerfanos)
+        self.resumen['bytes_huerfanos'] = sum(tamano for _, tamano in self.huerfanos)
+
+        if faltantes:
+            self.colgantes = [
+                {'modelo': modelo, 'id': pk, 'campo': campo, 'ruta': clave}
+                for modelo, pk, campo, clave in self._filas_referencias()
+                if clave in faltantes
+            ]
+        self.resumen['colgantes'] = len(self.colgantes)
+
+        if self.eliminar:
+            self._eliminar_huerfanos(carpetas_huerfanas)
+        if self.limpiar_referencias and self.colgantes:
+            motivo = self._motivo_rechazo(raices, total_referencias, faltantes)
+            if motivo and not self.forzar:
+                self.resumen['limpieza_rechazada'] = motivo
+                logger.warning(f"Limpieza de referencias rechazada: {motivo}")
+            else:
+                self._limpiar_referencias()
+
+        self.resumen['segundos'] = round(time.perf_counter() - inicio, 2)
+        logger.info(
+            f"Conciliación de medios: {self.resumen['archivos']} archivos, "
+            f"{self.resumen['huerfanos']} huérfanos, {self.resumen['colgantes']} referencias colgantes"
+        )
+        return self.resumen
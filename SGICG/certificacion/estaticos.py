@@ -0,0 +1,173 @@
+# certificacion/estaticos.py
+
+import gzip
+import os
+import logging
+import mimetypes
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.functional import cached_property
+from django.utils.http import http_date
+
+from .servidor_medios import etag_archivo
+
+logger = logging.getLogger(__name__)
+
+# Librerías de terceros: ruta dentro de static/ y URL de origen (vendorizar_estaticos
+# las descarga; mientras no estén, las plantillas usan la CDN)
+RECURSOS_VENDOR = {
+    'bootstrap.css': (
+        'vendor/bootstrap-5.3.3/bootstrap.min.css',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    ),
+    'bootstrap.js': (
+        'vendor/bootstrap-5.3.3/bootstrap.bundle.min.js',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+    ),
+    'select2.css': (
+        'vendor/select2-4.1.0-rc.0/select2.min.css',
+        'https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/css/select2.min.css',
+    ),
+    'select2.js': (
+        'vendor/select2-4.1.0-rc.0/select2.min.js',
+        'https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/js/select2.min.js',
+    ),
+    'jquery.js': (
+        'vendor/jquery-3.6.0/jquery.min.js',
+        'https://code.jquery.com/jquery-3.6.0.min.js',
+    ),
+}
+
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.html', '.xml')
+TAMANO_MINIMO_COMPRESION = 256
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+
+
+@lru_cache(maxsize=None)
+def url_recurso(clave):
+    """
+    URL de una librería de terceros: la copia local con hash si está
+    vendorizada, o la CDN de origen si aún no se descargó.
+
+    Se cachea por proceso: vendorizar_estaticos limpia la cache del proceso
+    que lo ejecuta, pero los servidores en marcha siguen usando la CDN hasta
+    reiniciarse (como con el manifiesto de collectstatic).
+    """
+    ruta, url_cdn = RECURSOS_VENDOR[clave]
+    if finders.find(ruta) or staticfiles_storage.exists(ruta):
+        return staticfiles_storage.url(ruta)
+    return url_cdn
+
+
+def _comprimir(ruta):
+    """
+    Escribe junto al archivo sus variantes .gz y .br (si brotli está
+    instalado), solo cuando ahorran espacio.
+    """
+    with open(ruta, 'rb') as f:
+        contenido = f.read()
+
+    # mtime=0: el .gz no cambia si el contenido no cambia
+    comprimido = gzip.compress(contenido, compresslevel=9, mtime=0)
+    if len(comprimido) < len(contenido) * 0.95:
+        with open(f"{ruta}.gz", 'wb') as f:
+            f.write(comprimido)
+
+    try:
+        import brotli
+    except ImportError:
+        return
+    comprimido = brotli.compress(contenido, quality=11)
+    if len(comprimido) < len(contenido) * 0.95:
+        with open(f"{ruta}.br", 'wb') as f:
+            f.write(comprimido)
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage que además deja precomprimidos (.gz y .br)
+    los archivos de texto, para servirlos sin comprimir en cada petición.
+
+    Si no se ejecutó collectstatic, url() devuelve el nombre sin hash en
+    lugar de fallar, como con DEBUG.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        procesados = set()
+        for original, procesado, modificado in super().post_process(paths, dry_run=dry_run, **options):
+            if isinstance(procesado, str):
+                procesados.add(procesado)
+            yield original, procesado, modificado
+
+        if dry_run:
+            return
+        try:
+            import brotli  # noqa: F401
+        except ImportError:
+            logger.warning("Sin el paquete 'brotli' solo se generan variantes .gz (pip install brotli)")
+
+        for nombre in sorted(procesados):
+            if not nombre.endswith(EXTENSIONES_COMPRIMIBLES):
+                continue
+            ruta = self.path(nombre)
+            if os.path.getsize(ruta) >= TAMANO_MINIMO_COMPRESION:
+                _comprimir(ruta)
+
+    @cached_property
+    def nombres_con_hash(self):
+        """Nombres con hash del manifiesto (su contenido no cambia nunca)"""
+        return frozenset(self.hashed_files.values())
+
+
+def _variante(request, ruta):
+    """Variante precomprimida aceptada por el cliente, o (ruta, None)"""
+    aceptadas = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for codificacion, extension in (('br', '.br'), ('gzip', '.gz')):
+        if codificacion in aceptadas and os.path.isfile(ruta + extension):
+            return ruta + extension, codificacion
+    return ruta, None
+
+
+def respuesta_estatico(request, nombre):
+    """
+    Sirve un archivo de STATIC_ROOT. Los nombres con hash del manifiesto no
+    cambian nunca de contenido y se cachean un año; el resto se revalida con
+    ETag.
+    """
+    if not settings.STATIC_ROOT:
+        raise Http404("Archivo no encontrado")
+    try:
+        ruta = safe_join(str(settings.STATIC_ROOT), nombre)
+    except Exception:
+        raise Http404("Archivo no encontrado")
+    if not os.path.isfile(ruta):
+        raise Http404("Archivo no encontrado")
+
+    ruta_envio, codificacion = _variante(request, ruta)
+    info = os.stat(ruta_envio)
+    etag = etag_archivo(ruta_envio, info)
+    con_hash = nombre.replace(os.sep, '/') in getattr(staticfiles_storage, 'nombres_con_hash', ())
+
+    respuesta = get_conditional_response(request, etag=etag, last_modified=int(info.st_mtime))
+    if respuesta is None:
+        tipo = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+        respuesta = FileResponse(open(ruta_envio, 'rb'), content_type=tipo)
+        if codificacion:
+            respuesta['Content-Encoding'] = codificacion
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(int(info.st_mtime))
+    respuesta['Cache-Control'] = CACHE_INMUTABLE if con_hash else 'no-cache'
+    patch_vary_headers(respuesta, ['Accept-Encoding'])
+    return respuesta
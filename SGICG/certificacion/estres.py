@@ -0,0 +1,293 @@
+# certificacion/estres.py
+"""
+Clientes HTTP de la prueba de estrés concurrente y del benchmark ASGI/WSGI.
+
+Este módulo no importa modelos al cargarse para que los procesos de trabajo
+puedan importarlo antes de inicializar Django.
+"""
+
+import asyncio
+import base64
+import random
+import time
+import uuid
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from .procesos import inicializar_django
+
+# PNG de 1x1 píxel para las subidas de QR y fotos
+PNG_MINIMO = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+DATOS_ORDEN = {
+    'tipo_certificado': ['GC_SENCILLA', 'ESCRITO', 'DIAMANTE'],
+    'que_es': ['JOYA', 'PIEDRA', 'PIEDRA'],
+    'codigo_referencia': ['', '', ''],
+    'tipo_joya': ['ANILLO', '', ''],
+    'metal': ['ORO', '', ''],
+    'gema_principal': ['Esmeralda', 'Zafiro', 'Diamante'],
+    'forma_gema': ['Óvalo', 'Redonda', 'Redonda'],
+    'peso_gema': ['1.25', '0.80', '0.50'],
+    'comentarios': ['', '', ''],
+    'cantidad_gc_group_1': ['1'],
+    'cantidad_diamante_group_3': ['1'],
+}
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    """Devuelve las respuestas 3xx tal cual en lugar de seguirlas"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def _multipart(campos, archivos):
+    """
+    Codifica campos y archivos como multipart/form-data.
+
+    Returns:
+        tuple: (cuerpo en bytes, content type)
+    """
+    limite = uuid.uuid4().hex
+    partes = []
+    for nombre, valores in campos.items():
+        for valor in (valores if isinstance(valores, list) else [valores]):
+            partes.append(
+                f'--{limite}\r\nContent-Disposition: form-data; name="{nombre}"\r\n\r\n{valor}\r\n'.encode('utf-8')
+            )
+    for nombre, (nombre_archivo, contenido, tipo) in archivos.items():
+        partes.append(
+            f'--{limite}\r\nContent-Disposition: form-data; name="{nombre}"; filename="{nombre_archivo}"\r\n'
+            f'Content-Type: {tipo}\r\n\r\n'.encode('utf-8') + contenido + b'\r\n'
+        )
+    partes.append(f'--{limite}--\r\n'.encode('utf-8'))
+    return b''.join(partes), f'multipart/form-data; boundary={limite}'
+
+
+def mensajes_de_cookie(valor):
+    """Textos de los mensajes de Django guardados en la cookie 'messages'"""
+    from django.contrib.messages.storage.cookie import CookieStorage
+    from django.http import HttpRequest
+
+    mensajes = CookieStorage(HttpRequest())._decode(valor) or []
+    return [str(m.message) for m in mensajes]
+
+
+class ClienteHTTP:
+    """Cliente mínimo con su propio token CSRF (un cliente por hilo)"""
+
+    def __init__(self, url_base, timeout=60):
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(_SinRedirecciones)
+        self.csrf = None
+
+    def _abrir(self, peticion):
+        try:
+            respuesta = self.opener.open(peticion, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            respuesta = e  # 3xx, 4xx y 5xx llegan como HTTPError
+        with respuesta:
+            respuesta.read()
+        cookies = SimpleCookie()
+        for cabecera in respuesta.headers.get_all('Set-Cookie') or []:
+            cookies.load(cabecera)
+        return respuesta.status, respuesta.headers.get('Location', ''), cookies
+
+    def iniciar(self):
+        """Obtiene la cookie CSRF desde el formulario de nueva orden"""
+        _, _, cookies = self._abrir(urllib.request.Request(f"{self.url_base}/orden/nueva/"))
+        if 'csrftoken' not in cookies:
+            raise RuntimeError('El servidor no devolvió la cookie csrftoken')
+        self.csrf = cookies['csrftoken'].value
+
+    def post(self, ruta, campos, archivos=None):
+        """
+        Envía un POST sin seguir la redirección.
+
+        Returns:
+            dict: estado HTTP, destino de la redirección, mensajes y duración en segundos
+        """
+        if archivos:
+            cuerpo, tipo = _multipart(campos, archivos)
+        else:
+            cuerpo, tipo = urllib.parse.urlencode(campos, doseq=True).encode('utf-8'), 'application/x-www-form-urlencoded'
+
+        peticion = urllib.request.Request(f"{self.url_base}{ruta}", data=cuerpo, method='POST', headers={
+            'Content-Type': tipo,
+            'X-CSRFToken': self.csrf,
+            'Cookie': f"csrftoken={self.csrf}",  # Sin sesión: los mensajes viajan solo en esta respuesta
+        })
+        inicio = time.perf_counter()
+        estado, destino, cookies = self._abrir(peticion)
+        duracion = time.perf_counter() - inicio
+
+        mensajes = mensajes_de_cookie(cookies['messages'].value) if 'messages' in cookies else []
+        return {'estado': estado, 'destino': destino, 'mensajes': mensajes, 'duracion': duracion}
+
+
+def crear_orden(cliente, numero):
+    r = cliente.post('/orden/nueva/', dict(DATOS_ORDEN, numero_orden_facturacion=numero))
+    r['exito'] = r['estado'] == 302 and '/orden/creada/' in r['destino']
+    r['objetivo'] = numero
+    return r
+
+
+def avanzar(cliente, orden_id):
+    r = cliente.post(f'/orden/{orden_id}/avanzar/', {})
+    r['exito'] = any('avanzó a' in m for m in r['mensajes'])
+    r['objetivo'] = orden_id
+    return r
+
+
+def subir_qr(cliente, orden_id, item_id):
+    r = cliente.post(
+        f'/orden/{orden_id}/',
+        {'item_id': item_id, 'subir_ingreso': '1'},
+        {'qr_code': ('qr.png', PNG_MINIMO, 'image/png')},
+    )
+    r['exito'] = any('Código QR actualizado' in m for m in r['mensajes'])
+    r['objetivo'] = item_id
+    return r
+
+
+def subir_foto(cliente, orden_id, item_id):
+    r = cliente.post(
+        f'/orden/{orden_id}/',
+        {'item_id': item_id, 'subir_fotos': '1'},
+        {'fotos_profesionales': ('foto.png', PNG_MINIMO, 'image/png')},
+    )
+    r['exito'] = any('Se subieron' in m for m in r['mensajes'])
+    r['objetivo'] = item_id
+    return r
+
+
+def _hilo(url_base, prefijo, semillas, mezcla, operaciones, semilla):
+    """Ejecuta una secuencia aleatoria de operaciones con un cliente propio"""
+    aleatorio = random.Random(semilla)
+    cliente = ClienteHTTP(url_base)
+    cliente.iniciar()
+
+    resultados = []
+    for n in range(operaciones):
+        tipo = aleatorio.choices(list(mezcla), weights=list(mezcla.values()))[0]
+        orden_id, item_ids = aleatorio.choice(semillas)
+        try:
+            if tipo == 'crear':
+                r = crear_orden(cliente, f"{prefijo}-{semilla}-{n:05d}")
+            elif tipo == 'avanzar':
+                r = avanzar(cliente, orden_id)
+            elif tipo == 'qr':
+                r = subir_qr(cliente, orden_id, aleatorio.choice(item_ids))
+            else:
+                r = subir_foto(cliente, orden_id, aleatorio.choice(item_ids))
+        except Exception as e:
+            r = {'estado': None, 'exito': False, 'duracion': 0, 'mensajes': [str(e)], 'objetivo': None}
+        r['tipo'] = tipo
+        r['fin'] = time.time()
+        resultados.append(r)
+    return resultados
+
+
+def ejecutar_proceso(url_base, prefijo, semillas, mezcla, hilos, operaciones, semilla):
+    """
+    Punto de entrada de cada proceso de trabajo: reparte las operaciones entre hilos.
+
+    Returns:
+        list: Resultados de todas las operaciones del proceso
+    """
+    inicializar_django()
+    por_hilo = [operaciones // hilos + (1 if i < operaciones % hilos else 0) for i in range(hilos)]
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        futuros = [
+            executor.submit(_hilo, url_base, prefijo, semillas, mezcla, n, semilla * 1000 + i)
+            for i, n in enumerate(por_hilo) if n
+        ]
+        return [r for futuro in futuros for r in futuro.result()]
+
+
+# --- Carga de lectura con muchas conexiones (benchmark_asgi) ---
+
+async def _leer_respuesta(lector):
+    """
+    Lee una respuesta HTTP/1.1 completa.
+
+    Returns:
+        tuple: (estado HTTP, True si el servidor cierra la conexión)
+    """
+    cabecera = await lector.readuntil(b'\r\n\r\n')
+    lineas = cabecera.decode('latin-1').split('\r\n')
+    estado = int(lineas[0].split()[1])
+    cabeceras = {}
+    for linea in lineas[1:]:
+        if ':' in linea:
+            nombre, valor = linea.split(':', 1)
+            cabeceras[nombre.strip().lower()] = valor.strip().lower()
+
+    if 'content-length' in cabeceras:
+        await lector.readexactly(int(cabeceras['content-length']))
+    elif cabeceras.get('transfer-encoding') == 'chunked':
+        while True:
+            tamano = int((await lector.readuntil(b'\r\n')).split(b';')[0], 16)
+            await lector.readexactly(tamano + 2)
+            if tamano == 0:
+                break
+    else:
+        await lector.read()
+        return estado, True
+    return estado, cabeceras.get('connection') == 'close'
+
+
+async def _conexion_carga(host, puerto, rutas, fin, aleatorio, resultados, timeout):
+    """Un cliente con conexión persistente que pide rutas al azar hasta el final de la prueba"""
+    lector = escritor = None
+    while time.perf_counter() < fin:
+        nombre = aleatorio.choice(list(rutas))
+        ruta = aleatorio.choice(rutas[nombre])
+        inicio = time.perf_counter()
+        try:
+            if escritor is None:
+                lector, escritor = await asyncio.open_connection(host, puerto)
+            escritor.write(f"GET {ruta} HTTP/1.1\r\nHost: {host}:{puerto}\r\n\r\n".encode('latin-1'))
+            await escritor.drain()
+            estado, cerrar = await asyncio.wait_for(_leer_respuesta(lector), timeout)
+        except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+            estado, cerrar = None, True
+        resultados[nombre]['latencias'].append(time.perf_counter() - inicio)
+        resultados[nombre]['estados'][estado] = resultados[nombre]['estados'].get(estado, 0) + 1
+
+        if cerrar and escritor is not None:
+            escritor.close()
+            lector = escritor = None
+    if escritor is not None:
+        escritor.close()
+
+
+async def _carga(url_base, rutas, conexiones, duracion, semilla, timeout):
+    partes = urllib.parse.urlsplit(url_base)
+    resultados = {nombre: {'latencias': [], 'estados': {}} for nombre in rutas}
+    fin = time.perf_counter() + duracion
+    await asyncio.gather(*[
+        _conexion_carga(partes.hostname, partes.port, rutas, fin, random.Random(semilla * 10000 + i), resultados, timeout)
+        for i in range(conexiones)
+    ])
+    return resultados
+
+
+def ejecutar_carga(url_base, rutas, conexiones, duracion, semilla, timeout=30):
+    """
+    Punto de entrada de cada proceso de carga: mantiene `conexiones` clientes
+    concurrentes (una corrutina por cliente) durante `duracion` segundos.
+
+    Args:
+        rutas: nombre de la vista -> lista de rutas GET entre las que se elige al azar
+
+    Returns:
+        dict: nombre -> {'latencias': [segundos], 'estados': {estado HTTP o None: cantidad}}
+    """
+    return asyncio.run(_carga(url_base, rutas, conexiones, duracion, semilla, timeout))
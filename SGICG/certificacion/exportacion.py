@@ -0,0 +1,260 @@
+# certificacion/exportacion.py
+
+import csv
+import logging
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Orden, Item, OrdenArchivada, ItemArchivado
+from .views import OrdenManager
+
+logger = logging.getLogger(__name__)
+
+CHUNK_LECTURA = 2000      # Filas por lectura del cursor
+FILAS_POR_BLOQUE = 500    # Filas CSV por bloque enviado al cliente
+TAMANO_BLOQUE_ARCHIVO = 64 * 1024
+FORMATOS = ('csv', 'xlsx')
+
+ENCABEZADOS = [
+    'Orden', 'Estado', 'Creación', 'Cierre', 'Ítem', 'Etapa del ítem', 'Tipo de certificado',
+    'Qué es', 'Descripción', 'Gema principal', 'Peso (cts)', 'Fecha límite', 'Archivada',
+]
+CAMPOS_ITEM = (
+    'orden__numero_orden_facturacion', 'orden__estado_actual', 'orden__fecha_creacion',
+    'orden__fecha_cierre', 'numero_item', 'etapa', 'tipo_certificado', 'que_es',
+    'texto_para_copiar', 'gema_principal', 'peso_gema', 'fecha_limite_etapa',
+)
+CAMPOS_ITEM_ARCHIVADO = (
+    'orden__numero_orden_facturacion', 'orden__estado_actual', 'orden__fecha_creacion',
+    'orden__fecha_cierre', 'numero_item', 'tipo_certificado', 'que_es',
+    'texto_para_copiar', 'gema_principal', 'peso_gema',
+)
+
+ETIQUETAS_ETAPA = dict(Orden.ETAPAS)
+ETIQUETAS_CERT = dict(Item.TIPO_CERT_CHOICES)
+ETIQUETAS_QUE_ES = dict(Item.QUE_ES_CHOICES)
+
+
+def filtros_exportacion(parametros):
+    """
+    Valida los filtros de exportación recibidos como texto (GET o argumentos
+    del comando).
+
+    Args:
+        parametros: dict con search, etapa, desde y hasta (AAAA-MM-DD, ambos
+                    inclusive), tipo_certificado e historicas
+
+    Returns:
+        dict: Argumentos para ExportadorOrdenes
+
+    Raises:
+        ValueError: Si algún filtro no es válido
+    """
+    filtros = {
+        'search': (parametros.get('search') or '').strip() or None,
+        'etapa': (parametros.get('etapa') or '').strip().upper() or None,
+        'tipo_certificado': (parametros.get('tipo_certificado') or '').strip().upper() or None,
+        'historicas': str(parametros.get('historicas') or '').lower() in ('1', 'true', 'si', 'sí', 'on'),
+        'desde': None,
+        'hasta': None,
+    }
+    if filtros['etapa'] and filtros['etapa'] not in ETIQUETAS_ETAPA:
+        raise ValueError(f"Etapa no válida: {filtros['etapa']}")
+    if filtros['tipo_certificado'] and filtros['tipo_certificado'] not in ETIQUETAS_CERT:
+        raise ValueError(f"Tipo de certificado no válido: {filtros['tipo_certificado']}")
+
+    for clave in ('desde', 'hasta'):
+        valor = (parametros.get(clave) or '').strip()
+        if not valor:
+            continue
+        try:
+            fecha = timezone.make_aware(datetime.strptime(valor, '%Y-%m-%d'))
+        except ValueError:
+            raise ValueError(f"Fecha '{clave}' no válida: {valor} (use AAAA-MM-DD)")
+        filtros[clave] = fecha + timedelta(days=1) if clave == 'hasta' else fecha
+    return filtros
+
+
+def _fecha(valor):
+    """Fecha local sin zona horaria (openpyxl no admite fechas con zona)"""
+    return timezone.localtime(valor).replace(tzinfo=None) if valor else None
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+class ExportadorOrdenes:
+    """
+    Exporta órdenes con sus ítems (una fila por ítem) a CSV o XLSX con memoria
+    constante: lee proyecciones values_list con iterator(chunk_size), sin
+    instanciar modelos, y escribe cada fila según llega.
+
+    Los filtros son los del dashboard (OrdenManager.get_ordenes_con_filtros)
+    más rango de fechas de creación y tipo de certificado. Con historicas se
+    incluyen las órdenes finalizadas y las archivadas.
+    """
+
+    def __init__(self, search=None, etapa=None, desde=None, hasta=None, tipo_certificado=None,
+                 historicas=False, chunk_size=CHUNK_LECTURA):
+        self.search = search
+        self.etapa = etapa
+        self.desde = desde
+        self.hasta = hasta
+        self.tipo_certificado = tipo_certificado
+        self.historicas = historicas
+        self.chunk_size = chunk_size
+        self.resumen = {'filas': 0}
+
+    def _items(self):
+        ordenes = OrdenManager.get_ordenes_con_filtros(
+            self.search, self.etapa,
+            incluir_finalizadas=self.historicas,
+            desde=self.desde, hasta=self.hasta,
+            tipo_certificado=self.tipo_certificado,
+        )
+        return Item.objects.filter(
+            orden_id__in=ordenes.values('id')
+        ).order_by('orden_id', 'numero_item').values_list(*CAMPOS_ITEM)
+
+    def _items_archivados(self):
+        ordenes = OrdenArchivada.objects.all()
+        if self.desde:
+            ordenes = ordenes.filter(fecha_creacion__gte=self.desde)
+        if self.hasta:
+            ordenes = ordenes.filter(fecha_creacion__lt=self.hasta)
+        if self.search:
+            ordenes = ordenes.filter(
+                Q(numero_orden_facturacion__icontains=self.search) |
+                Q(items__gema_principal__icontains=self.search) |
+                Q(items__codigo_referencia__icontains=self.search)
+            )
+        if self.tipo_certificado:
+            ordenes = ordenes.filter(Exists(
+                ItemArchivado.objects.filter(orden=OuterRef('pk'), tipo_certificado=self.tipo_certificado)
+            ))
+        return ItemArchivado.objects.filter(
+            orden_id__in=ordenes.values('id')
+        ).order_by('orden_id', 'numero_item').values_list(*CAMPOS_ITEM_ARCHIVADO)
+
+    def filas(self):
+        """
+        Yields:
+            list: Valores de una fila en el orden de ENCABEZADOS
+        """
+        for (numero, estado, creacion, cierre, numero_item, etapa, tipo_cert, que_es,
+             texto, gema, peso, limite) in self._items().iterator(chunk_size=self.chunk_size):
+            self.resumen['filas'] += 1
+            yield [
+                numero, ETIQUETAS_ETAPA.get(estado, estado), _fecha(creacion), _fecha(cierre),
+                numero_item, ETIQUETAS_ETAPA.get(etapa, etapa), ETIQUETAS_CERT.get(tipo_cert, tipo_cert),
+                ETIQUETAS_QUE_ES.get(que_es, que_es), texto or '', gema or '', peso, _fecha(limite), 'No',
+            ]
+
+        if not self.historicas or (self.etapa and self.etapa != 'FINALIZADA'):
+            return
+        for (numero, estado, creacion, cierre, numero_item, tipo_cert, que_es,
+             texto, gema, peso) in self._items_archivados().iterator(chunk_size=self.chunk_size):
+            self.resumen['filas'] += 1
+            yield [
+                numero, ETIQUETAS_ETAPA.get(estado, estado), _fecha(creacion), _fecha(cierre),
+                numero_item, ETIQUETAS_ETAPA['FINALIZADA'], ETIQUETAS_CERT.get(tipo_cert, tipo_cert),
+                ETIQUETAS_QUE_ES.get(que_es, que_es), texto or '', gema or '', peso, None, 'Sí',
+            ]
+
+    def csv(self):
+        """
+        Yields:
+            str: Bloques de texto CSV (con BOM para que Excel detecte UTF-8)
+        """
+        escritor = csv.writer(_Eco())
+        bloque = ['﻿' + escritor.writerow(ENCABEZADOS)]
+        for fila in self.filas():
+            bloque.append(escritor.writerow([
+                valor.strftime('%Y-%m-%d %H:%M') if isinstance(valor, datetime) else valor
+                for valor in fila
+            ]))
+            if len(bloque) >= FILAS_POR_BLOQUE:
+                yield ''.join(bloque)
+                bloque = []
+        if bloque:
+            yield ''.join(bloque)
+
+    def escribir_xlsx(self, destino):
+        """
+        Escribe un libro XLSX en modo write-only (las filas van a disco, no a memoria).
+
+        Args:
+            destino: ruta o archivo binario
+        """
+        import openpyxl
+
+        libro = openpyxl.Workbook(write_only=True)
+        hoja = libro.create_sheet('Órdenes')
+        hoja.append(ENCABEZADOS)
+        for fila in self.filas():
+            hoja.append(fila)
+        libro.save(destino)
+
+
+def _bloques_archivo(archivo):
+    try:
+        while True:
+            bloque = archivo.read(TAMANO_BLOQUE_ARCHIVO)
+            if not bloque:
+                break
+            yield bloque
+    finally:
+        archivo.close()
+
+
+async def _iterar_async(iterable):
+    """Consume un iterador síncrono bloque a bloque desde el hilo del ORM"""
+    iterador = iter(iterable)
+    while True:
+        bloque = await sync_to_async(next)(iterador, None)
+        if bloque is None:
+            break
+        yield bloque
+
+
+def respuesta_streaming(bloques, content_type, nombre_archivo):
+    """
+    StreamingHttpResponse que envía los bloques según se generan. Bajo ASGI
+    Django consumiría un iterador síncrono completo antes de enviarlo, así que
+    se entrega como iterador asíncrono.
+    """
+    if settings.ASGI:
+        bloques = _iterar_async(bloques)
+    respuesta = StreamingHttpResponse(bloques, content_type=content_type)
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return respuesta
+
+
+def respuesta_xlsx(exportador, nombre_archivo):
+    """
+    Genera el libro en un archivo temporal y lo envía por bloques. El formato
+    ZIP de XLSX no permite enviar nada hasta cerrar el libro.
+    """
+    import tempfile
+
+    temporal = tempfile.TemporaryFile()
+    try:
+        exportador.escribir_xlsx(temporal)
+        temporal.seek(0)
+    except Exception:
+        temporal.close()
+        raise
+    return respuesta_streaming(
+        _bloques_archivo(temporal),
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        nombre_archivo,
+    )
@@ -0,0 +1,310 @@
+# certificacion/extractor_excel.py
+
+import os
+import re
+import hashlib
+import logging
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Item, DatosExcelItem
+from .procesos import crear_pool
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500  # Ítems por lote de escritura en la base de datos
+PESO_MAXIMO = Decimal('999999.999')  # Límite de peso_ct (max_digits=9, decimal_places=3)
+
+# Encabezados de la hoja principal -> campo de DatosExcelItem (en minúsculas)
+MAPA_CAMPOS = {
+    'numero_certificado': ['nc'],
+    'fecha_certificado': ['fecha'],
+    'identificacion': ['id'],
+    'peso_ct': ['pe', 'peso ct', 'peso', 'peso a'],
+    'dimensiones': ['dimensiones', 'dimensiones a', 'diametro promedio', 'gemas'],
+    'color': ['color', 'color 1'],
+    'origen': ['origen'],
+    'tratamiento': ['tratamiento', 'tratam'],
+}
+
+CAMPOS_EXTRAIDOS = list(MAPA_CAMPOS) + ['hoja', 'datos', 'archivo_mtime', 'archivo_hash']
+
+
+def calcular_hash_archivo(ruta):
+    """Calcula el hash SHA-256 del contenido de un archivo"""
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(65536), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _valor_serializable(valor):
+    """Convierte valores de celdas a tipos serializables en JSON"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, str):
+        return valor.strip()
+    return valor
+
+
+def _parse_peso(valor):
+    """
+    Extrae el peso en quilates de un número o un texto como '1.25 ct'.
+    Devuelve None si no es un número finito que quepa en peso_ct.
+    """
+    if valor is None or isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        texto = str(valor)
+    else:
+        coincidencia = re.search(r'\d+(?:[.,]\d+)?', str(valor))
+        if not coincidencia:
+            return None
+        texto = coincidencia.group().replace(',', '.')
+    try:
+        peso = Decimal(texto)
+        if not peso.is_finite():
+            return None
+        peso = peso.quantize(Decimal('0.001'))
+    except InvalidOperation:
+        return None
+    return peso if abs(peso) <= PESO_MAXIMO else None
+
+
+def _parse_fecha(valor):
+    """Convierte el valor de la celda Fecha en date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    if isinstance(valor, str) and valor.strip():
+        try:
+            return date.fromisoformat(valor.strip()[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def mapear_campos(datos):
+    """
+    Obtiene los campos estructurados a partir de los pares encabezado -> valor.
+
+    Returns:
+        dict: Valores para los campos comunes de DatosExcelItem
+    """
+    por_encabezado = {clave.lower(): valor for clave, valor in datos.items()}
+    campos = {}
+
+    for campo, encabezados in MAPA_CAMPOS.items():
+        valor = None
+        for encabezado in encabezados:
+            candidato = por_encabezado.get(encabezado)
+            if campo == 'peso_ct':
+                candidato = _parse_peso(candidato)
+            elif campo == 'fecha_certificado':
+                candidato = _parse_fecha(candidato)
+            elif campo == 'dimensiones' and encabezado == 'gemas' and not isinstance(candidato, str):
+                candidato = None  # En las plantillas Base "Gemas" es la cantidad
+            elif isinstance(candidato, str):
+                candidato = candidato.strip() or None
+            elif candidato is not None:
+                candidato = str(candidato)
+
+            if candidato is not None:
+                valor = candidato
+                break
+
+        if isinstance(valor, str):
+            limite = DatosExcelItem._meta.get_field(campo).max_length
+            valor = valor[:limite]
+        campos[campo] = valor
+
+    return campos
+
+
+def leer_hoja_principal(ruta):
+    """
+    Lee los encabezados (fila 1) y valores (fila 2) de la primera hoja en modo streaming.
+
+    Returns:
+        tuple: (nombre_hoja, dict encabezado -> valor)
+    """
+    import openpyxl
+
+    libro = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        hoja = libro.worksheets[0]
+        filas = hoja.iter_rows(min_row=1, max_row=2, values_only=True)
+        encabezados = next(filas, ())
+        valores = next(filas, ())
+    finally:
+        libro.close()
+
+    datos = {}
+    for indice, encabezado in enumerate(encabezados):
+        if encabezado is None:
+            continue
+        clave = str(encabezado).strip()
+        # Las plantillas repiten encabezados (M1, M2, ...): se agrega sufijo
+        base, sufijo = clave, 2
+        while clave in datos:
+            clave = f"{base} ({sufijo})"
+            sufijo += 1
+        valor = valores[indice] if indice < len(valores) else None
+        datos[clave] = _valor_serializable(valor)
+
+    return hoja.title, datos
+
+
+def procesar_archivo(item_id, ruta, hash_anterior):
+    """
+    Procesa un archivo Excel en un proceso de trabajo (sin acceso al ORM).
+    El mapeo a los campos también se hace aquí, para que un libro con
+    valores inesperados cuente como error de ese ítem y no corte el lote.
+
+    Returns:
+        dict: Resultado con 'estado' = 'extraido', 'sin_cambios' o 'error'
+    """
+    try:
+        mtime = os.stat(ruta).st_mtime
+        hash_actual = calcular_hash_archivo(ruta)
+        if hash_actual == hash_anterior:
+            return {'item_id': item_id, 'estado': 'sin_cambios', 'archivo_mtime': mtime}
+
+        hoja, datos = leer_hoja_principal(ruta)
+        return {
+            'item_id': item_id,
+            'estado': 'extraido',
+            'hoja': hoja,
+            'datos': datos,
+            'campos': mapear_campos(datos),
+            'archivo_mtime': mtime,
+            'archivo_hash': hash_actual,
+        }
+    except Exception as e:
+        return {'item_id': item_id, 'estado': 'error', 'error': str(e)}
+
+
+def ruta_excel_item(orden_id, numero_item, nombre_excel):
+    """Genera la ruta local del Excel de un ítem (la del spool si aún está ahí)"""
+    return default_storage.path(os.path.join(
+        f"ORDEN-{orden_id:04d}",
+        f"ITEM-{numero_item}",
+        nombre_excel
+    ))
+
+
+class ExtractorExcel:
+    """Clase para extraer de forma incremental los datos de los Excel de los ítems"""
+
+    def __init__(self, max_workers=None, forzar=False, tamano_lote=TAMANO_LOTE):
+        self.max_workers = max_workers
+        self.forzar = forzar
+        self.tamano_lote = tamano_lote
+        self.resumen = {'revisados': 0, 'extraidos': 0, 'sin_cambios': 0, 'faltantes': 0, 'errores': []}
+
+    def _candidatos(self, items_queryset):
+        """Genera los ítems cuyo archivo cambió desde la última extracción"""
+        existentes = {
+            d['item_id']: d
+            for d in DatosExcelItem.objects.values('item_id', 'archivo_mtime', 'archivo_hash')
+        }
+
+        filas = items_queryset.exclude(nombre_excel__isnull=True).exclude(nombre_excel='').values_list(
+            'id', 'orden_id', 'numero_item', 'nombre_excel'
+        )
+        for item_id, orden_id, numero_item, nombre_excel in filas.iterator(chunk_size=2000):
+            self.resumen['revisados'] += 1
+            ruta = ruta_excel_item(orden_id, numero_item, nombre_excel)
+            try:
+                mtime = os.stat(ruta).st_mtime
+            except OSError:
+                self.resumen['faltantes'] += 1
+                continue
+
+            anterior = existentes.get(item_id)
+            if anterior and not self.forzar and anterior['archivo_mtime'] == mtime:
+                self.resumen['sin_cambios'] += 1
+                continue
+
+            hash_anterior = None if self.forzar or not anterior else anterior['archivo_hash']
+            yield item_id, ruta, hash_anterior
+
+    def _guardar_lote(self, resultados):
+        """Guarda un lote de resultados con bulk_create / bulk_update"""
+        ids = [r['item_id'] for r in resultados]
+        existentes = DatosExcelItem.objects.in_bulk(ids, field_name='item_id')
+
+        nuevos, actualizados, solo_mtime = [], [], []
+        for r in resultados:
+            registro = existentes.get(r['item_id'])
+
+            if r['estado'] == 'sin_cambios':
+                if registro:
+                    registro.archivo_mtime = r['archivo_mtime']
+                    solo_mtime.append(registro)
+                self.resumen['sin_cambios'] += 1
+                continue
+
+            valores = dict(r['campos'])
+            valores.update(
+                hoja=r['hoja'][:100],
+                datos=r['datos'],
+                archivo_mtime=r['archivo_mtime'],
+                archivo_hash=r['archivo_hash'],
+            )
+            if registro:
+                for campo, valor in valores.items():
+                    setattr(registro, campo, valor)
+                registro.fecha_extraccion = timezone.now()  # bulk_update no aplica auto_now
+                actualizados.append(registro)
+            else:
+                nuevos.append(DatosExcelItem(item_id=r['item_id'], **valores))
+            self.resumen['extraidos'] += 1
+
+        with transaction.atomic():
+            if nuevos:
+                DatosExcelItem.objects.bulk_create(nuevos)
+            if actualizados:
+                DatosExcelItem.objects.bulk_update(actualizados, CAMPOS_EXTRAIDOS + ['fecha_extraccion'])
+            if solo_mtime:
+                DatosExcelItem.objects.bulk_update(solo_mtime, ['archivo_mtime'])
+
+    def ejecutar(self, items_queryset=None):
+        """
+        Extrae los datos de todos los Excel modificados usando un pool de procesos.
+
+        Returns:
+            dict: Resumen con contadores y errores
+        """
+        if items_queryset is None:
+            items_queryset = Item.objects.all()
+
+        candidatos = list(self._candidatos(items_queryset))
+        if not candidatos:
+            return self.resumen
+
+        lote = []
+        with crear_pool(self.max_workers) as executor:
+            item_ids, rutas, hashes = zip(*candidatos)
+            chunksize = max(1, len(candidatos) // ((self.max_workers or os.cpu_count() or 1) * 4))
+            for resultado in executor.map(procesar_archivo, item_ids, rutas, hashes, chunksize=chunksize):
+                if resultado['estado'] == 'error':
+                    self.resumen['errores'].append((resultado['item_id'], resultado['error']))
+                    logger.warning(f"Error al extraer Excel del item {resultado['item_id']}: {resultado['error']}")
+                    continue
+
+                lote.append(resultado)
+                if len(lote) >= self.tamano_lote:
+                    self._guardar_lote(lote)
+                    lote = []
+
+        if lote:
+            self._guardar_lote(lote)
+
+        return self.resumen
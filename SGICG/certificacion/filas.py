@@ -0,0 +1,133 @@
+# certificacion/filas.py
+
+from django.core.files.storage import default_storage
+from django.db.models import F, OuterRef, Subquery
+
+from .models import Orden, Item
+
+# Columnas que usan las plantillas de listado (dashboard y vista por etapa):
+# descripcion_texto, enlaces al Excel, al QR y al PDF de impresión
+CAMPOS_ITEM = (
+    'id', 'orden_id', 'numero_item', 'etapa', 'fecha_limite_etapa', 'que_es',
+    'codigo_referencia', 'tipo_joya', 'metal', 'cantidad_gemas', 'componentes_set',
+    'gema_principal', 'forma_gema', 'peso_gema', 'comentarios', 'nombre_excel',
+    'qr_cargado', 'archivo_impresion',
+)
+CAMPOS_ORDEN = ('id', 'numero_orden_facturacion', 'estado_actual')
+# El dashboard proyecta además la anotación de anotar_limite_entrega
+CAMPOS_ORDEN_DASHBOARD = CAMPOS_ORDEN + ('limite_entrega',)
+
+ETIQUETAS_ETAPA = dict(Orden.ETAPAS)
+
+
+class FilaItem:
+    """
+    Ítem de solo lectura para los listados, construido desde una proyección
+    values_list(*CAMPOS_ITEM). Reutiliza las propiedades del modelo que solo
+    dependen de estos campos.
+    """
+
+    __slots__ = CAMPOS_ITEM + ('orden',)
+
+    descripcion_texto = Item.descripcion_texto
+    unc_path_excel = Item.unc_path_excel
+    url_impresion = Item.url_impresion
+
+    def __init__(self, valores, orden=None):
+        for campo, valor in zip(CAMPOS_ITEM, valores):
+            setattr(self, campo, valor)
+        self.orden = orden
+
+    @property
+    def url_qr(self):
+        """URL del QR cargado, o None"""
+        return default_storage.url(self.qr_cargado) if self.qr_cargado else None
+
+
+class FilaOrden:
+    """
+    Orden de solo lectura para los listados, con sus ítems ya agrupados.
+    limite_entrega queda en None si la proyección no lo incluye.
+    """
+
+    __slots__ = CAMPOS_ORDEN_DASHBOARD + ('items',)
+
+    ETAPAS = Orden.ETAPAS
+    get_proxima_etapa = Orden.get_proxima_etapa
+
+    def __init__(self, valores):
+        self.limite_entrega = None
+        for campo, valor in zip(CAMPOS_ORDEN_DASHBOARD, valores):
+            setattr(self, campo, valor)
+        self.items = []
+
+    def get_estado_actual_display(self):
+        return ETIQUETAS_ETAPA.get(self.estado_actual, self.estado_actual)
+
+    @property
+    def items_etapa(self):
+        # En la vista por etapa solo se agrupan los ítems de la etapa
+        return self.items
+
+    @property
+    def items_sin_excel(self):
+        return [item for item in self.items if not item.nombre_excel]
+
+
+def anotar_limite_entrega(ordenes):
+    """
+    Anota en cada orden la fecha límite más lejana de sus ítems (la entrega
+    final). Es una subconsulta y no un Max sobre el join, porque la búsqueda
+    del dashboard ya une con los ítems y el Max solo vería los que coinciden.
+    """
+    return ordenes.annotate(limite_entrega=Subquery(
+        Item.objects.filter(orden=OuterRef('pk')).order_by(
+            F('fecha_limite_etapa').desc(nulls_last=True)
+        ).values('fecha_limite_etapa')[:1]
+    ))
+
+
+def filas_ordenes(valores_ordenes):
+    """
+    Construye las filas de una página de órdenes con dos consultas de
+    proyección, conservando el orden recibido.
+
+    Args:
+        valores_ordenes: tuplas con los valores de CAMPOS_ORDEN (o CAMPOS_ORDEN_DASHBOARD)
+
+    Returns:
+        list[FilaOrden]
+    """
+    ordenes = {valores[0]: FilaOrden(valores) for valores in valores_ordenes}
+    if ordenes:
+        items = Item.objects.filter(orden_id__in=list(ordenes)).order_by(
+            'orden_id', 'numero_item'
+        ).values_list(*CAMPOS_ITEM)
+        for valores in items:
+            orden = ordenes[valores[1]]
+            orden.items.append(FilaItem(valores, orden))
+    return list(ordenes.values())
+
+
+def filas_etapa(etapa, chunk_size=2000):
+    """
+    Ítems de una etapa por fecha límite, agrupados por orden empezando por la
+    del ítem más urgente.
+
+    Returns:
+        list[FilaOrden]: Cada una con los ítems de la etapa en items_etapa
+    """
+    campos = CAMPOS_ITEM + tuple(f'orden__{campo}' for campo in CAMPOS_ORDEN[1:])
+    items = Item.objects.filter(etapa=etapa).order_by(
+        'fecha_limite_etapa', 'id'
+    ).values_list(*campos)
+
+    ordenes = {}
+    n = len(CAMPOS_ITEM)
+    for valores in items.iterator(chunk_size=chunk_size):
+        orden_id = valores[1]
+        orden = ordenes.get(orden_id)
+        if orden is None:
+            orden = ordenes[orden_id] = FilaOrden((orden_id,) + valores[n:])
+        orden.items.append(FilaItem(valores[:n], orden))
+    return list(ordenes.values())
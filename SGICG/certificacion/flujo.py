@@ -0,0 +1,171 @@
+# certificacion/flujo.py
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import Orden, Item, TransicionEtapa
+from .plazos import expresion_tipo_item
+from .historial import registrar_transicion
+
+logger = logging.getLogger(__name__)
+
+ETAPAS = [clave for clave, _ in Orden.ETAPAS]
+
+
+def etapa_siguiente(etapa):
+    """Etapa que sigue a la indicada, o None si ya es FINALIZADA"""
+    indice = ETAPAS.index(etapa)
+    return ETAPAS[indice + 1] if indice < len(ETAPAS) - 1 else None
+
+
+def etapa_minima(etapas):
+    """Etapa menos avanzada de un conjunto (la etapa de una orden según sus ítems)"""
+    return min(etapas, key=ETAPAS.index)
+
+
+def _entradas(orden, items):
+    """
+    Fecha de entrada de cada ítem a su etapa actual: su última transición hacia
+    ella o, si avanzó junto con la orden antes de registrar ítems, la de la
+    orden. INGRESO empieza con la creación de la orden.
+
+    Returns:
+        dict: {item_id: fecha o None}
+    """
+    por_item = {
+        (fila['item_id'], fila['etapa_destino']): fila['fecha']
+        for fila in TransicionEtapa.objects.filter(item_id__in=[item['id'] for item in items])
+        .values('item_id', 'etapa_destino').annotate(fecha=Max('fecha')).order_by()
+    }
+    por_orden = dict(
+        TransicionEtapa.objects.filter(orden=orden, item__isnull=True)
+        .values('etapa_destino').annotate(fecha=Max('fecha')).order_by()
+        .values_list('etapa_destino', 'fecha')
+    )
+
+    entradas = {}
+    for item in items:
+        entrada = por_item.get((item['id'], item['etapa'])) or por_orden.get(item['etapa'])
+        if entrada is None and item['etapa'] == 'INGRESO':
+            entrada = orden.fecha_creacion
+        entradas[item['id']] = entrada
+    return entradas
+
+
+def avanzar_items(orden, item_ids=None, actor='', fecha=None, etapa=None):
+    """
+    Avanza ítems de una orden a su siguiente etapa. Llamar dentro de una
+    transacción con la orden bloqueada (select_for_update): todos los avances
+    de sus ítems pasan por ese bloqueo.
+
+    Sin item_ids avanzan los ítems que están en la etapa de la orden, es decir,
+    el avance de la orden completa. Con etapa solo avanzan los ítems que
+    siguen en ella: un formulario enviado dos veces, o después de que otro
+    usuario avanzara el ítem, no lo adelanta otra etapa.
+
+    La fecha límite del ítem k es el fin de la cola más el trabajo pendiente de
+    los ítems 1..k, así que cuando el ítem i termina una etapa se resta su
+    tiempo en ella de él y de los ítems que le siguen en la orden. Los ítems
+    que llegan a FINALIZADA pierden la fecha límite.
+
+    La etapa de la orden es la menor de sus ítems: cambia cuando sale el último
+    ítem de esa etapa, y entonces se registra también la transición de la
+    orden (y su resumen diario, ver historial.py).
+
+    Returns:
+        dict: items avanzados, etapa_anterior y etapa de la orden
+    """
+    from .views import TiempoCalculator  # views importa este módulo
+
+    fecha = fecha or timezone.now()
+    items = list(
+        orden.items.annotate(tipo_item_calculado=expresion_tipo_item())
+        .values('id', 'numero_item', 'etapa', 'tipo_item_calculado', 'tipo_certificado')
+        .order_by('numero_item')
+    )
+    etapa_anterior = orden.estado_actual
+    resultado = {'items': 0, 'etapa_anterior': etapa_anterior, 'etapa': etapa_anterior}
+
+    if item_ids is None:
+        avanzan = [item for item in items if item['etapa'] == etapa_anterior]
+    else:
+        seleccion = set(item_ids)
+        avanzan = [item for item in items if item['id'] in seleccion]
+    if etapa is not None:
+        avanzan = [item for item in avanzan if item['etapa'] == etapa]
+    avanzan = [item for item in avanzan if etapa_siguiente(item['etapa'])]
+    if not avanzan and (items or not etapa_siguiente(etapa_anterior)):
+        return resultado
+
+    # Desplazamiento acumulado por número de ítem, agrupado para un UPDATE por valor
+    avanzan_ids = {item['id'] for item in avanzan}
+    por_desplazamiento = defaultdict(list)
+    acumulado = 0
+    for item in items:
+        if item['id'] in avanzan_ids:
+            acumulado += TiempoCalculator.get_tiempo_estimado(
+                item['tipo_item_calculado'], item['tipo_certificado'], item['etapa']
+            )
+        if acumulado:
+            por_desplazamiento[acumulado].append(item['id'])
+
+    for segundos, ids in por_desplazamiento.items():
+        Item.objects.filter(id__in=ids, fecha_limite_etapa__isnull=False).update(
+            fecha_limite_etapa=F('fecha_limite_etapa') - timedelta(seconds=segundos)
+        )
+
+    por_destino = defaultdict(list)
+    for item in avanzan:
+        por_destino[etapa_siguiente(item['etapa'])].append(item['id'])
+    for destino, ids in por_destino.items():
+        campos = {'etapa': destino}
+        if destino == 'FINALIZADA':
+            campos['fecha_limite_etapa'] = None
+        Item.objects.filter(id__in=ids).update(**campos)
+
+    entradas = _entradas(orden, avanzan) if avanzan else {}
+    TransicionEtapa.objects.bulk_create([
+        TransicionEtapa(
+            orden=orden,
+            item_id=item['id'],
+            etapa_origen=item['etapa'],
+            etapa_destino=etapa_siguiente(item['etapa']),
+            fecha=fecha,
+            actor=actor[:150],
+            duracion_segundos=(
+                max(0, int((fecha - entradas[item['id']]).total_seconds()))
+                if entradas[item['id']] else None
+            ),
+        )
+        for item in avanzan
+    ])
+    resultado['items'] = len(avanzan)
+
+    for item in avanzan:
+        item['etapa'] = etapa_siguiente(item['etapa'])
+    # Una orden sin ítems avanza sola, como antes del seguimiento por ítem
+    etapa_orden = etapa_minima(item['etapa'] for item in items) if items else etapa_siguiente(etapa_anterior)
+    if etapa_orden != etapa_anterior:
+        orden.estado_actual = etapa_orden
+        if etapa_orden == 'FINALIZADA':
+            orden.fecha_cierre = fecha
+        orden.save(update_fields=['estado_actual', 'fecha_cierre'])
+
+        tiempos_items = [
+            (
+                item['tipo_item_calculado'],
+                item['tipo_certificado'],
+                TiempoCalculator.get_tiempo_estimado(
+                    item['tipo_item_calculado'], item['tipo_certificado'], etapa_anterior
+                ),
+            )
+            for item in items
+        ]
+        registrar_transicion(orden, etapa_anterior, etapa_orden, tiempos_items, actor=actor, fecha=fecha)
+        resultado['etapa'] = etapa_orden
+
+    return resultado
@@ -2,9 +2,39 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from .models import Orden, ConfiguracionTiempos
+from .models import Orden, ConfiguracionTiempos, OrdenArchivada
 import re
 
+def normalizar_numero_orden(numero):
+    """
+    Valida el formato del número de orden de facturación y lo devuelve en
+    mayúsculas. Lo usan el formulario y la importación masiva.
+
+    Raises:
+        ValidationError: Si el número está vacío, su longitud no es válida o tiene caracteres no permitidos
+    """
+    numero = (numero or '').strip()
+    
+    if not numero:
+        raise ValidationError('El número de orden es obligatorio.')
+    
+    # Validar longitud
+    if len(numero) < 3:
+        raise ValidationError('El número de orden debe tener al menos 3 caracteres.')
+    
+    if len(numero) > 100:
+        raise ValidationError('El número de orden no puede exceder 100 caracteres.')
+    
+    # Validar caracteres permitidos (más restrictivo por seguridad)
+    if not re.match(r'^[A-Za-z0-9\-\._]+$', numero):
+        raise ValidationError(
+            'El número de orden solo puede contener letras, números, guiones, puntos y guiones bajos.'
+        )
+    
+    # Convertir a mayúsculas para consistencia
+    return numero.upper()
+
+
 class OrdenForm(forms.ModelForm):
     """Formulario mejorado para crear órdenes"""
     
@@ -29,33 +59,14 @@ class OrdenForm(forms.ModelForm):
     
     def clean_numero_orden_facturacion(self):
         """Validación mejorada para el número de orden"""
-        numero = self.cleaned_data.get('numero_orden_facturacion', '').strip()
-        
-        if not numero:
-            raise ValidationError('El número de orden es obligatorio.')
-        
-        # Validar longitud
-        if len(numero) < 3:
-            raise ValidationError('El número de orden debe tener al menos 3 caracteres.')
-        
-        if len(numero) > 100:
-            raise ValidationError('El número de orden no puede exceder 100 caracteres.')
-        
-        # Validar caracteres permitidos (más restrictivo por seguridad)
-        if not re.match(r'^[A-Za-z0-9\-\._]+$', numero):
-            raise ValidationError(
-                'El número de orden solo puede contener letras, números, guiones, puntos y guiones bajos.'
-            )
-        
-        # Convertir a mayúsculas para consistencia
-        numero = numero.upper()
+        numero = normalizar_numero_orden(self.cleaned_data.get('numero_orden_facturacion', ''))
         
         # Validar unicidad (excluyendo la instancia actual si es una edición)
         query = Orden.objects.filter(numero_orden_facturacion=numero)
         if self.instance and self.instance.pk:
             query = query.exclude(pk=self.instance.pk)
         
-        if query.exists():
+        if query.exists() or OrdenArchivada.objects.filter(numero_orden_facturacion=numero).exists():
             raise ValidationError(f'Ya existe una orden con el número "{numero}". Debe ser único.')
         
         return numero
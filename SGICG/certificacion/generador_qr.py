@@ -0,0 +1,144 @@
+# certificacion/generador_qr.py
+
+import os
+import hashlib
+import logging
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import Item, get_qr_upload_path
+from .procesos import crear_pool
+
+logger = logging.getLogger(__name__)
+
+URL_VERIFICACION_DEFAULT = 'https://sgicg.local/verificar/{codigo}'
+
+
+def codigo_verificacion(item):
+    """Código que identifica al ítem en el QR (número de certificado si ya se extrajo)"""
+    datos_excel = getattr(item, 'datos_excel', None)
+    if datos_excel and datos_excel.numero_certificado:
+        return datos_excel.numero_certificado
+    return f"{item.orden.numero_orden_facturacion}-{item.numero_item}"
+
+
+def payload_qr(item):
+    """Texto codificado en el QR de un ítem"""
+    plantilla = getattr(settings, 'QR_VERIFICACION_URL', URL_VERIFICACION_DEFAULT)
+    return plantilla.format(codigo=codigo_verificacion(item))
+
+
+def hash_payload(payload):
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def generar_qr_png(payload, destino):
+    """
+    Genera la imagen PNG del QR (proceso de trabajo, sin ORM).
+
+    Returns:
+        str: Ruta del archivo generado
+    """
+    import qrcode
+
+    imagen = qrcode.make(payload, box_size=10, border=2)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as f:
+        imagen.save(f, format='PNG')
+    os.replace(temporal, destino)
+    return destino
+
+
+def eliminar_archivos(nombres):
+    """Elimina archivos reemplazados, por nombre relativo a MEDIA_ROOT (best-effort)"""
+    for nombre in nombres:
+        try:
+            default_storage.delete(nombre)
+        except OSError as e:
+            logger.warning(f"No se pudo eliminar QR anterior {nombre}: {str(e)}")
+
+
+class GeneradorQR:
+    """
+    Clase para generar en lote los códigos QR de los ítems. Con executor se
+    usa ese pool (procesos.pool_compartido() desde las vistas) en lugar de
+    crear uno propio.
+
+    Los QR subidos a mano (qr_cargado sin qr_payload_hash) se conservan
+    salvo con forzar.
+    """
+
+    def __init__(self, max_workers=None, forzar=False, executor=None):
+        self.max_workers = max_workers
+        self.forzar = forzar
+        self.executor = executor
+        self.resumen = {'generados': 0, 'sin_cambios': 0, 'conservados': 0, 'errores': []}
+
+    def ejecutar(self, items_queryset):
+        """
+        Genera los QR cuyo contenido cambió, en paralelo, y actualiza los ítems en un bulk_update.
+
+        Returns:
+            dict: Resumen con contadores y errores
+        """
+        try:
+            import qrcode  # noqa: F401
+        except ImportError:
+            raise ImportError("La generación de QR requiere el paquete 'qrcode' (pip install qrcode)")
+
+        items = items_queryset.select_related('orden', 'datos_excel')
+
+        pendientes = []
+        for item in items:
+            if not self.forzar and item.qr_cargado and item.qr_payload_hash is None:
+                self.resumen['conservados'] += 1
+                continue
+
+            payload = payload_qr(item)
+            hash_hex = hash_payload(payload)
+            if not self.forzar and item.qr_cargado and item.qr_payload_hash == hash_hex:
+                self.resumen['sin_cambios'] += 1
+                continue
+
+            nombre = get_qr_upload_path(item, f"qr_{hash_hex[:12]}.png")
+            pendientes.append((item, payload, hash_hex, nombre))
+
+        if not pendientes:
+            return self.resumen
+
+        actualizados = []
+        reemplazados = []
+        contexto = nullcontext(self.executor) if self.executor else crear_pool(self.max_workers)
+        with contexto as executor:
+            futuros = [
+                (item, hash_hex, nombre, executor.submit(
+                    generar_qr_png, payload, os.path.join(settings.MEDIA_ROOT, nombre)
+                ))
+                for item, payload, hash_hex, nombre in pendientes
+            ]
+            for item, hash_hex, nombre, futuro in futuros:
+                try:
+                    futuro.result()
+                except Exception as e:
+                    self.resumen['errores'].append((item.id, str(e)))
+                    logger.error(f"Error al generar QR para item {item.id}: {str(e)}")
+                    continue
+
+                nombre = nombre.replace(os.sep, '/')
+                if item.qr_cargado and item.qr_cargado.name != nombre:
+                    reemplazados.append(item.qr_cargado.name)
+                item.qr_cargado.name = nombre
+                item.qr_payload_hash = hash_hex
+                actualizados.append(item)
+                self.resumen['generados'] += 1
+
+        with transaction.atomic():
+            Item.objects.bulk_update(actualizados, ['qr_cargado', 'qr_payload_hash'], batch_size=500)
+            # Los archivos anteriores solo se eliminan si la transacción se confirma
+            transaction.on_commit(lambda: eliminar_archivos(reemplazados))
+
+        return self.resumen
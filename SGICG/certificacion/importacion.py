@@ -0,0 +1,357 @@
+# certificacion/importacion.py
+
+import csv
+import io
+import logging
+import os
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .base_datos import transaccion_escritura
+from .cache_niveles import cache_niveles
+from .forms import normalizar_numero_orden
+from .models import Orden, Item, OrdenArchivada
+from .views import (
+    CrearOrdenView, FileManager, OrdenManager, TiempoCalculator, validar_datos_items,
+)
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500  # Órdenes por transacción
+EXTENSIONES = ('.csv', '.xlsx')
+
+# Una fila por ítem; las filas de una misma orden van seguidas
+COLUMNAS = [
+    'numero_orden_facturacion', 'tipo_certificado', 'que_es', 'codigo_referencia',
+    'tipo_joya', 'metal', 'gema_principal', 'forma_gema', 'peso_gema',
+    'cantidad_gemas', 'componentes_set', 'comentarios',
+]
+COLUMNAS_CODIGO = ('tipo_certificado', 'que_es', 'tipo_joya', 'metal')
+ALIAS_COLUMNAS = {
+    'numero_orden': 'numero_orden_facturacion',
+    'orden': 'numero_orden_facturacion',
+}
+
+CANTIDADES = {1: 'individual', 2: 'par', 3: 'trio'}
+
+
+def _normalizar_encabezado(encabezado):
+    clave = str(encabezado or '').strip().lower().replace(' ', '_')
+    return ALIAS_COLUMNAS.get(clave, clave)
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def leer_filas(archivo, nombre):
+    """
+    Recorre en streaming las filas de un CSV (coma, punto y coma o tabulador)
+    o de la primera hoja de un XLSX.
+
+    Args:
+        archivo: archivo binario abierto
+        nombre: nombre del archivo, para elegir el formato por la extensión
+
+    Yields:
+        tuple: (número de fila en el archivo, dict columna -> texto)
+
+    Raises:
+        ValueError: Si el formato no es compatible o falta la columna del número de orden
+    """
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension not in EXTENSIONES:
+        raise ValueError(f"Formato no compatible: {extension or nombre} (use {', '.join(EXTENSIONES)})")
+
+    if extension == '.xlsx':
+        import openpyxl
+
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.worksheets[0].iter_rows(values_only=True)
+            encabezados = [_normalizar_encabezado(e) for e in next(filas, ())]
+            if 'numero_orden_facturacion' not in encabezados:
+                raise ValueError("Falta la columna 'numero_orden_facturacion'")
+            for numero_fila, valores in enumerate(filas, start=2):
+                fila = {
+                    encabezado: _texto(valor)
+                    for encabezado, valor in zip(encabezados, valores) if encabezado in COLUMNAS
+                }
+                if any(fila.values()):
+                    yield numero_fila, fila
+        finally:
+            libro.close()
+        return
+
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(8192)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(texto, dialecto)
+        encabezados = [_normalizar_encabezado(e) for e in next(lector, [])]
+        if 'numero_orden_facturacion' not in encabezados:
+            raise ValueError("Falta la columna 'numero_orden_facturacion'")
+        for valores in lector:
+            fila = {
+                encabezado: _texto(valor)
+                for encabezado, valor in zip(encabezados, valores) if encabezado in COLUMNAS
+            }
+            if any(fila.values()):
+                yield lector.line_num, fila
+    finally:
+        texto.detach()
+
+
+class ImportadorOrdenes:
+    """
+    Importa órdenes con sus ítems desde la exportación del sistema de
+    facturación. Lee el archivo en streaming y procesa las órdenes por lotes:
+    valida con las mismas reglas que el formulario de creación, comprueba en
+    una sola consulta por lote que los números no existan (activos o
+    archivados) e inserta con bulk_create dentro de una transacción.
+
+    Las órdenes se encolan en el orden del archivo, igual que si se crearan
+    una a una. Una orden con cualquier fila inválida se descarta completa y
+    sus errores quedan en el resumen con el número de fila.
+    """
+
+    def __init__(self, tamano_lote=TAMANO_LOTE, simular=False, crear_carpetas=True):
+        self.tamano_lote = tamano_lote
+        self.simular = simular
+        self.crear_carpetas = crear_carpetas
+        self.vista = CrearOrdenView()
+        self.punto_de_partida = None
+        self._duraciones = {}  # (tipo_item, tipo_certificado) -> segundos, durante la importación
+        self.resumen = {'filas': 0, 'ordenes': 0, 'items': 0, 'rechazadas': 0, 'errores': []}
+
+    def _error(self, fila, numero, mensaje):
+        self.resumen['errores'].append({'fila': fila, 'orden': numero, 'error': mensaje})
+
+    def _agrupar(self, filas):
+        """
+        Agrupa filas consecutivas con el mismo número de orden.
+
+        Yields:
+            tuple: (número de orden tal como viene, lista de (fila, datos))
+        """
+        actual, grupo = None, []
+        for numero_fila, fila in filas:
+            self.resumen['filas'] += 1
+            numero = fila.get('numero_orden_facturacion', '')
+            if grupo and numero != actual:
+                yield actual, grupo
+                grupo = []
+            actual = numero
+            grupo.append((numero_fila, fila))
+        if grupo:
+            yield actual, grupo
+
+    def _datos_item(self, fila):
+        """Convierte una fila en el dict que usa CrearOrdenView para crear ítems"""
+        datos = {campo: fila.get(campo, '') for campo in COLUMNAS}
+        for campo in COLUMNAS_CODIGO:
+            datos[campo] = datos[campo].upper().replace(' ', '_')
+        datos['componentes_set'] = [
+            c.strip() for c in datos['componentes_set'].replace(';', ',').split(',') if c.strip()
+        ]
+        cantidad = int(datos['cantidad_gemas']) if datos['cantidad_gemas'].isdigit() else 1
+        datos['cantidad_info'] = {
+            'tipo': CANTIDADES.get(cantidad, 'varios'),
+            'valor': cantidad,
+            'detalle': f'{cantidad} gemas',
+        }
+        return datos
+
+    def _construir_item(self, numero_item, datos):
+        """
+        Crea el Item sin guardarlo, con los mismos campos que el formulario.
+
+        Raises:
+            ValidationError: Si el ítem no pasa las validaciones del modelo
+        """
+        vista = self.vista
+        que_es = datos['que_es']
+        item = Item(
+            numero_item=numero_item,
+            tipo_certificado=datos['tipo_certificado'],
+            que_es=que_es,
+            codigo_referencia=datos['codigo_referencia'] if que_es in ['VERBAL_A_GC', 'REIMPRESION'] else None,
+            tipo_joya=(datos['tipo_joya'] or None) if que_es == 'JOYA' else None,
+            cantidad_gemas=vista._determinar_cantidad_gemas(datos['cantidad_info']),
+            metal=(datos['metal'] or None) if que_es == 'JOYA' else None,
+            componentes_set=vista._format_componentes_set(datos['componentes_set']),
+            gema_principal=datos['gema_principal'] if que_es not in ['VERBAL_A_GC', 'REIMPRESION'] else None,
+            forma_gema=datos['forma_gema'] or 'Ninguno',
+            peso_gema=vista._parse_peso_gema(datos['peso_gema']),
+            comentarios=datos['comentarios'] or None,
+            texto_para_copiar=vista._generar_texto_completo(datos, numero_item),
+        )
+        # Sin full_clean: la unicidad (orden, número) la garantiza la numeración
+        item.clean_fields(exclude=['orden', 'qr_cargado'])
+        item.clean()
+        return item
+
+    def _validar_orden(self, numero, grupo):
+        """
+        Returns:
+            tuple: (número normalizado, lista de Item sin guardar) o None si la orden no es válida
+        """
+        fila_inicial = grupo[0][0]
+        try:
+            numero = normalizar_numero_orden(numero)
+        except ValidationError as e:
+            self._error(fila_inicial, numero, e.messages[0])
+            return None
+
+        datos_items = [self._datos_item(fila) for _, fila in grupo]
+        validacion = validar_datos_items(datos_items)
+        if not validacion['valido']:
+            self._error(fila_inicial, numero, validacion['error'])
+            return None
+
+        items = []
+        for numero_item, ((numero_fila, _), datos) in enumerate(zip(grupo, datos_items), start=1):
+            try:
+                items.append(self._construir_item(numero_item, datos))
+            except ValidationError as e:
+                self._error(numero_fila, numero, f"Ítem {numero_item}: {'; '.join(e.messages)}")
+                return None
+        return numero, items
+
+    def _duracion(self, item):
+        clave = (
+            self.vista._get_item_type_key({'que_es': item.que_es, 'tipo_joya': item.tipo_joya}),
+            item.tipo_certificado,
+        )
+        if clave not in self._duraciones:
+            self._duraciones[clave] = TiempoCalculator.calcular_duracion_total_item(*clave)
+        return self._duraciones[clave]
+
+    def _insertar_lote(self, lote):
+        """
+        Descarta los números ya existentes e inserta el resto del lote.
+
+        Args:
+            lote: lista de (fila, número, items)
+        """
+        numeros = [numero for _, numero, _ in lote]
+        with transaccion_escritura():
+            existentes = set(
+                Orden.objects.filter(numero_orden_facturacion__in=numeros)
+                .values_list('numero_orden_facturacion', flat=True)
+            ) | set(
+                OrdenArchivada.objects.filter(numero_orden_facturacion__in=numeros)
+                .values_list('numero_orden_facturacion', flat=True)
+            )
+
+            nuevas = []
+            for numero_fila, numero, items in lote:
+                if numero in existentes:
+                    self._error(numero_fila, numero, f'Ya existe una orden con el número "{numero}"')
+                    self.resumen['rechazadas'] += 1
+                else:
+                    nuevas.append((numero, items))
+            if not nuevas or self.simular:
+                self.resumen['ordenes'] += len(nuevas)
+                self.resumen['items'] += sum(len(items) for _, items in nuevas)
+                return
+
+            if self.punto_de_partida is None:
+                self.punto_de_partida = OrdenManager.get_ultimo_tiempo_ocupado()
+
+            Orden.objects.bulk_create([
+                Orden(numero_orden_facturacion=numero, estado_actual='INGRESO') for numero, _ in nuevas
+            ])
+            # bulk_create no devuelve PK en todos los backends: se releen por número
+            ids = dict(
+                Orden.objects.filter(numero_orden_facturacion__in=[numero for numero, _ in nuevas])
+                .values_list('numero_orden_facturacion', 'id')
+            )
+
+            # Cada ítem se encola tras el anterior, como en CrearOrdenView
+            todos = []
+            for numero, items in nuevas:
+                for item in items:
+                    self.punto_de_partida += timedelta(seconds=self._duracion(item))
+                    item.orden_id = ids[numero]
+                    item.fecha_limite_etapa = self.punto_de_partida
+                    todos.append(item)
+            Item.objects.bulk_create(todos, batch_size=1000)
+
+        self.resumen['ordenes'] += len(nuevas)
+        self.resumen['items'] += len(todos)
+
+        if self.crear_carpetas:
+            for orden_id in ids.values():
+                try:
+                    FileManager.crear_carpeta_orden(orden_id)
+                except OSError as e:
+                    logger.warning(f"No se pudo crear la carpeta de la orden {orden_id}: {e}")
+
+    def ejecutar(self, archivo, nombre):
+        """
+        Importa el archivo completo.
+
+        Args:
+            archivo: archivo binario abierto (CSV o XLSX)
+            nombre: nombre del archivo
+
+        Returns:
+            dict: Resumen con filas leídas, órdenes e ítems creados, órdenes rechazadas
+                  y errores por fila
+
+        Raises:
+            ValueError: Si el formato del archivo no es compatible
+        """
+        vistos = set()
+        lote = []
+        for numero, grupo in self._agrupar(leer_filas(archivo, nombre)):
+            validada = self._validar_orden(numero, grupo)
+            if validada is None:
+                self.resumen['rechazadas'] += 1
+                continue
+
+            numero, items = validada
+            if numero in vistos:
+                self._error(grupo[0][0], numero, 'Número de orden repetido en el archivo (sus filas deben ir seguidas)')
+                self.resumen['rechazadas'] += 1
+                continue
+            vistos.add(numero)
+
+            lote.append((grupo[0][0], numero, items))
+            if len(lote) >= self.tamano_lote:
+                self._procesar(lote)
+                lote = []
+        if lote:
+            self._procesar(lote)
+        self.resumen['errores'].sort(key=lambda error: error['fila'])
+
+        if self.resumen['ordenes'] and not self.simular:
+            transaction.on_commit(lambda: cache_niveles.invalidar('estadisticas'))
+        logger.info(
+            f"Importación: {self.resumen['ordenes']} órdenes, {self.resumen['items']} ítems, "
+            f"{self.resumen['rechazadas']} rechazadas"
+        )
+        return self.resumen
+
+    def _procesar(self, lote):
+        punto_de_partida = self.punto_de_partida
+        try:
+            self._insertar_lote(lote)
+        except IntegrityError as e:
+            # Otro proceso creó alguno de los números entre la consulta y la inserción
+            logger.error(f"Conflicto al insertar lote de importación: {e}")
+            self.punto_de_partida = punto_de_partida
+            for numero_fila, numero, _ in lote:
+                self._error(numero_fila, numero, 'Conflicto al insertar el lote; vuelva a importar el archivo')
+            self.resumen['rechazadas'] += len(lote)
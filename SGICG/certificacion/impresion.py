@@ -0,0 +1,242 @@
+# certificacion/impresion.py
+
+import os
+import hashlib
+import logging
+import textwrap
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Item, DatosExcelItem
+from .procesos import crear_pool
+
+logger = logging.getLogger(__name__)
+
+VERSION_DISENO = '1'  # Cambiar para invalidar los PDF en cache al modificar el diseño
+CARPETA_IMPRESIONES = 'impresiones'
+
+# Página A4 a 150 dpi
+RESOLUCION = 150
+ANCHO_PAGINA = 1240
+ALTO_PAGINA = 1754
+MARGEN = 90
+
+FUENTES_CANDIDATAS = [
+    'DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    'arial.ttf',
+]
+
+
+def _firma_archivo(ruta):
+    """Firma ligera (ruta, tamaño, mtime) de un archivo de entrada"""
+    if not ruta:
+        return ''
+    try:
+        stat = os.stat(ruta)
+    except OSError:
+        return ''
+    return f"{ruta}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def datos_para_render(item):
+    """
+    Reúne las entradas del certificado de un ítem.
+
+    Requiere el ítem con 'orden' seleccionada y 'fotos' precargadas.
+    """
+    fotos = list(item.fotos.all())
+    foto = fotos[0] if fotos else None
+
+    return {
+        'orden': item.orden.numero_orden_facturacion,
+        'numero_item': item.numero_item,
+        'texto': item.texto_para_copiar or item.descripcion_texto,
+        'tipo_certificado': item.get_tipo_certificado_display(),
+        'ruta_qr': item.qr_cargado.path if item.qr_cargado else None,
+        'ruta_foto': foto.imagen.path if foto else None,
+    }
+
+
+def hash_entradas(datos):
+    """Hash de las entradas que determinan el contenido del PDF"""
+    partes = [
+        VERSION_DISENO,
+        datos['orden'],
+        str(datos['numero_item']),
+        datos['texto'] or '',
+        datos['tipo_certificado'],
+        _firma_archivo(datos['ruta_qr']),
+        _firma_archivo(datos['ruta_foto']),
+    ]
+    return hashlib.sha256('\x1f'.join(partes).encode('utf-8')).hexdigest()
+
+
+def ruta_pdf(hash_hex):
+    """Ruta del artefacto PDF en cache para un hash de entradas"""
+    return os.path.join(settings.MEDIA_ROOT, CARPETA_IMPRESIONES, hash_hex[:2], f"{hash_hex}.pdf")
+
+
+def _cargar_fuente(tamano):
+    from PIL import ImageFont
+
+    for nombre in FUENTES_CANDIDATAS:
+        try:
+            return ImageFont.truetype(nombre, tamano)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=tamano)
+
+
+def _pegar_imagen(pagina, ruta, caja):
+    """Pega una imagen escalada dentro de la caja (x, y, ancho, alto)"""
+    from PIL import Image
+
+    if not ruta:
+        return
+    try:
+        with Image.open(ruta) as imagen:
+            imagen = imagen.convert('RGB')
+            imagen.thumbnail((caja[2], caja[3]))
+            pagina.paste(imagen, (caja[0], caja[1]))
+    except OSError as e:
+        logger.warning(f"No se pudo cargar la imagen {ruta}: {str(e)}")
+
+
+def renderizar_pdf(datos, destino):
+    """
+    Compone el certificado de un ítem y lo guarda como PDF (proceso de trabajo, sin ORM).
+
+    Returns:
+        str: Ruta del PDF generado
+    """
+    from PIL import Image, ImageDraw
+
+    pagina = Image.new('RGB', (ANCHO_PAGINA, ALTO_PAGINA), 'white')
+    dibujo = ImageDraw.Draw(pagina)
+    fuente_titulo = _cargar_fuente(48)
+    fuente_texto = _cargar_fuente(30)
+
+    y = MARGEN
+    dibujo.text((MARGEN, y), datos['tipo_certificado'], fill='black', font=fuente_titulo)
+    y += 80
+    dibujo.text((MARGEN, y), f"Orden {datos['orden']} - Ítem {datos['numero_item']}", fill='black', font=fuente_texto)
+    y += 80
+
+    # Foto a la izquierda, QR a la derecha
+    lado_qr = 320
+    ancho_foto = ANCHO_PAGINA - 3 * MARGEN - lado_qr
+    _pegar_imagen(pagina, datos['ruta_foto'], (MARGEN, y, ancho_foto, ancho_foto))
+    _pegar_imagen(pagina, datos['ruta_qr'], (ANCHO_PAGINA - MARGEN - lado_qr, y, lado_qr, lado_qr))
+    y += ancho_foto + 60
+
+    for parrafo in (datos['texto'] or '').splitlines() or ['']:
+        for linea in textwrap.wrap(parrafo, width=60) or ['']:
+            dibujo.text((MARGEN, y), linea, fill='black', font=fuente_texto)
+            y += 42
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    pagina.save(temporal, 'PDF', resolution=RESOLUCION)
+    os.replace(temporal, destino)
+    return destino
+
+
+def _resolver_reimpresiones(items):
+    """
+    Para ítems REIMPRESION, usa el ítem original cuyo número de certificado
+    coincide con el código de referencia, así se reutiliza su PDF en cache.
+    """
+    codigos = {
+        item.codigo_referencia.strip()
+        for item in items
+        if item.que_es == 'REIMPRESION' and item.codigo_referencia
+    }
+    if not codigos:
+        return {}
+
+    originales = {}
+    datos_excel = DatosExcelItem.objects.filter(numero_certificado__in=codigos).select_related(
+        'item__orden'
+    ).prefetch_related('item__fotos')
+    for registro in datos_excel:
+        originales.setdefault(registro.numero_certificado, registro.item)
+
+    return {
+        item.id: originales[item.codigo_referencia.strip()]
+        for item in items
+        if item.que_es == 'REIMPRESION' and item.codigo_referencia
+        and item.codigo_referencia.strip() in originales
+    }
+
+
+class RenderizadorCertificados:
+    """
+    Clase para renderizar en lote los certificados de impresión. Con executor
+    se usa ese pool (p. ej. procesos.pool_compartido() desde las vistas) en
+    lugar de crear uno propio.
+    """
+
+    def __init__(self, max_workers=None, executor=None):
+        self.max_workers = max_workers
+        self.executor = executor
+        self.resumen = {'renderizados': 0, 'en_cache': 0, 'errores': []}
+
+    def ejecutar(self, items_queryset):
+        """
+        Renderiza los PDF de los ítems en paralelo y reutiliza los que ya están en cache.
+
+        Returns:
+            dict: Resumen con contadores y errores
+        """
+        items = list(items_queryset.select_related('orden').prefetch_related('fotos'))
+        originales = _resolver_reimpresiones(items)
+
+        pendientes = {}  # hash -> datos
+        items_por_hash = {}
+        for item in items:
+            fuente = originales.get(item.id, item)
+            datos = datos_para_render(fuente)
+            hash_hex = hash_entradas(datos)
+            items_por_hash.setdefault(hash_hex, []).append(item)
+
+            if os.path.exists(ruta_pdf(hash_hex)):
+                self.resumen['en_cache'] += 1
+            elif hash_hex not in pendientes:
+                pendientes[hash_hex] = datos
+
+        generados = set()
+        if pendientes:
+            contexto = nullcontext(self.executor) if self.executor else crear_pool(self.max_workers)
+            with contexto as executor:
+                futuros = {
+                    hash_hex: executor.submit(renderizar_pdf, datos, ruta_pdf(hash_hex))
+                    for hash_hex, datos in pendientes.items()
+                }
+                for hash_hex, futuro in futuros.items():
+                    try:
+                        futuro.result()
+                        generados.add(hash_hex)
+                        self.resumen['renderizados'] += 1
+                    except Exception as e:
+                        for item in items_por_hash[hash_hex]:
+                            self.resumen['errores'].append((item.id, str(e)))
+                        logger.error(f"Error al renderizar certificado {hash_hex}: {str(e)}")
+
+        actualizados = []
+        for hash_hex, items_hash in items_por_hash.items():
+            if hash_hex in pendientes and hash_hex not in generados:
+                continue
+            nombre = os.path.relpath(ruta_pdf(hash_hex), settings.MEDIA_ROOT).replace(os.sep, '/')
+            for item in items_hash:
+                if item.archivo_impresion != nombre:
+                    item.archivo_impresion = nombre
+                    actualizados.append(item)
+
+        if actualizados:
+            with transaction.atomic():
+                Item.objects.bulk_update(actualizados, ['archivo_impresion'])
+
+        return self.resumen
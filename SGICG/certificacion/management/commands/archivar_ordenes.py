@@ -0,0 +1,65 @@
+# certificacion/management/commands/archivar_ordenes.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from certificacion.archivo import ArchivadorOrdenes, TAMANO_LOTE
+
+class Command(BaseCommand):
+    help = 'Mueve las órdenes finalizadas hace más de N días a las tablas de archivo histórico.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Antigüedad mínima (días desde el cierre). Por defecto ARCHIVO_DIAS_FINALIZADAS',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help='Órdenes archivadas por transacción',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra lo que se haría sin hacer cambios',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=0,
+            help='Modo programado: repite el archivado cada N segundos (0 = una sola vez)',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING('MODO DRY-RUN: No se harán cambios reales')
+            )
+
+        while True:
+            try:
+                archivador = ArchivadorOrdenes(
+                    dias=options['dias'],
+                    tamano_lote=options['lote'],
+                    dry_run=dry_run,
+                )
+                resumen = archivador.ejecutar()
+            except Exception as e:
+                raise CommandError(f'Error: {str(e)}')
+
+            prefijo = 'DRY-RUN: se archivarían' if dry_run else 'Archivadas'
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{prefijo} {resumen['ordenes']} órdenes "
+                    f"({resumen['items']} ítems, {resumen['fotos']} fotos) "
+                    f"finalizadas hace más de {archivador.dias} días"
+                )
+            )
+
+            if not options['intervalo'] or dry_run:
+                break
+            time.sleep(options['intervalo'])
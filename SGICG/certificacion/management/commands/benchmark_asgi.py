@@ -0,0 +1,271 @@
+# certificacion/management/commands/benchmark_asgi.py
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, redirect_stdout
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from certificacion.cache_niveles import cache_niveles
+from certificacion.estres import ejecutar_carga
+from certificacion.models import Orden, ETAPAS_ACTIVAS
+from certificacion.sinteticos import GeneradorDatosSinteticos
+
+SERVIDORES = ['wsgi', 'asgi']
+VISTAS = ['dashboard', 'estadisticas', 'orden_status', 'plantillas']
+DISTRIBUCION_ACTIVAS = {'INGRESO': 0.3, 'FOTOGRAFIA': 0.2, 'REVISION': 0.2, 'IMPRESION': 0.1, 'FINALIZADA': 0.2}
+
+
+class _ManejadorSilencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class _ServidorWSGI(ThreadedWSGIServer):
+    """Servidor de runserver (un hilo por conexión) con la misma cola de conexiones que uvicorn"""
+    request_queue_size = 2048
+
+
+def _ms(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))] * 1000, 2)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara peticiones por segundo de las vistas de API de solo lectura servidas con WSGI '
+        '(servidor con hilos de runserver) y con ASGI (uvicorn) bajo muchos clientes concurrentes. '
+        'Usa una base de datos de prueba desechable; ASGI requiere "pip install uvicorn".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clientes',
+            type=int,
+            default=200,
+            help='Conexiones concurrentes en total',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=2,
+            help='Procesos que generan la carga (los clientes se reparten entre ellos)',
+        )
+        parser.add_argument(
+            '--duracion',
+            type=float,
+            default=15,
+            help='Segundos de carga por servidor',
+        )
+        parser.add_argument(
+            '--ordenes',
+            type=int,
+            default=5000,
+            help='Órdenes sintéticas en la base de datos de prueba',
+        )
+        parser.add_argument(
+            '--servidores',
+            default=','.join(SERVIDORES),
+            help=f'Servidores a medir, separados por comas ({", ".join(SERVIDORES)})',
+        )
+        parser.add_argument(
+            '--vistas',
+            default=','.join(VISTAS),
+            help=f'Vistas a pedir, separadas por comas ({", ".join(VISTAS)})',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=42,
+            help='Semilla aleatoria de los datos y de los clientes',
+        )
+        parser.add_argument(
+            '--salida',
+            default=None,
+            help='Archivo JSON donde guardar los resultados',
+        )
+
+    @contextmanager
+    def _servidor_wsgi(self):
+        servidor = _ServidorWSGI(('127.0.0.1', 0), _ManejadorSilencioso)
+        servidor.set_app(get_wsgi_application())
+        hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+        hilo.start()
+        try:
+            yield f"http://127.0.0.1:{servidor.server_address[1]}"
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+    @contextmanager
+    def _servidor_asgi(self):
+        import uvicorn
+
+        # Mismo ajuste que SGICG/asgi.py: sin conexiones persistentes por hilo
+        conexion_max_edad = connection.settings_dict['CONN_MAX_AGE']
+        if 'pool' not in connection.settings_dict.get('OPTIONS', {}):
+            connection.settings_dict['CONN_MAX_AGE'] = 0
+
+        socket_servidor = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        socket_servidor.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        socket_servidor.bind(('127.0.0.1', 0))
+        servidor = uvicorn.Server(uvicorn.Config(
+            get_asgi_application(), lifespan='off', log_level='warning', access_log=False,
+        ))
+        hilo = threading.Thread(target=servidor.run, kwargs={'sockets': [socket_servidor]}, daemon=True)
+        hilo.start()
+        try:
+            while not servidor.started:
+                if not hilo.is_alive():
+                    raise CommandError('uvicorn no pudo iniciar')
+                time.sleep(0.05)
+            yield f"http://127.0.0.1:{socket_servidor.getsockname()[1]}"
+        finally:
+            servidor.should_exit = True
+            hilo.join(timeout=30)
+            socket_servidor.close()
+            connection.settings_dict['CONN_MAX_AGE'] = conexion_max_edad
+
+    def _rutas(self, vistas, aleatorio):
+        """Rutas GET de cada vista entre las que eligen los clientes"""
+        activas = list(Orden.objects.filter(estado_actual__in=ETAPAS_ACTIVAS).values_list('id', flat=True))
+        paginas = max(1, min(20, len(activas) // 10))
+        todas = {
+            'dashboard': [f"/api/dashboard/?page={p}" for p in range(1, paginas + 1)],
+            'estadisticas': ['/api/estadisticas/'],
+            'orden_status': [f"/api/orden/{i}/estado/" for i in aleatorio.sample(activas, min(500, len(activas)))],
+            'plantillas': ['/api/plantillas/'],
+        }
+        return {vista: todas[vista] for vista in vistas if todas[vista]}
+
+    def _medir(self, servidor, rutas, opciones):
+        """Somete un servidor a la carga y resume los resultados por vista"""
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Servidor {servidor.upper()}"))
+        contexto = self._servidor_asgi() if servidor == 'asgi' else self._servidor_wsgi()
+
+        procesos = opciones['procesos']
+        por_proceso = [opciones['clientes'] // procesos + (1 if i < opciones['clientes'] % procesos else 0)
+                       for i in range(procesos)]
+
+        # Los prints de las vistas no deben ensuciar la salida del benchmark
+        with contexto as url, redirect_stdout(io.StringIO()):
+            # Calentamiento: importaciones, plantillas y cache de estadísticas
+            ejecutar_carga(url, rutas, 10, 1, opciones['semilla'])
+            with ProcessPoolExecutor(
+                max_workers=procesos, mp_context=multiprocessing.get_context('spawn')
+            ) as executor:
+                futuros = [
+                    executor.submit(ejecutar_carga, url, rutas, n, opciones['duracion'], opciones['semilla'] + p)
+                    for p, n in enumerate(por_proceso) if n
+                ]
+                parciales = [futuro.result() for futuro in futuros]
+
+        por_vista = {}
+        for vista in rutas:
+            latencias = [l for parcial in parciales for l in parcial[vista]['latencias']]
+            estados = {}
+            for parcial in parciales:
+                for estado, n in parcial[vista]['estados'].items():
+                    estados[str(estado)] = estados.get(str(estado), 0) + n
+            errores = sum(n for estado, n in estados.items() if not estado.startswith('2'))
+            por_vista[vista] = {
+                'peticiones': len(latencias),
+                'peticiones_s': round(len(latencias) / opciones['duracion'], 2),
+                'errores': errores,
+                'estados': estados,
+                'p50_ms': _ms(latencias, 50),
+                'p90_ms': _ms(latencias, 90),
+                'p99_ms': _ms(latencias, 99),
+            }
+            self.stdout.write(
+                f"  {vista}: {por_vista[vista]['peticiones_s']} pet/s, p50 {por_vista[vista]['p50_ms']} ms, "
+                f"p99 {por_vista[vista]['p99_ms']} ms, errores {errores}"
+            )
+
+        total = sum(v['peticiones'] for v in por_vista.values())
+        medidas = {
+            'peticiones_s': round(total / opciones['duracion'], 2),
+            'errores': sum(v['errores'] for v in por_vista.values()),
+            'por_vista': por_vista,
+        }
+        self.stdout.write(f"  total: {medidas['peticiones_s']} pet/s, errores {medidas['errores']}")
+        return medidas
+
+    def handle(self, *args, **options):
+        for opcion in ('clientes', 'procesos', 'ordenes'):
+            if options[opcion] < 1:
+                raise CommandError(f'--{opcion} debe ser al menos 1')
+        if options['duracion'] <= 0:
+            raise CommandError('--duracion debe ser positiva')
+
+        servidores = [s.strip() for s in options['servidores'].split(',') if s.strip()]
+        vistas = [v.strip() for v in options['vistas'].split(',') if v.strip()]
+        if not servidores or set(servidores) - set(SERVIDORES):
+            raise CommandError(f"--servidores debe contener valores de: {', '.join(SERVIDORES)}")
+        if not vistas or set(vistas) - set(VISTAS):
+            raise CommandError(f"--vistas debe contener valores de: {', '.join(VISTAS)}")
+        if 'asgi' in servidores and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('uvicorn no está instalado (pip install uvicorn) o use --servidores wsgi')
+
+        aleatorio = random.Random(options['semilla'])
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        try:
+            with tempfile.TemporaryDirectory() as directorio, override_settings(
+                MEDIA_ROOT=directorio,
+                ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['127.0.0.1'],
+                DEBUG=False,
+            ):
+                # Base de prueba en archivo: los hilos del servidor deben compartirla
+                if connection.vendor == 'sqlite':
+                    connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directorio, 'asgi.sqlite3')
+                connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                try:
+                    call_command('crear_tiempos_default', stdout=io.StringIO())
+                    GeneradorDatosSinteticos(
+                        semilla=options['semilla'], distribucion=DISTRIBUCION_ACTIVAS
+                    ).ejecutar(options['ordenes'])
+                    cache_niveles.invalidar('estadisticas')
+                    rutas = self._rutas(vistas, aleatorio)
+                    connection.close()
+
+                    resultados = {servidor: self._medir(servidor, rutas, options) for servidor in servidores}
+                finally:
+                    connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'motor_bd': connection.vendor,
+            'parametros': {k: options[k] for k in ('clientes', 'procesos', 'duracion', 'ordenes', 'semilla')},
+            'resultados': resultados,
+        }
+        if 'wsgi' in resultados and 'asgi' in resultados and resultados['wsgi']['peticiones_s']:
+            informe['asgi_vs_wsgi'] = round(resultados['asgi']['peticiones_s'] / resultados['wsgi']['peticiones_s'], 2)
+            self.stdout.write(f"ASGI/WSGI: {informe['asgi_vs_wsgi']}x peticiones por segundo")
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                json.dump(informe, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Benchmark completado. Resultados en {options['salida']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark completado.'))
@@ -0,0 +1,180 @@
+# certificacion/management/commands/benchmark_indices.py
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from certificacion.models import Orden, Item, ETAPAS_ACTIVAS
+
+INDICES_PARCIALES = ['orden_activa_creacion_idx', 'item_limite_activo_idx']
+
+
+class Rollback(Exception):
+    """Se lanza para deshacer los datos sintéticos al terminar"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara planes de consulta y tiempos de las consultas calientes con y sin los '
+        'índices parciales. Los datos sintéticos se crean en una transacción que se deshace.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=1000000,
+            help='Ítems sintéticos a insertar (0 = usar solo los datos existentes)',
+        )
+        parser.add_argument(
+            '--items-por-orden',
+            type=int,
+            default=4,
+            help='Ítems por orden sintética',
+        )
+        parser.add_argument(
+            '--activas',
+            type=float,
+            default=0.05,
+            help='Fracción de órdenes sintéticas activas (el resto FINALIZADA)',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=20,
+            help='Repeticiones por consulta para medir el tiempo',
+        )
+
+    def _consultas(self):
+        ahora = timezone.now()
+        return {
+            'ultimo_tiempo_ocupado': lambda: Item.objects.filter(
+                orden__estado_actual__in=ETAPAS_ACTIVAS,
+                fecha_limite_etapa__isnull=False
+            ).aggregate(max_fecha=Max('fecha_limite_etapa')),
+            'ordenes_activas_por_creacion': lambda: list(Orden.objects.filter(
+                estado_actual__in=ETAPAS_ACTIVAS,
+                fecha_cierre__isnull=True
+            ).order_by('fecha_creacion').values_list('id', flat=True)[:50]),
+            'items_retrasados': lambda: Item.objects.filter(
+                orden__estado_actual__in=ETAPAS_ACTIVAS,
+                fecha_limite_etapa__isnull=False,
+                fecha_limite_etapa__lt=ahora
+            ).count(),
+        }
+
+    def _explicar(self, nombre, etiqueta):
+        """
+        Plan de consulta de la versión QuerySet de cada consulta. La etiqueta hace
+        único el SQL para que la cache de sentencias no devuelva un plan obsoleto.
+        """
+        querysets = {
+            'ultimo_tiempo_ocupado': Item.objects.filter(
+                orden__estado_actual__in=ETAPAS_ACTIVAS,
+                fecha_limite_etapa__isnull=False
+            ).values('fecha_limite_etapa').order_by('-fecha_limite_etapa')[:1],
+            'ordenes_activas_por_creacion': Orden.objects.filter(
+                estado_actual__in=ETAPAS_ACTIVAS,
+                fecha_cierre__isnull=True
+            ).order_by('fecha_creacion')[:50],
+            'items_retrasados': Item.objects.filter(
+                orden__estado_actual__in=ETAPAS_ACTIVAS,
+                fecha_limite_etapa__isnull=False,
+                fecha_limite_etapa__lt=timezone.now()
+            ).order_by(),
+        }
+        sql, params = querysets[nombre].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql} /* {etiqueta} */", params)
+            return '\n'.join(' '.join(str(columna) for columna in fila) for fila in cursor.fetchall())
+
+    def _medir(self, repeticiones, etiqueta):
+        resultados = {}
+        for nombre, consulta in self._consultas().items():
+            consulta()  # Calentar cache de páginas
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                consulta()
+                tiempos.append(time.perf_counter() - inicio)
+            tiempos.sort()
+            resultados[nombre] = {
+                'plan': self._explicar(nombre, etiqueta),
+                'mediana_ms': tiempos[len(tiempos) // 2] * 1000,
+            }
+        return resultados
+
+    def _generar_datos(self, total_items, items_por_orden, fraccion_activas):
+        """Inserta órdenes e ítems sintéticos (dentro de la transacción actual)"""
+        ahora = timezone.now()
+        total_ordenes = max(1, total_items // items_por_orden)
+        aleatorio = random.Random(42)
+        lote = 5000
+
+        self.stdout.write(f"Generando {total_ordenes} órdenes y {total_items} ítems sintéticos...")
+        for inicio in range(0, total_ordenes, lote):
+            fin = min(inicio + lote, total_ordenes)
+            ordenes = []
+            for n in range(inicio, fin):
+                activa = aleatorio.random() < fraccion_activas
+                ordenes.append(Orden(
+                    numero_orden_facturacion=f"BENCH-{n:08d}",
+                    estado_actual=aleatorio.choice(ETAPAS_ACTIVAS) if activa else 'FINALIZADA',
+                    fecha_cierre=None if activa else ahora - timedelta(days=aleatorio.randint(1, 900)),
+                ))
+            Orden.objects.bulk_create(ordenes)
+            creadas = Orden.objects.filter(
+                numero_orden_facturacion__in=[o.numero_orden_facturacion for o in ordenes]
+            ).values_list('id', 'estado_actual')
+
+            items = []
+            for orden_id, estado in creadas:
+                activa = estado != 'FINALIZADA'
+                for numero in range(1, items_por_orden + 1):
+                    items.append(Item(
+                        orden_id=orden_id,
+                        numero_item=numero,
+                        etapa=estado,
+                        gema_principal='Rubí',
+                        fecha_limite_etapa=(
+                            ahora + timedelta(hours=aleatorio.randint(-48, 240)) if activa else None
+                        ),
+                    ))
+            Item.objects.bulk_create(items, batch_size=lote)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _imprimir(self, titulo, resultados):
+        self.stdout.write(self.style.MIGRATE_HEADING(titulo))
+        for nombre, datos in resultados.items():
+            self.stdout.write(f"  {nombre}: {datos['mediana_ms']:.2f} ms")
+            for linea in datos['plan'].splitlines():
+                self.stdout.write(f"      {linea}")
+
+    def handle(self, *args, **options):
+        if options['items_por_orden'] < 1:
+            raise CommandError('--items-por-orden debe ser al menos 1')
+
+        try:
+            with transaction.atomic():
+                if options['items']:
+                    self._generar_datos(options['items'], options['items_por_orden'], options['activas'])
+
+                con_indices = self._medir(options['repeticiones'], 'con_indices')
+
+                with connection.cursor() as cursor:
+                    for nombre in INDICES_PARCIALES:
+                        cursor.execute(f"DROP INDEX {connection.ops.quote_name(nombre)}")
+                sin_indices = self._medir(options['repeticiones'], 'sin_indices')
+
+                self._imprimir('ANTES (sin índices parciales)', sin_indices)
+                self._imprimir('DESPUÉS (con índices parciales)', con_indices)
+
+                raise Rollback()
+        except Rollback:
+            self.stdout.write(self.style.SUCCESS('Benchmark completado. Los cambios se deshicieron.'))
@@ -0,0 +1,216 @@
+# certificacion/management/commands/benchmark_sqlite.py
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import redirect_stdout
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from certificacion.models import Orden
+from certificacion.sinteticos import GeneradorDatosSinteticos
+
+# Configuración por defecto de Django: journal en modo DELETE, BEGIN diferido y una conexión por petición
+PERFIL_BASE = {
+    'pragmas': {'journal_mode': 'DELETE'},
+    'escritura_inmediata': False,
+    'reutilizar_conexiones': False,
+}
+
+DISTRIBUCION_ACTIVAS = {'INGRESO': 0.4, 'FOTOGRAFIA': 0.3, 'REVISION': 0.3}
+
+
+def _percentil_ms(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))] * 1000, 2)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el rendimiento de lectura/escritura concurrente con la configuración SQLite '
+        'por defecto (antes) y con el perfil de producción de settings (después). '
+        'Cada fase usa su propia base de datos temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=8,
+            help='Hilos cliente concurrentes',
+        )
+        parser.add_argument(
+            '--duracion',
+            type=float,
+            default=10,
+            help='Segundos de carga por fase',
+        )
+        parser.add_argument(
+            '--escrituras',
+            type=float,
+            default=0.3,
+            help='Fracción de peticiones de escritura (avanzar etapa / crear orden)',
+        )
+        parser.add_argument(
+            '--ordenes',
+            type=int,
+            default=2000,
+            help='Órdenes sintéticas activas en cada base de datos',
+        )
+        parser.add_argument(
+            '--salida',
+            default=None,
+            help='Archivo JSON donde guardar los resultados',
+        )
+
+    def _trabajador(self, indice, orden_ids, perfil, opciones, fin, resultados, lock):
+        aleatorio = random.Random(indice)
+        client = Client()
+        propios = []
+        creadas = 0
+
+        while time.perf_counter() < fin:
+            escritura = aleatorio.random() < opciones['escrituras']
+            client.cookies.clear()  # Solo cuentan los mensajes de esta petición
+            inicio = time.perf_counter()
+            if not escritura:
+                respuesta = client.get(reverse('detalle_orden', args=[aleatorio.choice(orden_ids)]))
+            elif aleatorio.random() < 0.8:
+                respuesta = client.post(reverse('avanzar_etapa', args=[aleatorio.choice(orden_ids)]))
+            else:
+                creadas += 1
+                respuesta = client.post(reverse('crear_orden'), {
+                    'numero_orden_facturacion': f"BSQL-{indice:02d}-{creadas:06d}",
+                    'tipo_certificado': ['GC_SENCILLA'], 'que_es': ['PIEDRA'], 'codigo_referencia': [''],
+                    'gema_principal': ['Zafiro'], 'forma_gema': ['Óvalo'], 'peso_gema': ['1.10'],
+                })
+            duracion = time.perf_counter() - inicio
+
+            mensajes = [(m.level_tag, str(m)) for m in get_messages(respuesta.wsgi_request)]
+            propios.append({
+                'escritura': escritura,
+                'duracion': duracion,
+                'error': respuesta.status_code >= 500 or any(nivel == 'error' for nivel, _ in mensajes),
+                'bloqueo': any('locked' in texto for _, texto in mensajes),
+            })
+
+            # Sin CONN_MAX_AGE cada petición abre y cierra su conexión
+            if not perfil['reutilizar_conexiones']:
+                connection.close()
+
+        connection.close()
+        with lock:
+            resultados.extend(propios)
+
+    def _fase(self, nombre, perfil, directorio, opciones):
+        """Crea una base de datos temporal con el perfil indicado y la somete a carga"""
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Fase {nombre}"))
+        nombre_original = connection.settings_dict['NAME']
+        ajustes_prueba = connection.settings_dict.setdefault('TEST', {})
+        nombre_prueba_original = ajustes_prueba.get('NAME')
+        ajustes_prueba['NAME'] = os.path.join(directorio, f"{nombre}.sqlite3")
+
+        with override_settings(
+            SQLITE_PRAGMAS=perfil['pragmas'],
+            SQLITE_ESCRITURA_INMEDIATA=perfil['escritura_inmediata'],
+        ):
+            connection.close()
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                call_command('crear_tiempos_default', stdout=io.StringIO())
+                GeneradorDatosSinteticos(distribucion=DISTRIBUCION_ACTIVAS, fotos_por_item=(0, 1)).ejecutar(
+                    opciones['ordenes']
+                )
+                orden_ids = list(Orden.objects.values_list('id', flat=True))
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    modo = cursor.fetchone()[0]
+                connection.close()
+
+                resultados = []
+                lock = threading.Lock()
+                fin = time.perf_counter() + opciones['duracion']
+                hilos = [
+                    threading.Thread(
+                        target=self._trabajador,
+                        args=(i, orden_ids, perfil, opciones, fin, resultados, lock),
+                    )
+                    for i in range(opciones['hilos'])
+                ]
+                # Los prints de las vistas no deben ensuciar la salida del benchmark
+                with redirect_stdout(io.StringIO()):
+                    for hilo in hilos:
+                        hilo.start()
+                    for hilo in hilos:
+                        hilo.join()
+            finally:
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+                ajustes_prueba['NAME'] = nombre_prueba_original
+
+        lecturas = [r for r in resultados if not r['escritura']]
+        escrituras = [r for r in resultados if r['escritura']]
+        medidas = {
+            'journal_mode': modo,
+            'perfil': perfil,
+            'lecturas_s': round(len(lecturas) / opciones['duracion'], 2),
+            'escrituras_s': round(len(escrituras) / opciones['duracion'], 2),
+            'lectura_p50_ms': _percentil_ms([r['duracion'] for r in lecturas], 50),
+            'lectura_p99_ms': _percentil_ms([r['duracion'] for r in lecturas], 99),
+            'escritura_p50_ms': _percentil_ms([r['duracion'] for r in escrituras], 50),
+            'escritura_p99_ms': _percentil_ms([r['duracion'] for r in escrituras], 99),
+            'errores': sum(1 for r in resultados if r['error']),
+            'errores_bloqueo': sum(1 for r in resultados if r['bloqueo']),
+        }
+        self.stdout.write(
+            f"  journal_mode={modo}: lecturas {medidas['lecturas_s']}/s "
+            f"(p99 {medidas['lectura_p99_ms']} ms), escrituras {medidas['escrituras_s']}/s "
+            f"(p99 {medidas['escritura_p99_ms']} ms), errores {medidas['errores']} "
+            f"(bloqueos {medidas['errores_bloqueo']})"
+        )
+        return medidas
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Este benchmark solo aplica a SQLite')
+        if options['hilos'] < 1 or options['duracion'] <= 0 or options['ordenes'] < 1:
+            raise CommandError('--hilos, --duracion y --ordenes deben ser positivos')
+        if not 0 <= options['escrituras'] <= 1:
+            raise CommandError('--escrituras debe estar entre 0 y 1')
+
+        perfil_produccion = {
+            'pragmas': getattr(settings, 'SQLITE_PRAGMAS', {}),
+            'escritura_inmediata': getattr(settings, 'SQLITE_ESCRITURA_INMEDIATA', True),
+            'reutilizar_conexiones': True,
+        }
+
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as directorio, override_settings(MEDIA_ROOT=directorio):
+                informe = {
+                    'hilos': options['hilos'],
+                    'duracion_s': options['duracion'],
+                    'fraccion_escrituras': options['escrituras'],
+                    'antes': self._fase('antes', PERFIL_BASE, directorio, options),
+                    'despues': self._fase('despues', perfil_produccion, directorio, options),
+                }
+        finally:
+            teardown_test_environment()
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                json.dump(informe, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Benchmark completado. Resultados en {options['salida']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark completado.'))
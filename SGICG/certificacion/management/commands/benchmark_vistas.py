@@ -0,0 +1,268 @@
+# certificacion/management/commands/benchmark_vistas.py
+import io
+import json
+import platform
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from certificacion.models import Orden, Item, FotoItem, ETAPAS_ACTIVAS
+from certificacion.sinteticos import GeneradorDatosSinteticos, parsear_distribucion
+
+ESCALAS_DEFAULT = '1000,10000,100000'
+VISTAS = ['dashboard', 'vista_etapa_ingreso', 'vista_etapa_impresion', 'crear_orden', 'avanzar_etapa']
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not valores_ordenados:
+        return None
+    indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados) + 0.5) - 1))
+    return valores_ordenados[indice]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p90/p99) y número de consultas de las vistas principales a varias '
+        'escalas de órdenes sintéticas. Usa una base de datos de prueba desechable.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--escalas',
+            default=ESCALAS_DEFAULT,
+            help='Números de órdenes a medir, separados por comas (crecen de forma incremental)',
+        )
+        parser.add_argument(
+            '--repeticiones',
+            type=int,
+            default=10,
+            help='Peticiones medidas por vista y escala',
+        )
+        parser.add_argument(
+            '--vistas',
+            default=','.join(VISTAS),
+            help=f'Vistas a medir, separadas por comas ({", ".join(VISTAS)})',
+        )
+        parser.add_argument(
+            '--distribucion',
+            default=None,
+            help='Pesos por etapa de los datos sintéticos, ej. "INGRESO=0.3,FINALIZADA=0.7"',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=42,
+            help='Semilla aleatoria de los datos y de la selección de órdenes',
+        )
+        parser.add_argument(
+            '--memoria',
+            action='store_true',
+            help='Mide también con tracemalloc el pico de memoria asignada por petición '
+                 '(en una pasada aparte, porque tracemalloc ralentiza las peticiones)',
+        )
+        parser.add_argument(
+            '--salida',
+            default=None,
+            help='Archivo JSON donde guardar los resultados para compararlos entre versiones',
+        )
+
+    def _peticiones(self, client, aleatorio, escala):
+        """Funciones que ejecutan una petición de cada vista"""
+        contador = {'n': 0}
+
+        def crear_orden():
+            contador['n'] += 1
+            return client.post(reverse('crear_orden'), {
+                'numero_orden_facturacion': f"BENCH-{escala}-{contador['n']:06d}",
+                'tipo_certificado': ['GC_SENCILLA', 'ESCRITO', 'DIAMANTE'],
+                'que_es': ['JOYA', 'PIEDRA', 'REIMPRESION'],
+                'codigo_referencia': ['', '', 'GC-000123'],
+                'tipo_joya': ['ANILLO', '', ''],
+                'metal': ['ORO', '', ''],
+                'gema_principal': ['Esmeralda', 'Zafiro', ''],
+                'forma_gema': ['Óvalo', 'Redonda', ''],
+                'peso_gema': ['1.25', '0.80', ''],
+                'comentarios': ['', '', ''],
+                'cantidad_gc_group_1': '1',
+                'cantidad_escrito_chk_2': ['1', '2'],
+            })
+
+        def avanzar_etapa():
+            # Órdenes activas que no pasan a FINALIZADA, para no agotar las activas
+            orden_id = aleatorio.choice(candidatas)
+            return client.post(reverse('avanzar_etapa', args=[orden_id]))
+
+        candidatas = list(
+            Orden.objects.filter(estado_actual__in=ETAPAS_ACTIVAS[:-1]).values_list('id', flat=True)[:1000]
+        )
+
+        peticiones = {
+            'dashboard': lambda: client.get(reverse('dashboard')),
+            'vista_etapa_ingreso': lambda: client.get(reverse('vista_etapa', args=['ingreso'])),
+            'vista_etapa_impresion': lambda: client.get(reverse('vista_etapa', args=['impresion'])),
+            'crear_orden': crear_orden,
+        }
+        if candidatas:
+            peticiones['avanzar_etapa'] = avanzar_etapa
+        return peticiones
+
+    def _medir_memoria(self, peticion, repeticiones):
+        """Pico de memoria asignada (KiB) durante cada petición, incluido el render"""
+        picos = []
+        with redirect_stdout(io.StringIO()):
+            tracemalloc.start()
+            try:
+                for _ in range(repeticiones):
+                    tracemalloc.reset_peak()
+                    base = tracemalloc.get_traced_memory()[0]
+                    respuesta = peticion()
+                    picos.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+                    del respuesta
+            finally:
+                tracemalloc.stop()
+        return {
+            'memoria_pico_kib_mediana': round(statistics.median(picos), 1),
+            'memoria_pico_kib_max': round(max(picos), 1),
+        }
+
+    def _medir_vista(self, peticion, repeticiones):
+        # Los prints de las vistas no deben ensuciar la salida del benchmark
+        with redirect_stdout(io.StringIO()):
+            peticion()  # Calentamiento
+
+            tiempos = []
+            consultas = []
+            estados = set()
+            for _ in range(repeticiones):
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    respuesta = peticion()
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                consultas.append(len(capturadas.captured_queries))
+                estados.add(respuesta.status_code)
+
+        tiempos.sort()
+        return {
+            'p50_ms': round(percentil(tiempos, 50), 3),
+            'p90_ms': round(percentil(tiempos, 90), 3),
+            'p99_ms': round(percentil(tiempos, 99), 3),
+            'media_ms': round(statistics.fmean(tiempos), 3),
+            'max_ms': round(tiempos[-1], 3),
+            'consultas_mediana': statistics.median(consultas),
+            'consultas_max': max(consultas),
+            'codigos_http': sorted(estados),
+        }
+
+    def _ejecutar(self, escalas, vistas, repeticiones, distribucion, semilla, memoria=False):
+        generador = GeneradorDatosSinteticos(semilla=semilla, distribucion=distribucion, prefijo='BSINT')
+        aleatorio = random.Random(semilla)
+        client = Client()
+        resultados = []
+
+        for escala in escalas:
+            faltantes = escala - generador.resumen['ordenes']
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Escala {escala} órdenes"))
+            if faltantes > 0:
+                self.stdout.write(f"  Generando {faltantes} órdenes sintéticas...")
+                generador.ejecutar(faltantes)
+            with connection.cursor() as cursor:
+                if connection.vendor == 'sqlite':
+                    cursor.execute('ANALYZE')
+
+            peticiones = self._peticiones(client, aleatorio, escala)
+            medidas = {}
+            for nombre in vistas:
+                if nombre not in peticiones:
+                    self.stdout.write(self.style.WARNING(f"  {nombre}: sin datos para medir, se omite"))
+                    continue
+                medidas[nombre] = self._medir_vista(peticiones[nombre], repeticiones)
+                if memoria:
+                    medidas[nombre].update(self._medir_memoria(peticiones[nombre], repeticiones))
+                m = medidas[nombre]
+                linea = (
+                    f"  {nombre}: p50 {m['p50_ms']:.1f} ms, p90 {m['p90_ms']:.1f} ms, "
+                    f"p99 {m['p99_ms']:.1f} ms, consultas {m['consultas_mediana']}"
+                )
+                if memoria:
+                    linea += f", memoria pico {m['memoria_pico_kib_mediana']:.0f} KiB"
+                self.stdout.write(linea)
+
+            resultados.append({
+                'ordenes': Orden.objects.count(),
+                'ordenes_activas': Orden.objects.filter(estado_actual__in=ETAPAS_ACTIVAS).count(),
+                'items': Item.objects.count(),
+                'fotos': FotoItem.objects.count(),
+                'vistas': medidas,
+            })
+
+        return resultados
+
+    def handle(self, *args, **options):
+        try:
+            escalas = sorted({int(e) for e in options['escalas'].split(',') if e.strip()})
+        except ValueError:
+            raise CommandError('--escalas debe ser una lista de enteros separados por comas')
+        if not escalas or escalas[0] < 1:
+            raise CommandError('Las escalas deben ser enteros positivos')
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser al menos 1')
+
+        vistas = [v.strip() for v in options['vistas'].split(',') if v.strip()]
+        desconocidas = set(vistas) - set(VISTAS)
+        if desconocidas:
+            raise CommandError(f"Vistas no válidas: {', '.join(sorted(desconocidas))}")
+
+        distribucion = None
+        if options['distribucion']:
+            try:
+                distribucion = parsear_distribucion(options['distribucion'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        # Base de datos de prueba desechable: los datos reales no se tocan
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            call_command('crear_tiempos_default', stdout=io.StringIO())
+            with tempfile.TemporaryDirectory() as media_temporal, override_settings(MEDIA_ROOT=media_temporal):
+                resultados = self._ejecutar(
+                    escalas, vistas, options['repeticiones'], distribucion, options['semilla'],
+                    memoria=options['memoria'],
+                )
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            teardown_test_environment()
+
+        informe = {
+            'fecha': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'motor_bd': connection.vendor,
+            'semilla': options['semilla'],
+            'repeticiones': options['repeticiones'],
+            'distribucion': distribucion,
+            'escalas': resultados,
+        }
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                json.dump(informe, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Benchmark completado. Resultados en {options['salida']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark completado.'))
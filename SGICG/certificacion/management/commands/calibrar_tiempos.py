@@ -0,0 +1,143 @@
+# certificacion/management/commands/calibrar_tiempos.py
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from certificacion.calibracion import CalibradorTiempos, ESTIMADORES
+from certificacion.plazos import MotorRecalculoPlazos
+
+
+def _horas(segundos):
+    return f"{segundos / 3600:.2f}h"
+
+
+class Command(BaseCommand):
+    help = (
+        'Propone tiempos por tipo de ítem, certificado y etapa a partir de las órdenes finalizadas '
+        '(mediana/p80 observados) y muestra la diferencia con la configuración actual. '
+        'Con --aplicar guarda los valores propuestos. Requiere numpy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--estimador',
+            choices=sorted(ESTIMADORES),
+            default='p80',
+            help='Estadístico usado como propuesta (por defecto p80)',
+        )
+        parser.add_argument(
+            '--min-muestras',
+            type=int,
+            default=30,
+            help='Observaciones mínimas para proponer un valor',
+        )
+        parser.add_argument(
+            '--desde',
+            default=None,
+            help='Solo órdenes cerradas desde esta fecha (AAAA-MM-DD)',
+        )
+        parser.add_argument(
+            '--redondeo',
+            type=int,
+            default=60,
+            help='Redondea las propuestas a múltiplos de estos segundos',
+        )
+        parser.add_argument(
+            '--todos',
+            action='store_true',
+            help='Lista también las combinaciones sin cambio o sin muestras suficientes',
+        )
+        parser.add_argument(
+            '--aplicar',
+            action='store_true',
+            help='Guarda los valores propuestos en ConfiguracionTiempos',
+        )
+        parser.add_argument(
+            '--recalcular',
+            action='store_true',
+            help='Con --aplicar, ajusta también las fechas límite de las órdenes en curso',
+        )
+        parser.add_argument(
+            '--salida',
+            default=None,
+            help='Archivo JSON donde guardar el informe',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['desde']:
+            try:
+                desde = timezone.make_aware(datetime.strptime(options['desde'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--desde debe tener el formato AAAA-MM-DD')
+        if options['min_muestras'] < 1 or options['redondeo'] < 1:
+            raise CommandError('--min-muestras y --redondeo deben ser al menos 1')
+        if options['recalcular'] and not options['aplicar']:
+            raise CommandError('--recalcular requiere --aplicar')
+
+        try:
+            calibrador = CalibradorTiempos(
+                estimador=options['estimador'],
+                min_muestras=options['min_muestras'],
+                desde=desde,
+                redondeo=options['redondeo'],
+            )
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        propuestas = calibrador.ejecutar()
+        resumen = calibrador.resumen
+        self.stdout.write(
+            f"Órdenes: {resumen['ordenes']} ({resumen['ordenes_con_transiciones']} con transiciones por etapa), "
+            f"ítems: {resumen['items']}. Lectura {resumen['segundos_lectura']}s, cálculo {resumen['segundos_calculo']}s"
+        )
+
+        cambios = [p for p in propuestas if p['propuesto'] is not None and p['propuesto'] != p['actual']]
+        listadas = propuestas if options['todos'] else cambios
+        if listadas:
+            self.stdout.write(
+                f"{'Tipo':<7} {'Certificado':<12} {'Etapa':<11} {'n':>7} {'Actual':>8} "
+                f"{'p50':>8} {'p80':>8} {'Propuesto':>9} {'Cambio':>8}"
+            )
+        for p in listadas:
+            propuesto = _horas(p['propuesto']) if p['propuesto'] is not None else '-'
+            cambio = f"{p['cambio_pct']:+.1f}%" if p['cambio_pct'] is not None else '-'
+            self.stdout.write(
+                f"{p['tipo_item']:<7} {p['tipo_certificado']:<12} {p['etapa']:<11} {p['muestras']:>7} "
+                f"{_horas(p['actual']):>8} {_horas(p['p50']):>8} {_horas(p['p80']):>8} {propuesto:>9} {cambio:>8}"
+            )
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'fecha': timezone.now().isoformat(),
+                    'estimador': options['estimador'],
+                    'min_muestras': options['min_muestras'],
+                    'desde': options['desde'],
+                    'resumen': resumen,
+                    'propuestas': propuestas,
+                }, f, indent=2, ensure_ascii=False)
+
+        if not cambios:
+            self.stdout.write(self.style.SUCCESS('La configuración actual coincide con lo observado.'))
+            return
+
+        if not options['aplicar']:
+            self.stdout.write(self.style.SUCCESS(
+                f"{len(cambios)} valores a cambiar. Ejecute con --aplicar para guardarlos."
+            ))
+            return
+
+        actualizadas, recalculo = calibrador.aplicar(propuestas)
+        self.stdout.write(self.style.SUCCESS(f"Configuraciones actualizadas: {actualizadas}"))
+        if recalculo and options['recalcular']:
+            resultado = MotorRecalculoPlazos(recalculo).ejecutar()
+            self.stdout.write(
+                f"Fechas límite recalculadas: {resultado['items']} ítems de {resultado['ordenes']} órdenes"
+            )
+        elif recalculo:
+            self.stdout.write(
+                f"Recálculo de plazos {recalculo.id} pendiente: ejecute 'manage.py recalcular_plazos'"
+            )
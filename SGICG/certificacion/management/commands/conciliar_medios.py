@@ -0,0 +1,146 @@
+# certificacion/management/commands/conciliar_medios.py
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from certificacion.conciliacion import (
+    ConciliadorMedios, ANTIGUEDAD_MINIMA_MINUTOS, PROPORCION_MAXIMA_FALTANTES,
+)
+
+
+def _megas(bytes_):
+    return f"{bytes_ / (1024 * 1024):.1f}MB"
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara las carpetas de órdenes e impresiones de MEDIA_ROOT con la base de datos y '
+        'lista los archivos huérfanos y las referencias a archivos que no existen. '
+        'Con --eliminar borra los huérfanos y con --limpiar-referencias las referencias colgantes '
+        '(guardando antes las filas en --respaldo).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--eliminar',
+            action='store_true',
+            help='Elimina los archivos huérfanos y las carpetas vacías de órdenes inexistentes',
+        )
+        parser.add_argument(
+            '--limpiar-referencias',
+            action='store_true',
+            help='Quita las referencias sin archivo (las fotos sin archivo se eliminan). Requiere --respaldo',
+        )
+        parser.add_argument(
+            '--respaldo',
+            default=None,
+            help='Archivo JSON Lines donde se guardan las filas antes de limpiarlas (se añade al final)',
+        )
+        parser.add_argument(
+            '--max-faltantes',
+            type=float,
+            default=PROPORCION_MAXIMA_FALTANTES * 100,
+            help='Porcentaje máximo de referencias sin archivo para limpiar sin --forzar '
+                 f'(por defecto {PROPORCION_MAXIMA_FALTANTES * 100:g})',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Limpia aunque el recorrido parezca incompleto (errores, sin carpetas o demasiadas faltantes)',
+        )
+        parser.add_argument(
+            '--antiguedad',
+            type=int,
+            default=ANTIGUEDAD_MINIMA_MINUTOS,
+            help=f'Minutos sin modificar para considerar huérfano un archivo (por defecto {ANTIGUEDAD_MINIMA_MINUTOS})',
+        )
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=None,
+            help='Hilos para recorrer el disco (por defecto 4 por CPU, máximo 32)',
+        )
+        parser.add_argument(
+            '--ruta',
+            default=None,
+            help='Raíz a conciliar (por defecto MEDIA_ROOT)',
+        )
+        parser.add_argument(
+            '--salida',
+            default=None,
+            help='Archivo CSV donde guardar el detalle de huérfanos y referencias colgantes',
+        )
+
+    def handle(self, *args, **options):
+        if options['antiguedad'] < 0:
+            raise CommandError('--antiguedad no puede ser negativa')
+        if options['hilos'] is not None and options['hilos'] < 1:
+            raise CommandError('--hilos debe ser al menos 1')
+        if options['limpiar_referencias'] and not options['respaldo']:
+            raise CommandError('--limpiar-referencias requiere --respaldo')
+        if not 0 <= options['max_faltantes'] <= 100:
+            raise CommandError('--max-faltantes debe estar entre 0 y 100')
+
+        conciliador = ConciliadorMedios(
+            raiz=options['ruta'],
+            hilos=options['hilos'],
+            antiguedad_minutos=options['antiguedad'],
+            eliminar=options['eliminar'],
+            limpiar_referencias=options['limpiar_referencias'],
+            respaldo=options['respaldo'],
+            forzar=options['forzar'],
+            proporcion_maxima_faltantes=options['max_faltantes'] / 100,
+        )
+        try:
+            resumen = conciliador.ejecutar()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"Recorridos {resumen['directorios']} directorios y {resumen['archivos']} archivos "
+            f"({resumen['referenciados']} referenciados) en {resumen['segundos']}s"
+        )
+        for ruta, tamano in conciliador.huerfanos[:20]:
+            self.stdout.write(f" -> Huérfano: {ruta} ({_megas(tamano)})")
+        if len(conciliador.huerfanos) > 20:
+            self.stdout.write(f" ... y {len(conciliador.huerfanos) - 20} huérfanos más")
+        for referencia in conciliador.colgantes[:20]:
+            self.stdout.write(self.style.WARNING(
+                f" -> Sin archivo: {referencia['modelo']} {referencia['id']}.{referencia['campo']} = {referencia['ruta']}"
+            ))
+        if len(conciliador.colgantes) > 20:
+            self.stdout.write(f" ... y {len(conciliador.colgantes) - 20} referencias más")
+        for error in resumen['errores'][:20]:
+            self.stdout.write(self.style.ERROR(f" -> Error: {error}"))
+
+        if options['salida']:
+            with open(options['salida'], 'w', newline='', encoding='utf-8') as f:
+                escritor = csv.writer(f)
+                escritor.writerow(['tipo', 'ruta', 'bytes', 'modelo', 'id', 'campo'])
+                for ruta, tamano in conciliador.huerfanos:
+                    escritor.writerow(['huerfano', ruta, tamano, '', '', ''])
+                for referencia in conciliador.colgantes:
+                    escritor.writerow([
+                        'sin_archivo', referencia['ruta'], '',
+                        referencia['modelo'], referencia['id'], referencia['campo'],
+                    ])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Huérfanos: {resumen['huerfanos']} ({_megas(resumen['bytes_huerfanos'])}), "
+            f"carpetas de órdenes inexistentes: {resumen['carpetas_huerfanas']}, "
+            f"referencias sin archivo: {resumen['colgantes']}, "
+            f"omitidos por recientes: {resumen['recientes']}"
+        ))
+        if options['eliminar']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Eliminados {resumen['eliminados']} archivos y {resumen['directorios_eliminados']} carpetas"
+            ))
+        if resumen['limpieza_rechazada']:
+            raise CommandError(
+                f"No se limpiaron las referencias: {resumen['limpieza_rechazada']}. "
+                f"Revise la ruta y el montaje, o use --forzar"
+            )
+        if options['limpiar_referencias']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Referencias limpiadas: {resumen['referencias_limpiadas']} (respaldo en {options['respaldo']})"
+            ))
@@ -1,6 +1,7 @@
 # certificacion/management/commands/convertir_horas_a_segundos.py
 from django.core.management.base import BaseCommand
 from django.db.models import F
+from certificacion.cache_niveles import cache_niveles
 from certificacion.models import ConfiguracionTiempos
 
 class Command(BaseCommand):
@@ -14,4 +15,5 @@ class Command(BaseCommand):
         ConfiguracionTiempos.objects.exclude(tiempo_fotografia=None).update(tiempo_fotografia=F('tiempo_fotografia') * 3600)
         ConfiguracionTiempos.objects.exclude(tiempo_revision=None).update(tiempo_revision=F('tiempo_revision') * 3600)
         ConfiguracionTiempos.objects.exclude(tiempo_impresion=None).update(tiempo_impresion=F('tiempo_impresion') * 3600)
+        cache_niveles.invalidar('tiempos', 'estadisticas')
         self.stdout.write(self.style.SUCCESS('¡Conversión completada!'))
\ No newline at end of file
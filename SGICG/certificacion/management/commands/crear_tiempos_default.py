@@ -1,5 +1,6 @@
 # certificacion/management/commands/crear_tiempos_default.py
 from django.core.management.base import BaseCommand, CommandError
+from certificacion.cache_niveles import cache_niveles
 from certificacion.models import ConfiguracionTiempos
 from django.db import transaction
 
@@ -110,6 +111,7 @@ class Command(BaseCommand):
                                 self.stdout.write(f" -> EXISTE: {item_key} - {cert_key}")
                 
                 if not dry_run:
+                    transaction.on_commit(lambda: cache_niveles.invalidar('tiempos', 'estadisticas'))
                     self.stdout.write(
                         self.style.SUCCESS(
                             f'Proceso completado. Creados: {created_count}, Actualizados: {updated_count}'
@@ -0,0 +1,462 @@
+# certificacion/management/commands/estres_concurrencia.py
+import io
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, transaction, OperationalError
+from django.db.models import Count, Max, Min
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from certificacion.estres import ClienteHTTP, crear_orden, ejecutar_proceso
+from certificacion.cache_niveles import cache_niveles
+from certificacion.models import Orden, Item, FotoItem, TransicionEtapa, ResumenDiarioEtapa
+from certificacion.views import TiempoCalculator
+
+MEZCLA_DEFAULT = 'crear=0.3,avanzar=0.4,qr=0.15,foto=0.15'
+ETAPAS = [e[0] for e in Orden.ETAPAS]
+
+
+class RegistradorEscrituras:
+    """Envoltura de ejecución que mide las sentencias de escritura y los bloqueos"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.duraciones = []
+        self.bloqueos = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() not in ('INSERT', 'UPDATE', 'DELETE'):
+            return execute(sql, params, many, context)
+
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            if 'locked' in str(e):
+                with self.lock:
+                    self.bloqueos += 1
+            raise
+        finally:
+            with self.lock:
+                self.duraciones.append(time.perf_counter() - inicio)
+
+
+class _ManejadorSilencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def _ms(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))] * 1000, 2)
+
+
+def _tipo_item(item):
+    """Misma clasificación que usa avanzar_etapa"""
+    if item.que_es == 'JOYA' and item.tipo_joya == 'SET':
+        return 'SET'
+    if item.que_es in ('PIEDRA', 'LOTE'):
+        return item.que_es
+    return 'JOYA'
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de estrés: lanza creaciones, avances y subidas concurrentes contra un servidor '
+        'local, verifica invariantes y reporta rendimiento y esperas por bloqueo. '
+        'Usa una base de datos desechable salvo con --usar-bd-real. '
+        'Termina con error si algún invariante falla.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default=None,
+            help='URL de un servidor ya en marcha (por defecto se levanta uno embebido con hilos). '
+                 'Requiere --usar-bd-real: el servidor escribe en su propia base de datos',
+        )
+        parser.add_argument(
+            '--usar-bd-real',
+            action='store_true',
+            help='Escribe en la base de datos configurada en lugar de una desechable',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=2,
+            help='Procesos cliente',
+        )
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=8,
+            help='Hilos cliente por proceso',
+        )
+        parser.add_argument(
+            '--operaciones',
+            type=int,
+            default=200,
+            help='Operaciones por proceso',
+        )
+        parser.add_argument(
+            '--mezcla',
+            default=MEZCLA_DEFAULT,
+            help=f'Pesos de cada operación (por defecto "{MEZCLA_DEFAULT}")',
+        )
+        parser.add_argument(
+            '--semillas',
+            type=int,
+            default=20,
+            help='Órdenes creadas antes de la prueba para avanzar y subir archivos',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=1,
+            help='Semilla aleatoria de los clientes',
+        )
+        parser.add_argument(
+            '--salida',
+            default=None,
+            help='Archivo JSON donde guardar el reporte',
+        )
+        parser.add_argument(
+            '--limpiar',
+            action='store_true',
+            help='Con --usar-bd-real, elimina al terminar las órdenes de la prueba, sus transiciones '
+                 'y restaura los resúmenes diarios de etapa tal como estaban antes de la prueba',
+        )
+
+    def _parsear_mezcla(self, texto):
+        mezcla = {}
+        for parte in texto.split(','):
+            try:
+                tipo, peso = parte.split('=')
+                mezcla[tipo.strip()] = float(peso)
+            except ValueError:
+                raise CommandError(f"Formato de mezcla no válido: '{parte}'")
+        invalidos = set(mezcla) - {'crear', 'avanzar', 'qr', 'foto'}
+        if invalidos:
+            raise CommandError(f"Operaciones no válidas: {', '.join(sorted(invalidos))}")
+        if sum(mezcla.values()) <= 0:
+            raise CommandError('La mezcla debe tener al menos un peso positivo')
+        return mezcla
+
+    @contextmanager
+    def _base_de_datos(self, usar_real):
+        """
+        Base de datos de la prueba: la configurada con usar_real o una
+        desechable (en SQLite, un archivo temporal y no la base en memoria,
+        para medir los bloqueos reales entre conexiones)
+        """
+        if usar_real:
+            yield
+            return
+
+        nombre_original = connection.settings_dict['NAME']
+        ajustes_prueba = connection.settings_dict.setdefault('TEST', {})
+        nombre_prueba_original = ajustes_prueba.get('NAME')
+        with tempfile.TemporaryDirectory() as directorio:
+            if connection.vendor == 'sqlite':
+                ajustes_prueba['NAME'] = os.path.join(directorio, 'estres.sqlite3')
+            connection.close()
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                call_command('crear_tiempos_default', stdout=io.StringIO())
+                yield
+            finally:
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+                ajustes_prueba['NAME'] = nombre_prueba_original
+                # La cache compartida no debe conservar tiempos leídos de la base desechable
+                cache_niveles.invalidar('tiempos', 'estadisticas')
+
+    def _limpiar(self, prefijo, resumenes_previos, desde):
+        """
+        Deshace la prueba en la base real: órdenes, transiciones (sin FK en la
+        base de datos, no se borran en cascada) y resúmenes diarios desde que
+        empezó la prueba.
+        """
+        ordenes = Orden.objects.filter(numero_orden_facturacion__startswith=f"{prefijo}-")
+        with transaction.atomic():
+            TransicionEtapa.objects.filter(orden_id__in=ordenes.values('id')).delete()
+            ordenes.delete()
+            ResumenDiarioEtapa.objects.filter(fecha__gte=desde).delete()
+            ResumenDiarioEtapa.objects.bulk_create(resumenes_previos)
+            transaction.on_commit(lambda: cache_niveles.invalidar('estadisticas'))
+
+    @contextmanager
+    def _servidor(self, url, registrador):
+        """Usa el servidor indicado o levanta uno embebido que registra las escrituras"""
+        if url:
+            yield url
+            return
+
+        aplicacion_django = get_wsgi_application()
+
+        def aplicacion(environ, start_response):
+            with connection.execute_wrapper(registrador):
+                return aplicacion_django(environ, start_response)
+
+        with tempfile.TemporaryDirectory() as media_temporal, override_settings(
+            MEDIA_ROOT=media_temporal,
+            ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['127.0.0.1'],
+        ):
+            servidor = ThreadedWSGIServer(('127.0.0.1', 0), _ManejadorSilencioso)
+            servidor.set_app(aplicacion)
+            hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+            hilo.start()
+            try:
+                yield f"http://127.0.0.1:{servidor.server_address[1]}"
+            finally:
+                servidor.shutdown()
+                servidor.server_close()
+
+    def _crear_semillas(self, url, prefijo, cantidad):
+        """Crea las órdenes semilla en serie y guarda su estado inicial"""
+        cliente = ClienteHTTP(url)
+        cliente.iniciar()
+        numeros = [f"{prefijo}-S-{n:04d}" for n in range(cantidad)]
+        for numero in numeros:
+            if not crear_orden(cliente, numero)['exito']:
+                raise CommandError(f'No se pudo crear la orden semilla {numero}')
+
+        instantanea = {}
+        for orden in Orden.objects.filter(numero_orden_facturacion__in=numeros).prefetch_related('items'):
+            instantanea[orden.id] = {
+                'etapa': orden.estado_actual,
+                'items': {item.id: item.fecha_limite_etapa for item in orden.items.all()},
+            }
+        return instantanea
+
+    def _verificar(self, prefijo, instantanea, resultados):
+        """
+        Comprueba los invariantes después de la prueba.
+
+        Returns:
+            dict: nombre del invariante -> lista de violaciones (vacía si se cumple)
+        """
+        violaciones = defaultdict(list)
+        exitos = defaultdict(Counter)
+        for r in resultados:
+            if r['exito']:
+                exitos[r['tipo']][r['objetivo']] += 1
+
+        # Órdenes creadas durante la prueba (sin las semillas), en orden de inserción
+        creadas = Orden.objects.filter(
+            numero_orden_facturacion__startswith=f"{prefijo}-"
+        ).exclude(id__in=instantanea).order_by('id')
+
+        if creadas.count() != sum(exitos['crear'].values()):
+            violaciones['creaciones_confirmadas'].append(
+                f"{sum(exitos['crear'].values())} creaciones exitosas, {creadas.count()} órdenes en la base de datos"
+            )
+
+        # (orden, numero_item) único y numeración 1..n sin huecos
+        duplicados = Item.objects.filter(orden__in=creadas).values('orden_id', 'numero_item').annotate(
+            n=Count('id')
+        ).filter(n__gt=1)
+        for d in duplicados:
+            violaciones['items_unicos'].append(f"Orden {d['orden_id']} ítem {d['numero_item']} x{d['n']}")
+        rangos = creadas.annotate(
+            n=Count('items'), primero=Min('items__numero_item'), ultimo=Max('items__numero_item')
+        ).values_list('id', 'n', 'primero', 'ultimo')
+        for orden_id, n, primero, ultimo in rangos:
+            if n and (primero != 1 or ultimo != n):
+                violaciones['items_unicos'].append(f"Orden {orden_id}: numeración {primero}..{ultimo} con {n} ítems")
+
+        # La cola solo crece: cada orden nueva empieza después del final de la anterior
+        intervalos = creadas.annotate(
+            inicio=Min('items__fecha_limite_etapa'), fin=Max('items__fecha_limite_etapa')
+        ).values_list('id', 'inicio', 'fin')
+        anterior = None
+        for orden_id, inicio, fin in intervalos:
+            if anterior and inicio is not None and inicio <= anterior[1]:
+                violaciones['cola_monotona'].append(
+                    f"Orden {orden_id} empieza {inicio} antes del fin de la orden {anterior[0]} ({anterior[1]})"
+                )
+            if fin is not None:
+                anterior = (orden_id, fin)
+
+        # Sin actualizaciones perdidas en avanzar_etapa: etapa y fechas coinciden con los avances exitosos
+        ordenes = Orden.objects.filter(id__in=instantanea).prefetch_related('items')
+        for orden in ordenes:
+            inicial = instantanea[orden.id]
+            i_inicial, i_final = ETAPAS.index(inicial['etapa']), ETAPAS.index(orden.estado_actual)
+            avances = exitos['avanzar'][orden.id]
+            if i_final - i_inicial != avances:
+                violaciones['avances_sin_perdidas'].append(
+                    f"Orden {orden.id}: {avances} avances exitosos pero pasó de {inicial['etapa']} a {orden.estado_actual}"
+                )
+                continue
+
+            items = list(orden.items.all())
+            delta = timedelta(0)
+            for etapa in ETAPAS[i_inicial:i_final]:
+                delta += timedelta(seconds=sum(
+                    TiempoCalculator.get_tiempo_estimado(_tipo_item(item), item.tipo_certificado, etapa)
+                    for item in items
+                ))
+            for item in items:
+                original = inicial['items'][item.id]
+                esperado = None if orden.estado_actual == 'FINALIZADA' or original is None else original - delta
+                actual = item.fecha_limite_etapa
+                if (esperado is None) != (actual is None) or (
+                    esperado is not None and abs(actual - esperado) > timedelta(milliseconds=1)
+                ):
+                    violaciones['avances_sin_perdidas'].append(
+                        f"Ítem {item.id}: fecha límite {actual}, se esperaba {esperado}"
+                    )
+
+            # Cada subida exitosa de foto deja exactamente una foto; cada QR exitoso deja un archivo asignado
+            for item in items:
+                fotos = FotoItem.objects.filter(item=item).count()
+                if fotos != exitos['foto'][item.id]:
+                    violaciones['subidas_completas'].append(
+                        f"Ítem {item.id}: {exitos['foto'][item.id]} fotos subidas, {fotos} registradas"
+                    )
+                if exitos['qr'][item.id] and not item.qr_cargado:
+                    violaciones['subidas_completas'].append(f"Ítem {item.id}: QR subido pero no asignado")
+
+        for nombre in ('creaciones_confirmadas', 'items_unicos', 'cola_monotona',
+                       'avances_sin_perdidas', 'subidas_completas'):
+            violaciones.setdefault(nombre, [])
+        return dict(violaciones)
+
+    def _estadisticas(self, resultados, duracion, registrador, embebido):
+        por_tipo = {}
+        for tipo in sorted({r['tipo'] for r in resultados}):
+            del_tipo = [r for r in resultados if r['tipo'] == tipo]
+            latencias = [r['duracion'] for r in del_tipo if r['estado'] is not None]
+            por_tipo[tipo] = {
+                'total': len(del_tipo),
+                'exitosas': sum(1 for r in del_tipo if r['exito']),
+                'errores_http_5xx': sum(1 for r in del_tipo if (r['estado'] or 0) >= 500),
+                'errores_conexion': sum(1 for r in del_tipo if r['estado'] is None),
+                'mensajes_bloqueo': sum(1 for r in del_tipo if any('locked' in m for m in r['mensajes'])),
+                'p50_ms': _ms(latencias, 50),
+                'p90_ms': _ms(latencias, 90),
+                'p99_ms': _ms(latencias, 99),
+            }
+
+        estadisticas = {
+            'duracion_s': round(duracion, 3),
+            'operaciones': len(resultados),
+            'rendimiento_ops_s': round(len(resultados) / duracion, 2) if duracion else None,
+            'por_operacion': por_tipo,
+        }
+        if embebido:
+            # En SQLite el tiempo de las escrituras bajo contención es casi todo espera del bloqueo
+            estadisticas['escrituras'] = {
+                'total': len(registrador.duraciones),
+                'errores_bloqueo': registrador.bloqueos,
+                'p50_ms': _ms(registrador.duraciones, 50),
+                'p99_ms': _ms(registrador.duraciones, 99),
+                'max_ms': _ms(registrador.duraciones, 100),
+                'tiempo_total_s': round(sum(registrador.duraciones), 3),
+            }
+        return estadisticas
+
+    def _ejecutar(self, options, mezcla):
+        prefijo = f"ESTRES-{timezone.now():%Y%m%d%H%M%S}"
+        registrador = RegistradorEscrituras()
+        desde = timezone.localdate()
+        resumenes_previos = list(ResumenDiarioEtapa.objects.filter(fecha__gte=desde))
+
+        with self._servidor(options['url'], registrador) as url:
+            self.stdout.write(f"Servidor: {url}")
+            instantanea = self._crear_semillas(url, prefijo, options['semillas'])
+            semillas = [(orden_id, list(datos['items'])) for orden_id, datos in instantanea.items()]
+            registrador.duraciones.clear()
+
+            self.stdout.write(
+                f"Lanzando {options['procesos']} procesos x {options['hilos']} hilos, "
+                f"{options['operaciones']} operaciones por proceso..."
+            )
+            inicio = time.perf_counter()
+            with ProcessPoolExecutor(
+                max_workers=options['procesos'], mp_context=multiprocessing.get_context('spawn')
+            ) as executor:
+                futuros = [
+                    executor.submit(
+                        ejecutar_proceso, url, prefijo, semillas, mezcla,
+                        options['hilos'], options['operaciones'], options['semilla'] * 100 + p
+                    )
+                    for p in range(options['procesos'])
+                ]
+                resultados = [r for futuro in futuros for r in futuro.result()]
+            duracion = time.perf_counter() - inicio
+
+        estadisticas = self._estadisticas(resultados, duracion, registrador, options['url'] is None)
+        violaciones = self._verificar(prefijo, instantanea, resultados)
+
+        for tipo, datos in estadisticas['por_operacion'].items():
+            self.stdout.write(
+                f"  {tipo}: {datos['exitosas']}/{datos['total']} exitosas, p50 {datos['p50_ms']} ms, "
+                f"p99 {datos['p99_ms']} ms, bloqueos {datos['mensajes_bloqueo']}, 5xx {datos['errores_http_5xx']}"
+            )
+        if 'escrituras' in estadisticas:
+            e = estadisticas['escrituras']
+            self.stdout.write(
+                f"  escrituras: {e['total']}, p50 {e['p50_ms']} ms, p99 {e['p99_ms']} ms, "
+                f"max {e['max_ms']} ms, errores de bloqueo {e['errores_bloqueo']}"
+            )
+        self.stdout.write(f"  rendimiento: {estadisticas['rendimiento_ops_s']} ops/s")
+
+        for nombre, lista in violaciones.items():
+            if lista:
+                self.stdout.write(self.style.ERROR(f"  [FALLA] {nombre}: {len(lista)} violaciones"))
+                for detalle in lista[:5]:
+                    self.stdout.write(f"      {detalle}")
+            else:
+                self.stdout.write(self.style.SUCCESS(f"  [OK] {nombre}"))
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'fecha': timezone.now().isoformat(),
+                    'prefijo': prefijo,
+                    'parametros': {k: options[k] for k in ('procesos', 'hilos', 'operaciones', 'semillas', 'semilla')},
+                    'mezcla': mezcla,
+                    'estadisticas': estadisticas,
+                    'violaciones': violaciones,
+                }, f, indent=2, ensure_ascii=False, default=str)
+
+        if options['limpiar'] and options['usar_bd_real']:
+            self._limpiar(prefijo, resumenes_previos, desde)
+            self.stdout.write('Datos de la prueba eliminados.')
+
+        return violaciones
+
+    def handle(self, *args, **options):
+        for opcion in ('procesos', 'hilos', 'semillas'):
+            if options[opcion] < 1:
+                raise CommandError(f'--{opcion} debe ser al menos 1')
+        mezcla = self._parsear_mezcla(options['mezcla'])
+        if options['url'] and not options['usar_bd_real']:
+            raise CommandError('--url requiere --usar-bd-real: el servidor externo escribe en su propia base de datos')
+        if options['limpiar'] and not options['usar_bd_real']:
+            self.stdout.write(self.style.WARNING('--limpiar no tiene efecto: la base de datos desechable se elimina al terminar'))
+
+        with self._base_de_datos(options['usar_bd_real']):
+            violaciones = self._ejecutar(options, mezcla)
+
+        fallidos = [nombre for nombre, lista in violaciones.items() if lista]
+        if fallidos:
+            raise CommandError(f"Invariantes violados: {', '.join(fallidos)}")
+        self.stdout.write(self.style.SUCCESS('Prueba de estrés completada sin violaciones.'))
@@ -0,0 +1,71 @@
+# certificacion/management/commands/exportar_ordenes.py
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from certificacion.exportacion import ExportadorOrdenes, FORMATOS, CHUNK_LECTURA, filtros_exportacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta las órdenes con sus ítems (una fila por ítem) a CSV o XLSX según la extensión '
+        'del archivo de salida. Sin filtros exporta las órdenes en curso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('salida', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--buscar', default=None, help='Texto en número de orden, gema o código')
+        parser.add_argument('--etapa', default=None, help='Solo órdenes en esta etapa (p. ej. REVISION)')
+        parser.add_argument('--desde', default=None, help='Creadas desde esta fecha (AAAA-MM-DD)')
+        parser.add_argument('--hasta', default=None, help='Creadas hasta esta fecha inclusive (AAAA-MM-DD)')
+        parser.add_argument('--tipo-certificado', default=None, help='Solo órdenes con ítems de este tipo')
+        parser.add_argument(
+            '--historicas',
+            action='store_true',
+            help='Incluye las órdenes finalizadas y las archivadas',
+        )
+        parser.add_argument(
+            '--chunk',
+            type=int,
+            default=CHUNK_LECTURA,
+            help=f'Filas por lectura de la base de datos (por defecto {CHUNK_LECTURA})',
+        )
+
+    def handle(self, *args, **options):
+        formato = os.path.splitext(options['salida'])[1].lstrip('.').lower()
+        if formato not in FORMATOS:
+            raise CommandError('El archivo de salida debe terminar en .csv o .xlsx')
+        if options['chunk'] < 1:
+            raise CommandError('--chunk debe ser al menos 1')
+
+        try:
+            filtros = filtros_exportacion({
+                'search': options['buscar'],
+                'etapa': options['etapa'],
+                'desde': options['desde'],
+                'hasta': options['hasta'],
+                'tipo_certificado': options['tipo_certificado'],
+                'historicas': '1' if options['historicas'] else '',
+            })
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        exportador = ExportadorOrdenes(chunk_size=options['chunk'], **filtros)
+        inicio = time.perf_counter()
+        try:
+            if formato == 'xlsx':
+                exportador.escribir_xlsx(options['salida'])
+            else:
+                with open(options['salida'], 'w', newline='', encoding='utf-8') as f:
+                    for bloque in exportador.csv():
+                        f.write(bloque)
+        except ImportError:
+            raise CommandError('La exportación a XLSX requiere openpyxl: pip install openpyxl')
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exportadas {exportador.resumen['filas']} filas a {options['salida']} "
+            f"en {time.perf_counter() - inicio:.1f}s"
+        ))
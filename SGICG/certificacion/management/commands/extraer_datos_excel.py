@@ -0,0 +1,58 @@
+# certificacion/management/commands/extraer_datos_excel.py
+from django.core.management.base import BaseCommand, CommandError
+from certificacion.models import Item
+from certificacion.extractor_excel import ExtractorExcel, TAMANO_LOTE
+
+class Command(BaseCommand):
+    help = 'Extrae los datos de los Excel de los ítems a la tabla DatosExcelItem (solo archivos modificados).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Número de procesos de trabajo (por defecto, uno por CPU)',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Vuelve a extraer todos los archivos aunque no hayan cambiado',
+        )
+        parser.add_argument(
+            '--orden',
+            type=int,
+            default=None,
+            help='Limita la extracción a los ítems de una orden (ID)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help='Cantidad de registros por lote de escritura',
+        )
+
+    def handle(self, *args, **options):
+        items = Item.objects.all()
+        if options['orden']:
+            items = items.filter(orden_id=options['orden'])
+
+        try:
+            extractor = ExtractorExcel(
+                max_workers=options['workers'],
+                forzar=options['forzar'],
+                tamano_lote=options['lote'],
+            )
+            resumen = extractor.ejecutar(items)
+        except Exception as e:
+            raise CommandError(f'Error: {str(e)}')
+
+        for item_id, error in resumen['errores'][:10]:
+            self.stdout.write(self.style.WARNING(f" -> ERROR item {item_id}: {error}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Proceso completado. Revisados: {resumen['revisados']}, "
+                f"Extraídos: {resumen['extraidos']}, Sin cambios: {resumen['sin_cambios']}, "
+                f"Archivos faltantes: {resumen['faltantes']}, Errores: {len(resumen['errores'])}"
+            )
+        )
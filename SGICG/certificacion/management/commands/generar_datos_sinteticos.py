@@ -0,0 +1,110 @@
+# certificacion/management/commands/generar_datos_sinteticos.py
+from django.core.management.base import BaseCommand, CommandError
+from certificacion.sinteticos import (
+    GeneradorDatosSinteticos, parsear_distribucion, PREFIJO_DEFAULT, TAMANO_LOTE,
+)
+
+class Command(BaseCommand):
+    help = (
+        'Llena la base de datos con órdenes, ítems y fotos sintéticos realistas '
+        '(numerados con un prefijo para poder eliminarlos después).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ordenes',
+            type=int,
+            default=1000,
+            help='Número de órdenes sintéticas a crear',
+        )
+        parser.add_argument(
+            '--items-min',
+            type=int,
+            default=1,
+            help='Mínimo de ítems por orden',
+        )
+        parser.add_argument(
+            '--items-max',
+            type=int,
+            default=5,
+            help='Máximo de ítems por orden',
+        )
+        parser.add_argument(
+            '--fotos-max',
+            type=int,
+            default=3,
+            help='Máximo de fotos por ítem (el mínimo es 0)',
+        )
+        parser.add_argument(
+            '--distribucion',
+            default=None,
+            help='Pesos por etapa, ej. "INGRESO=0.3,REVISION=0.2,FINALIZADA=0.5"',
+        )
+        parser.add_argument(
+            '--retrasados',
+            type=float,
+            default=0.2,
+            help='Fracción de ítems activos con la fecha límite vencida',
+        )
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=42,
+            help='Semilla aleatoria (misma semilla, mismos datos)',
+        )
+        parser.add_argument(
+            '--prefijo',
+            default=PREFIJO_DEFAULT,
+            help='Prefijo del número de orden de los datos sintéticos',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help='Órdenes por transacción',
+        )
+        parser.add_argument(
+            '--limpiar',
+            action='store_true',
+            help='Elimina primero las órdenes sintéticas existentes con el mismo prefijo',
+        )
+
+    def handle(self, *args, **options):
+        if options['ordenes'] < 0:
+            raise CommandError('--ordenes no puede ser negativo')
+        if not 1 <= options['items_min'] <= options['items_max']:
+            raise CommandError('Se requiere 1 <= --items-min <= --items-max')
+        if options['fotos_max'] < 0:
+            raise CommandError('--fotos-max no puede ser negativo')
+        if not 0 <= options['retrasados'] <= 1:
+            raise CommandError('--retrasados debe estar entre 0 y 1')
+
+        distribucion = None
+        if options['distribucion']:
+            try:
+                distribucion = parsear_distribucion(options['distribucion'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        generador = GeneradorDatosSinteticos(
+            semilla=options['semilla'],
+            items_por_orden=(options['items_min'], options['items_max']),
+            fotos_por_item=(0, options['fotos_max']),
+            distribucion=distribucion,
+            fraccion_retrasados=options['retrasados'],
+            prefijo=options['prefijo'],
+            tamano_lote=options['lote'],
+        )
+
+        if options['limpiar']:
+            eliminadas = generador.limpiar()
+            self.stdout.write(f"Eliminadas {eliminadas} órdenes sintéticas anteriores.")
+
+        resumen = generador.ejecutar(options['ordenes'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Proceso completado. Órdenes: {resumen['ordenes']}, Ítems: {resumen['items']}, "
+                f"Fotos: {resumen['fotos']}, Ítems retrasados: {resumen['retrasados']}"
+            )
+        )
@@ -0,0 +1,57 @@
+# certificacion/management/commands/generar_qrs.py
+from django.core.management.base import BaseCommand, CommandError
+from certificacion.models import Orden, Item
+from certificacion.generador_qr import GeneradorQR
+
+class Command(BaseCommand):
+    help = 'Genera los códigos QR de los ítems de una orden o etapa (omite los que no cambiaron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orden',
+            type=int,
+            default=None,
+            help='ID de la orden cuyos ítems se procesan',
+        )
+        parser.add_argument(
+            '--etapa',
+            default=None,
+            help='Etapa cuyos ítems se procesan (INGRESO, FOTOGRAFIA, ...)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Número de procesos de trabajo (por defecto, uno por CPU)',
+        )
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Regenera los QR aunque el contenido no haya cambiado o se hayan cargado a mano',
+        )
+
+    def handle(self, *args, **options):
+        items = Item.objects.all()
+        if options['orden']:
+            items = items.filter(orden_id=options['orden'])
+        if options['etapa']:
+            etapa = options['etapa'].upper()
+            if etapa not in dict(Orden.ETAPAS):
+                raise CommandError(f'Etapa no válida: {etapa}')
+            items = items.filter(etapa=etapa)
+
+        try:
+            resumen = GeneradorQR(max_workers=options['workers'], forzar=options['forzar']).ejecutar(items)
+        except Exception as e:
+            raise CommandError(f'Error: {str(e)}')
+
+        for item_id, error in resumen['errores'][:10]:
+            self.stdout.write(self.style.WARNING(f" -> ERROR item {item_id}: {error}"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Proceso completado. Generados: {resumen['generados']}, "
+                f"Sin cambios: {resumen['sin_cambios']}, "
+                f"Cargados a mano conservados: {resumen['conservados']}, Errores: {len(resumen['errores'])}"
+            )
+        )
@@ -0,0 +1,74 @@
+# certificacion/management/commands/importar_ordenes.py
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from certificacion.importacion import ImportadorOrdenes, TAMANO_LOTE, COLUMNAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa órdenes con sus ítems desde una exportación CSV o XLSX del sistema de facturación '
+        f"(una fila por ítem, filas de cada orden seguidas). Columnas: {', '.join(COLUMNAS)}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Órdenes por transacción (por defecto {TAMANO_LOTE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Valida el archivo y comprueba duplicados sin crear nada',
+        )
+        parser.add_argument(
+            '--errores',
+            default=None,
+            help='Archivo CSV donde guardar los errores por fila',
+        )
+        parser.add_argument(
+            '--sin-carpetas',
+            action='store_true',
+            help='No crea las carpetas de las órdenes en MEDIA_ROOT',
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser al menos 1')
+
+        importador = ImportadorOrdenes(
+            tamano_lote=options['lote'],
+            simular=options['dry_run'],
+            crear_carpetas=not options['sin_carpetas'],
+        )
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resumen = importador.ejecutar(archivo, options['archivo'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        segundos = time.perf_counter() - inicio
+
+        for error in resumen['errores'][:20]:
+            self.stdout.write(self.style.WARNING(
+                f" -> Fila {error['fila']} ({error['orden']}): {error['error']}"
+            ))
+        if len(resumen['errores']) > 20:
+            self.stdout.write(f" ... y {len(resumen['errores']) - 20} errores más")
+
+        if options['errores'] and resumen['errores']:
+            with open(options['errores'], 'w', newline='', encoding='utf-8') as f:
+                escritor = csv.DictWriter(f, fieldnames=['fila', 'orden', 'error'])
+                escritor.writeheader()
+                escritor.writerows(resumen['errores'])
+
+        verbo = 'Se crearían' if options['dry_run'] else 'Creadas'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verbo} {resumen['ordenes']} órdenes con {resumen['items']} ítems "
+            f"({resumen['filas']} filas, {resumen['rechazadas']} órdenes rechazadas) en {segundos:.1f}s"
+        ))
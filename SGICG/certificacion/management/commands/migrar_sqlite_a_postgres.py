@@ -0,0 +1,119 @@
+# certificacion/management/commands/migrar_sqlite_a_postgres.py
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import Max
+
+from certificacion.models import (
+    ConfiguracionTiempos, Orden, Item, FotoItem, DatosExcelItem,
+    OrdenArchivada, ItemArchivado, FotoItemArchivada,
+    RecalculoPlazos, TransicionEtapa, ResumenDiarioEtapa,
+)
+
+# En orden de dependencias: cada modelo después de los modelos a los que apunta
+MODELOS = [
+    ConfiguracionTiempos, Orden, Item, FotoItem, DatosExcelItem,
+    OrdenArchivada, ItemArchivado, FotoItemArchivada,
+    RecalculoPlazos, TransicionEtapa, ResumenDiarioEtapa,
+]
+
+class Command(BaseCommand):
+    help = (
+        'Copia los datos de la base SQLite a PostgreSQL en lotes por clave primaria, '
+        'sin cargar tablas completas en memoria. Ejecutar "migrate" en el destino antes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--origen',
+            default='sqlite',
+            help='Alias de la base de datos origen (por defecto "sqlite")',
+        )
+        parser.add_argument(
+            '--destino',
+            default='default',
+            help='Alias de la base de datos destino (por defecto "default")',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=2000,
+            help='Filas por lote (una transacción por lote)',
+        )
+        parser.add_argument(
+            '--reanudar',
+            action='store_true',
+            help='Continúa una copia interrumpida desde la mayor clave primaria ya copiada',
+        )
+
+    def _copiar_modelo(self, modelo, origen, destino, lote, reanudar):
+        """
+        Copia un modelo por rangos de clave primaria (paginación por llave, no OFFSET).
+
+        Returns:
+            int: Filas copiadas
+        """
+        campos = [campo.attname for campo in modelo._meta.concrete_fields]
+        # bulk_create reemplaza auto_now/auto_now_add con la hora actual: se restauran con bulk_update
+        campos_auto = [
+            campo.attname for campo in modelo._meta.concrete_fields
+            if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)
+        ]
+
+        ultimo = 0
+        existentes = modelo.objects.using(destino).exists()
+        if existentes:
+            if not reanudar:
+                raise CommandError(
+                    f'La tabla {modelo._meta.db_table} ya tiene datos en "{destino}" (use --reanudar)'
+                )
+            ultimo = modelo.objects.using(destino).aggregate(m=Max('pk'))['m'] or 0
+
+        copiadas = 0
+        while True:
+            filas = list(
+                modelo.objects.using(origen).filter(pk__gt=ultimo).order_by('pk').values(*campos)[:lote]
+            )
+            if not filas:
+                break
+
+            objetos = [modelo(**fila) for fila in filas]
+            with transaction.atomic(using=destino):
+                modelo.objects.using(destino).bulk_create(objetos)
+                if campos_auto:
+                    for objeto, fila in zip(objetos, filas):
+                        for campo in campos_auto:
+                            setattr(objeto, campo, fila[campo])
+                    modelo.objects.using(destino).bulk_update(objetos, campos_auto)
+
+            ultimo = filas[-1][modelo._meta.pk.attname]
+            copiadas += len(filas)
+            self.stdout.write(f"  {modelo.__name__}: {copiadas} filas...", ending='\r')
+
+        return copiadas
+
+    def handle(self, *args, **options):
+        origen, destino = options['origen'], options['destino']
+        for alias in (origen, destino):
+            if alias not in connections:
+                raise CommandError(f'Alias de base de datos no configurado: {alias}')
+        if origen == destino:
+            raise CommandError('El origen y el destino deben ser distintos')
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser al menos 1')
+
+        total = 0
+        for modelo in MODELOS:
+            copiadas = self._copiar_modelo(modelo, origen, destino, options['lote'], options['reanudar'])
+            total += copiadas
+            self.stdout.write(f"  {modelo.__name__}: {copiadas} filas copiadas")
+
+        # Las secuencias de claves primarias deben continuar después de los IDs copiados
+        conexion = connections[destino]
+        sentencias = conexion.ops.sequence_reset_sql(no_style(), MODELOS)
+        if sentencias:
+            with conexion.cursor() as cursor:
+                for sql in sentencias:
+                    cursor.execute(sql)
+
+        self.stdout.write(self.style.SUCCESS(f"Migración completada. Filas copiadas: {total}"))
@@ -0,0 +1,98 @@
+# certificacion/management/commands/recalcular_plazos.py
+from django.core.management.base import BaseCommand, CommandError
+
+from certificacion.cache_niveles import cache_niveles
+from certificacion.models import RecalculoPlazos
+from certificacion.plazos import MotorRecalculoPlazos, TAMANO_LOTE
+
+
+def _duracion(segundos):
+    signo = '-' if segundos < 0 else '+'
+    segundos = abs(int(segundos))
+    return f"{signo}{segundos // 3600}h{segundos % 3600 // 60:02d}m"
+
+
+class Command(BaseCommand):
+    help = (
+        'Ajusta las fechas límite de los ítems en curso a los cambios de configuración de tiempos '
+        'registrados desde la vista de configuración. Procesa en lotes y reanuda recálculos interrumpidos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--id',
+            type=int,
+            default=None,
+            help='Procesa solo el recálculo indicado (por defecto todos los pendientes, en orden)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Órdenes por transacción (por defecto {TAMANO_LOTE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra los cambios de ETA por orden sin modificar nada',
+        )
+        parser.add_argument(
+            '--muestra',
+            type=int,
+            default=10,
+            help='Órdenes con mayor cambio de ETA a listar en dry-run',
+        )
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser al menos 1')
+
+        if options['id'] is not None:
+            recalculos = RecalculoPlazos.objects.filter(pk=options['id'])
+            if not recalculos.exists():
+                raise CommandError(f"No existe el recálculo {options['id']}")
+        else:
+            recalculos = RecalculoPlazos.objects.exclude(estado='COMPLETADO').order_by('id')
+
+        if not recalculos.exists():
+            self.stdout.write(self.style.SUCCESS('No hay recálculos pendientes.'))
+            return
+
+        for recalculo in recalculos:
+            motor = MotorRecalculoPlazos(recalculo, options['lote'])
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"Recálculo {recalculo.id} ({recalculo.get_estado_display()}, "
+                f"cambio del {recalculo.fecha_creacion:%Y-%m-%d %H:%M})"
+            ))
+            for par, etapas in recalculo.cambios.items():
+                detalle = ', '.join(f"{etapa} {anterior}s -> {nuevo}s" for etapa, (anterior, nuevo) in etapas.items())
+                self.stdout.write(f"  {par}: {detalle}")
+
+            if recalculo.estado == 'COMPLETADO':
+                self.stdout.write(f"  Ya completado: {recalculo.items_actualizados} ítems actualizados")
+                continue
+
+            if options['dry_run']:
+                simulacion = motor.simular(options['muestra'])
+                self.stdout.write(
+                    f"  Se desplazarían {simulacion['items']} ítems de {simulacion['ordenes']} órdenes "
+                    f"(ETA min {_duracion(simulacion['delta_min_s'])}, max {_duracion(simulacion['delta_max_s'])}, "
+                    f"media {_duracion(simulacion['delta_medio_s'])})"
+                )
+                for fila in simulacion['muestra']:
+                    self.stdout.write(
+                        f"    {fila['orden']}: {fila['eta_anterior']:%Y-%m-%d %H:%M} -> "
+                        f"{fila['eta_nueva']:%Y-%m-%d %H:%M} ({_duracion(fila['delta_s'])})"
+                    )
+                continue
+
+            if recalculo.ultima_orden_id:
+                self.stdout.write(f"  Reanudando después de la orden {recalculo.ultima_orden_id}")
+            resumen = motor.ejecutar()
+            self.stdout.write(f"  {resumen['items']} ítems de {resumen['ordenes']} órdenes actualizados")
+
+        if not options['dry_run']:
+            cache_niveles.invalidar('estadisticas')
+            self.stdout.write(self.style.SUCCESS('Recálculo completado.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('DRY-RUN completado. No se modificó ninguna fecha.'))
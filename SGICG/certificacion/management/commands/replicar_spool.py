@@ -0,0 +1,45 @@
+# certificacion/management/commands/replicar_spool.py
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from certificacion.almacenamiento import BarridoSpool
+
+
+class Command(BaseCommand):
+    help = (
+        'Replica a MEDIA_ROOT los archivos del spool local que aún no llegaron (tras un reinicio '
+        'o reintentos agotados) y los quita del spool. Nunca sobrescribe un archivo de MEDIA_ROOT '
+        'más reciente que la copia del spool: lo informa como conflicto.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=0,
+            help='Modo programado: repite el barrido cada N segundos (0 = una sola vez)',
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'spool'):
+            raise CommandError('El almacenamiento por defecto no es AlmacenamientoSpool')
+
+        while True:
+            try:
+                resumen = BarridoSpool(default_storage).ejecutar()
+            except ValueError as e:
+                raise CommandError(str(e))
+
+            for error in resumen['errores'][:20]:
+                self.stdout.write(self.style.WARNING(f" -> {error}"))
+            self.stdout.write(self.style.SUCCESS(
+                f"Revisados {resumen['revisados']} archivos del spool: "
+                f"{resumen['replicados']} replicados, {resumen['purgados']} purgados, "
+                f"{resumen['conflictos']} conflictos, {len(resumen['errores'])} errores"
+            ))
+
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,90 @@
+# certificacion/management/commands/vendorizar_estaticos.py
+import hashlib
+import base64
+import json
+import os
+import re
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from certificacion.estaticos import RECURSOS_VENDOR, url_recurso
+
+# Los .map no se distribuyen: sin quitar la referencia collectstatic fallaría al buscarlos
+SOURCE_MAP = re.compile(rb'\n?/[/*][#@] sourceMappingURL=[^\n]*?(\*/)?\s*$')
+
+
+def _integridad(contenido):
+    return 'sha384-' + base64.b64encode(hashlib.sha384(contenido).digest()).decode('ascii')
+
+
+class Command(BaseCommand):
+    help = (
+        'Descarga a static/vendor/ las librerías de terceros que las plantillas cargaban de CDN '
+        '(Bootstrap, jQuery, select2) y registra en static/vendor/vendor.json el hash del archivo '
+        'guardado y el de la descarga original. '
+        'Con el archivo ya registrado verifica que el contenido descargado coincida. '
+        'Los servidores en marcha deben reiniciarse para usar las copias locales.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Vuelve a descargar y acepta contenido distinto al registrado',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=30,
+            help='Segundos de espera por descarga',
+        )
+
+    def handle(self, *args, **options):
+        raiz = settings.STATICFILES_DIRS[0]
+        ruta_registro = os.path.join(raiz, 'vendor', 'vendor.json')
+        registro = {}
+        if os.path.exists(ruta_registro):
+            with open(ruta_registro, encoding='utf-8') as f:
+                registro = json.load(f)
+
+        for clave, (ruta, url) in RECURSOS_VENDOR.items():
+            destino = os.path.join(raiz, ruta)
+            if os.path.exists(destino) and not options['forzar']:
+                self.stdout.write(f" -> {ruta}: ya vendorizado")
+                continue
+            try:
+                with urllib.request.urlopen(url, timeout=options['timeout']) as respuesta:
+                    contenido = respuesta.read()
+            except OSError as e:
+                raise CommandError(f"No se pudo descargar {url}: {str(e)}")
+
+            integridad_origen = _integridad(contenido)
+            anterior = registro.get(clave, {}).get('integridad_origen')
+            if anterior and anterior != integridad_origen and not options['forzar']:
+                raise CommandError(f"{url} no coincide con el hash registrado ({anterior})")
+
+            # integridad es la del archivo tal como queda en disco (sin la
+            # referencia al source map), la que sirve para SRI y verificarlo;
+            # integridad_origen, la de la descarga, para comparar al redescargar
+            vendorizado = SOURCE_MAP.sub(b'\n', contenido)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            with open(destino, 'wb') as f:
+                f.write(vendorizado)
+            registro[clave] = {
+                'ruta': ruta,
+                'url': url,
+                'integridad': _integridad(vendorizado),
+                'integridad_origen': integridad_origen,
+            }
+            self.stdout.write(f" -> {ruta}: {len(contenido) // 1024}KB")
+
+        os.makedirs(os.path.dirname(ruta_registro), exist_ok=True)
+        with open(ruta_registro, 'w', encoding='utf-8') as f:
+            json.dump(registro, f, indent=2, ensure_ascii=False)
+        url_recurso.cache_clear()
+        self.stdout.write(self.style.SUCCESS(
+            'Librerías vendorizadas. Ejecute collectstatic para generar los nombres con hash y las variantes '
+            'comprimidas, y reinicie el servidor para que las plantillas dejen de usar la CDN.'
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificacion', '0002_item_texto_para_copiar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatosExcelItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hoja', models.CharField(blank=True, max_length=100, null=True)),
+                ('numero_certificado', models.CharField(blank=True, db_index=True, max_length=100, null=True)),
+                ('fecha_certificado', models.DateField(blank=True, db_index=True, null=True)),
+                ('identificacion', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('peso_ct', models.DecimalField(blank=True, db_index=True, decimal_places=3, max_digits=9, null=True)),
+                ('dimensiones', models.CharField(blank=True, max_length=100, null=True)),
+                ('color', models.CharField(blank=True, db_index=True, max_length=255, null=True)),
+                ('origen', models.CharField(blank=True, db_index=True, max_length=100, null=True)),
+                ('tratamiento', models.CharField(blank=True, max_length=255, null=True)),
+                ('datos', models.JSONField(blank=True, default=dict)),
+                ('archivo_mtime', models.FloatField()),
+                ('archivo_hash', models.CharField(max_length=64)),
+                ('fecha_extraccion', models.DateTimeField(auto_now=True)),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='datos_excel', to='certificacion.item')),
+            ],
+            options={
+                'verbose_name': 'Datos de Excel del Ítem',
+                'verbose_name_plural': 'Datos de Excel de los Ítems',
+            },
+        ),
+    ]
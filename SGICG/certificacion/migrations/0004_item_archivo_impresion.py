@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificacion', '0003_datosexcelitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='archivo_impresion',
+            field=models.CharField(blank=True, help_text='PDF de impresión relativo a MEDIA_ROOT', max_length=255, null=True),
+        ),
+    ]
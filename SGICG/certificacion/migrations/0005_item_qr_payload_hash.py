@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificacion', '0004_item_archivo_impresion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='qr_payload_hash',
+            field=models.CharField(blank=True, help_text='Hash del contenido del QR generado', max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificacion', '0005_item_qr_payload_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_original', models.BigIntegerField(unique=True)),
+                ('numero_item', models.PositiveIntegerField()),
+                ('tipo_certificado', models.CharField(choices=[('GC_SENCILLA', 'GC Sencilla'), ('GC_COMPLETA', 'GC Completa'), ('ESCRITO', 'Escrito'), ('DIAMANTE', 'Diamante')], max_length=15)),
+                ('que_es', models.CharField(choices=[('JOYA', 'Joya'), ('LOTE', 'Lote de Gemas'), ('PIEDRA', 'Piedra(s) Suelta(s)'), ('VERBAL_A_GC', 'Verbal a GC'), ('REIMPRESION', 'Reimpresión')], max_length=15)),
+                ('codigo_referencia', models.CharField(blank=True, max_length=100, null=True)),
+                ('tipo_joya', models.CharField(blank=True, choices=[('ANILLO', 'Anillo'), ('DIJE', 'Dije'), ('TOPOS', 'Topos'), ('PULSERA', 'Pulsera'), ('PULSERA_TENIS', 'Pulsera Tenis'), ('SET', 'Set')], max_length=15, null=True)),
+                ('metal', models.CharField(blank=True, choices=[('ORO', 'Oro'), ('ORO_AMARILLO', 'Oro Amarillo'), ('ORO_ROSA', 'Oro Rosa'), ('PLATA', 'Plata'), ('BLANCO', 'Blanco'), ('ROSA', 'Rosa'), ('NEGRO', 'Negro')], max_length=15, null=True)),
+                ('cantidad_gemas', models.PositiveIntegerField(blank=True, null=True)),
+                ('componentes_set', models.CharField(blank=True, max_length=255, null=True)),
+                ('gema_principal', models.CharField(blank=True, max_length=100, null=True)),
+                ('forma_gema', models.CharField(default='Ninguno', max_length=100)),
+                ('peso_gema', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True)),
+                ('comentarios', models.TextField(blank=True, null=True)),
+                ('nombre_excel', models.CharField(blank=True, max_length=255, null=True)),
+                ('qr_cargado', models.CharField(blank=True, max_length=255, null=True)),
+                ('archivo_impresion', models.CharField(blank=True, max_length=255, null=True)),
+                ('texto_para_copiar', models.TextField(blank=True, null=True)),
+                ('numero_certificado', models.CharField(blank=True, db_index=True, max_length=100, null=True)),
+                ('datos_excel', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'verbose_name': 'Ítem Archivado',
+                'verbose_name_plural': 'Ítems Archivados',
+                'ordering': ['numero_item'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrdenArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_original', models.BigIntegerField(unique=True)),
+                ('numero_orden_facturacion', models.CharField(db_index=True, max_length=100, unique=True, verbose_name='Número de Orden (Facturación)')),
+                ('estado_actual', models.CharField(choices=[('INGRESO', 'Ingreso'), ('FOTOGRAFIA', 'Fotografía'), ('REVISION', 'Revisión'), ('IMPRESION', 'Impresión'), ('FINALIZADA', 'Finalizada')], default='FINALIZADA', max_length=20)),
+                ('fecha_creacion', models.DateTimeField(db_index=True)),
+                ('fecha_cierre', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('fecha_archivado', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Orden Archivada',
+                'verbose_name_plural': 'Órdenes Archivadas',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FotoItemArchivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('imagen', models.CharField(max_length=255)),
+                ('fecha_subida', models.DateTimeField()),
+                ('descripcion', models.CharField(blank=True, max_length=255, null=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fotos', to='certificacion.itemarchivado')),
+            ],
+            options={
+                'ordering': ['-fecha_subida'],
+            },
+        ),
+        migrations.AddField(
+            model_name='itemarchivado',
+            name='orden',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='certificacion.ordenarchivada'),
+        ),
+    ]
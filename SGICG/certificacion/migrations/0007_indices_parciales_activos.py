@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificacion', '0006_itemarchivado_ordenarchivada_fotoitemarchivada_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('fecha_limite_etapa__isnull', False)), fields=['fecha_limite_etapa', 'orden'], name='item_limite_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orden',
+            index=models.Index(condition=models.Q(('fecha_cierre__isnull', True)), fields=['fecha_creacion', 'estado_actual'], name='orden_activa_creacion_idx'),
+        ),
+    ]
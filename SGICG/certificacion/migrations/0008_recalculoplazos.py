@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificacion', '0007_indices_parciales_activos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecalculoPlazos',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_creacion', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADO', 'Completado')], db_index=True, default='PENDIENTE', max_length=12)),
+                ('cambios', models.JSONField(default=dict, help_text="{'TIPO_ITEM:TIPO_CERT': {'ETAPA': [segundos_anterior, segundos_nuevo]}}")),
+                ('ultima_orden_id', models.BigIntegerField(default=0, help_text='Última orden procesada (punto de reanudación)')),
+                ('ordenes_procesadas', models.PositiveIntegerField(default=0)),
+                ('items_actualizados', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Recálculo de Plazos',
+                'verbose_name_plural': 'Recálculos de Plazos',
+                'ordering': ['id'],
+            },
+        ),
+    ]
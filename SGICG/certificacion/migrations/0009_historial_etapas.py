@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificacion', '0008_recalculoplazos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiarioEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('etapa', models.CharField(choices=[('INGRESO', 'Ingreso'), ('FOTOGRAFIA', 'Fotografía'), ('REVISION', 'Revisión'), ('IMPRESION', 'Impresión'), ('FINALIZADA', 'Finalizada')], max_length=20)),
+                ('tipo_item', models.CharField(choices=[('PIEDRA', 'Piedra(s) Suelta(s)'), ('JOYA', 'Joya (General)'), ('SET', 'Set de Joyas'), ('LOTE', 'Lote de Gemas')], max_length=10)),
+                ('tipo_certificado', models.CharField(choices=[('GC_SENCILLA', 'GC Sencilla'), ('GC_COMPLETA', 'GC Completa'), ('ESCRITO', 'Escrito'), ('DIAMANTE', 'Diamante')], max_length=15)),
+                ('conteo', models.PositiveIntegerField(default=0)),
+                ('suma_segundos', models.BigIntegerField(default=0)),
+                ('minimo_segundos', models.PositiveIntegerField(blank=True, null=True)),
+                ('maximo_segundos', models.PositiveIntegerField(blank=True, null=True)),
+                ('p90_segundos', models.PositiveIntegerField(blank=True, null=True)),
+                ('histograma', models.JSONField(default=dict, help_text='Conteos por cubeta logarítmica {indice: conteo} (ver certificacion/historial.py)')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Etapa',
+                'verbose_name_plural': 'Resúmenes Diarios de Etapa',
+                'ordering': ['fecha', 'etapa'],
+                'indexes': [models.Index(fields=['etapa', 'fecha'], name='certificaci_etapa_4aa3da_idx')],
+                'unique_together': {('fecha', 'etapa', 'tipo_item', 'tipo_certificado')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TransicionEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('etapa_origen', models.CharField(choices=[('INGRESO', 'Ingreso'), ('FOTOGRAFIA', 'Fotografía'), ('REVISION', 'Revisión'), ('IMPRESION', 'Impresión'), ('FINALIZADA', 'Finalizada')], max_length=20)),
+                ('etapa_destino', models.CharField(choices=[('INGRESO', 'Ingreso'), ('FOTOGRAFIA', 'Fotografía'), ('REVISION', 'Revisión'), ('IMPRESION', 'Impresión'), ('FINALIZADA', 'Finalizada')], max_length=20)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.CharField(blank=True, max_length=150)),
+                ('duracion_segundos', models.PositiveIntegerField(blank=True, help_text='Tiempo de la orden en la etapa de origen (vacío si se desconoce la entrada)', null=True)),
+                ('orden', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transiciones', to='certificacion.orden')),
+            ],
+            options={
+                'verbose_name': 'Transición de Etapa',
+                'verbose_name_plural': 'Transiciones de Etapa',
+                'ordering': ['fecha'],
+                'indexes': [models.Index(fields=['orden', 'fecha'], name='certificaci_orden_i_0c5d3c_idx'), models.Index(fields=['fecha'], name='certificaci_fecha_649fa7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copiar_etapa_de_orden(apps, schema_editor):
+    """Los ítems existentes toman la etapa de su orden"""
+    Item = apps.get_model('certificacion', 'Item')
+    Orden = apps.get_model('certificacion', 'Orden')
+    Item.objects.update(
+        etapa=models.Subquery(
+            Orden.objects.filter(pk=models.OuterRef('orden_id')).values('estado_actual')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('certificacion', '0009_historial_etapas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='etapa',
+            field=models.CharField(choices=[('INGRESO', 'Ingreso'), ('FOTOGRAFIA', 'Fotografía'), ('REVISION', 'Revisión'), ('IMPRESION', 'Impresión'), ('FINALIZADA', 'Finalizada')], default='INGRESO', max_length=20),
+        ),
+        migrations.RunPython(copiar_etapa_de_orden, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='transicionetapa',
+            name='item',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='transiciones', to='certificacion.item'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['etapa', 'fecha_limite_etapa'], name='item_etapa_limite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transicionetapa',
+            index=models.Index(fields=['item', 'fecha'], name='certificaci_item_id_99807a_idx'),
+        ),
+    ]
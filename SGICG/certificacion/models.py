@@ -17,6 +17,33 @@ def get_foto_upload_path(instance, filename):
     item_folder = f"ITEM-{instance.item.numero_item}"
     return os.path.join(orden_folder, item_folder, filename)
 
+ETAPAS_ACTIVAS = ['INGRESO', 'FOTOGRAFIA', 'REVISION', 'IMPRESION']
+
+GEMAS_PRINCIPALES = [
+    'Ágata', 'Aguamarina', 'Alejandrita', 'Almandino - Espesartina', 'Amatista', 
+    'Amazonita', 'Ankerita', 'Antracita', 'Apatito', 'Azabache', 'Berilo', 
+    'Calcedonia', 'Calcopirita', 'Carbón', 'Citrino', 'Coral', 'Cordierita', 
+    'Corindón', 'Crisoberilo', 'Cristal de roca', 'Cuarzo', 'Dolomita', 'Espinela', 
+    'Euclasa', 'Feldespato', 'Fluorita', 'Fuchsita', 'Granate', 'Grosular', 
+    'Grosularia - Andradita', 'Grosularia', 'Jacinta', 'Jaspe', 'Malaquita', 
+    'Mica', 'Microclina', 'Moissanita', 'Obsidiana', 'Ónix', 'Ópalo', 'Paraiba', 
+    'Perla Cultivada', 'Pirita', 'Piropo - Almandino', 'Rubí Glassfilled', 'Rubí', 
+    'Rubí Estrella', 'Tanzanita', 'Trilitionita', 'Tsavorita', 'Turmalina', 'Vidrio', 
+    'Zafiro', 'Zafiro cambio de color', 'Zafiro estrella', 'Zircón', 'Zoisita', 
+    'Vivianita', 'Topacio', 'Cuarzo ahumado', 'Almandino - Piropo', 
+    'Espesartita - Piropo', 'Zirconia cubica', 'Diamante', 'Esmeralda'
+]
+
+FORMAS_GEMA = [
+    'Baguette', 'Barroco', 'Briolette', 'Caballo', 'Cilíndrica', 'Circular', 
+    'Cojín', 'Corazón', 'Cuadrada', 'Esfera', 'Esmeralda', 'Fantasía', 
+    'Hexagonal', 'Lágrima', 'Marquis', 'Ninguno', 'Óvalo', 'Prisma ditrigonal', 
+    'Prisma hexagonal', 'Prisma Piramidal', 'Prisma Tetragonal', 'Rectangular', 
+    'Redonda', 'Rostro', 'Trapecio', 'Trillion', 'Hoja', 'Cabuchon', 
+    'Prisma dihexagonal', 'Caballo de Mar', 'Varios'
+]
+
+
 class Orden(models.Model):
     """Modelo principal para las órdenes de certificación"""
     
@@ -47,6 +74,14 @@ class Orden(models.Model):
         ordering = ['-fecha_creacion']
         indexes = [
             models.Index(fields=['estado_actual', 'fecha_creacion']),
+            # Índice parcial: solo órdenes activas (las finalizadas dominan con el tiempo).
+            # Se usa fecha_cierre IS NULL porque SQLite no aplica índices parciales
+            # cuyo filtro depende de parámetros (como estado_actual IN (...))
+            models.Index(
+                fields=['fecha_creacion', 'estado_actual'],
+                name='orden_activa_creacion_idx',
+                condition=models.Q(fecha_cierre__isnull=True),
+            ),
         ]
 
     def __str__(self):
@@ -130,6 +165,8 @@ class Item(models.Model):
 
     orden = models.ForeignKey(Orden, related_name='items', on_delete=models.CASCADE)
     numero_item = models.PositiveIntegerField()
+    # Cada ítem avanza por su cuenta; la etapa de la orden es la menor de sus ítems
+    etapa = models.CharField(max_length=20, choices=Orden.ETAPAS, default='INGRESO')
     fecha_limite_etapa = models.DateTimeField(blank=True, null=True, db_index=True)
     
     # Campos principales
@@ -166,13 +203,24 @@ class Item(models.Model):
     # Archivos
     nombre_excel = models.CharField(max_length=255, blank=True, null=True)
     qr_cargado = models.ImageField(upload_to=get_qr_upload_path, blank=True, null=True)
+    qr_payload_hash = models.CharField(max_length=64, blank=True, null=True, help_text="Hash del contenido del QR generado")
     texto_para_copiar = models.TextField(blank=True, null=True, help_text="Texto formateado con todos los datos del ítem")
+    archivo_impresion = models.CharField(max_length=255, blank=True, null=True, help_text="PDF de impresión relativo a MEDIA_ROOT")
     
     class Meta:
         ordering = ['numero_item']
         unique_together = ['orden', 'numero_item']
         indexes = [
             models.Index(fields=['orden', 'fecha_limite_etapa']),
+            # Índice parcial: al finalizar la orden la fecha límite se limpia,
+            # así que solo indexa ítems de órdenes activas
+            models.Index(
+                fields=['fecha_limite_etapa', 'orden'],
+                name='item_limite_activo_idx',
+                condition=models.Q(fecha_limite_etapa__isnull=False),
+            ),
+            # Cola de trabajo de cada etapa: ítems de la etapa por fecha límite
+            models.Index(fields=['etapa', 'fecha_limite_etapa'], name='item_etapa_limite_idx'),
         ]
     
     def __str__(self):
@@ -188,6 +236,13 @@ class Item(models.Model):
             return 'file:///' + full_local_path.as_posix()
         return None
     
+    @property
+    def url_impresion(self):
+        """URL del PDF de impresión generado"""
+        if self.archivo_impresion:
+            return settings.MEDIA_URL + self.archivo_impresion
+        return None
+    
     @property
     def descripcion_texto(self):
         """Genera una descripción textual del ítem en formato natural"""
@@ -334,6 +389,44 @@ class FotoItem(models.Model):
         return f"Foto para {self.item}"
 
 
+class DatosExcelItem(models.Model):
+    """Modelo para los datos de certificación extraídos del Excel de cada ítem"""
+    
+    item = models.OneToOneField(Item, related_name='datos_excel', on_delete=models.CASCADE)
+    hoja = models.CharField(max_length=100, blank=True, null=True)
+    
+    # Campos comunes a las plantillas
+    numero_certificado = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    fecha_certificado = models.DateField(blank=True, null=True, db_index=True)
+    identificacion = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    peso_ct = models.DecimalField(
+        max_digits=9,
+        decimal_places=3,
+        blank=True,
+        null=True,
+        db_index=True
+    )
+    dimensiones = models.CharField(max_length=100, blank=True, null=True)
+    color = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    origen = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    tratamiento = models.CharField(max_length=255, blank=True, null=True)
+    
+    # Todos los pares encabezado -> valor de la hoja principal
+    datos = models.JSONField(default=dict, blank=True)
+    
+    # Control de extracción incremental
+    archivo_mtime = models.FloatField()
+    archivo_hash = models.CharField(max_length=64)
+    fecha_extraccion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Datos de Excel del Ítem"
+        verbose_name_plural = "Datos de Excel de los Ítems"
+    
+    def __str__(self):
+        return f"Datos Excel de {self.item}"
+
+
 class ConfiguracionTiempos(models.Model):
     """Modelo para la configuración de tiempos estimados por etapa"""
     
@@ -418,4 +511,203 @@ class ConfiguracionTiempos(models.Model):
                 if valor > 2592000:  # 30 días
                     raise ValidationError(f"{field_name}: El tiempo no puede exceder 30 días")
                 if valor < 60:  # 1 minuto mínimo
-                    raise ValidationError(f"{field_name}: El tiempo mínimo es de 60 segundos")
\ No newline at end of file
+                    raise ValidationError(f"{field_name}: El tiempo mínimo es de 60 segundos")
+
+
+class RecalculoPlazos(models.Model):
+    """
+    Recálculo de las fechas límite de ítems en curso tras un cambio de
+    ConfiguracionTiempos. Guarda los tiempos anterior y nuevo de cada par
+    modificado y el avance por lotes, para poder reanudarlo si se interrumpe.
+    """
+
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_CURSO', 'En curso'),
+        ('COMPLETADO', 'Completado'),
+    ]
+
+    fecha_creacion = models.DateTimeField(default=timezone.now, db_index=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+    estado = models.CharField(max_length=12, choices=ESTADOS, default='PENDIENTE', db_index=True)
+    cambios = models.JSONField(
+        default=dict,
+        help_text="{'TIPO_ITEM:TIPO_CERT': {'ETAPA': [segundos_anterior, segundos_nuevo]}}"
+    )
+    ultima_orden_id = models.BigIntegerField(default=0, help_text="Última orden procesada (punto de reanudación)")
+    ordenes_procesadas = models.PositiveIntegerField(default=0)
+    items_actualizados = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = "Recálculo de Plazos"
+        verbose_name_plural = "Recálculos de Plazos"
+
+    def __str__(self):
+        return f"Recálculo de plazos {self.id} ({self.get_estado_display()})"
+
+
+# --- HISTORIAL DE ETAPAS ---
+
+class TransicionEtapa(models.Model):
+    """
+    Registro de solo inserción de los cambios de etapa. Con ítem, es el avance
+    de ese ítem; sin ítem, el cambio de etapa de la orden (la menor de sus
+    ítems). Las FK no tienen restricción en la base de datos para que el
+    registro sobreviva al archivado de la orden.
+    """
+
+    orden = models.ForeignKey(
+        Orden,
+        related_name='transiciones',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+    )
+    item = models.ForeignKey(
+        Item,
+        related_name='transiciones',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        blank=True,
+        null=True,
+    )
+    etapa_origen = models.CharField(max_length=20, choices=Orden.ETAPAS)
+    etapa_destino = models.CharField(max_length=20, choices=Orden.ETAPAS)
+    fecha = models.DateTimeField(default=timezone.now)
+    actor = models.CharField(max_length=150, blank=True)
+    duracion_segundos = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="Tiempo de la orden en la etapa de origen (vacío si se desconoce la entrada)"
+    )
+
+    class Meta:
+        ordering = ['fecha']
+        verbose_name = "Transición de Etapa"
+        verbose_name_plural = "Transiciones de Etapa"
+        indexes = [
+            models.Index(fields=['orden', 'fecha']),
+            models.Index(fields=['item', 'fecha']),
+            models.Index(fields=['fecha']),
+        ]
+
+    def __str__(self):
+        if self.item_id:
+            return f"Ítem {self.item_id} (orden {self.orden_id}): {self.etapa_origen} -> {self.etapa_destino}"
+        return f"Orden {self.orden_id}: {self.etapa_origen} -> {self.etapa_destino}"
+
+
+class ResumenDiarioEtapa(models.Model):
+    """
+    Agregado diario de la duración de cada etapa por tipo de ítem y de
+    certificado, mantenido de forma incremental al registrar cada transición.
+    La duración de la orden en la etapa se reparte entre sus ítems según el
+    tiempo configurado de cada uno.
+    """
+
+    fecha = models.DateField()
+    etapa = models.CharField(max_length=20, choices=Orden.ETAPAS)
+    tipo_item = models.CharField(max_length=10, choices=ConfiguracionTiempos.TIPO_ITEM_CHOICES)
+    tipo_certificado = models.CharField(max_length=15, choices=ConfiguracionTiempos.TIPO_CERT_CHOICES)
+
+    conteo = models.PositiveIntegerField(default=0)
+    suma_segundos = models.BigIntegerField(default=0)
+    minimo_segundos = models.PositiveIntegerField(blank=True, null=True)
+    maximo_segundos = models.PositiveIntegerField(blank=True, null=True)
+    p90_segundos = models.PositiveIntegerField(blank=True, null=True)
+    histograma = models.JSONField(
+        default=dict,
+        help_text="Conteos por cubeta logarítmica {indice: conteo} (ver certificacion/historial.py)"
+    )
+
+    class Meta:
+        ordering = ['fecha', 'etapa']
+        verbose_name = "Resumen Diario de Etapa"
+        verbose_name_plural = "Resúmenes Diarios de Etapa"
+        unique_together = ('fecha', 'etapa', 'tipo_item', 'tipo_certificado')
+        indexes = [
+            models.Index(fields=['etapa', 'fecha']),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} {self.etapa} {self.tipo_item}/{self.tipo_certificado}: {self.conteo}"
+
+    @property
+    def media_segundos(self):
+        return self.suma_segundos / self.conteo if self.conteo else None
+
+
+# --- ARCHIVO HISTÓRICO ---
+
+class OrdenArchivada(models.Model):
+    """Modelo para las órdenes finalizadas movidas fuera de las tablas activas"""
+    
+    id_original = models.BigIntegerField(unique=True)
+    numero_orden_facturacion = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Número de Orden (Facturación)",
+        db_index=True
+    )
+    estado_actual = models.CharField(max_length=20, choices=Orden.ETAPAS, default='FINALIZADA')
+    fecha_creacion = models.DateTimeField(db_index=True)
+    fecha_cierre = models.DateTimeField(blank=True, null=True, db_index=True)
+    fecha_archivado = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-fecha_creacion']
+        verbose_name = "Orden Archivada"
+        verbose_name_plural = "Órdenes Archivadas"
+
+    def __str__(self):
+        return f"Orden archivada {self.id_original} - {self.numero_orden_facturacion}"
+
+
+class ItemArchivado(models.Model):
+    """Modelo para los ítems de las órdenes archivadas"""
+    
+    orden = models.ForeignKey(OrdenArchivada, related_name='items', on_delete=models.CASCADE)
+    id_original = models.BigIntegerField(unique=True)
+    numero_item = models.PositiveIntegerField()
+    
+    tipo_certificado = models.CharField(max_length=15, choices=Item.TIPO_CERT_CHOICES)
+    que_es = models.CharField(max_length=15, choices=Item.QUE_ES_CHOICES)
+    codigo_referencia = models.CharField(max_length=100, blank=True, null=True)
+    tipo_joya = models.CharField(max_length=15, choices=Item.TIPO_JOYA_CHOICES, blank=True, null=True)
+    metal = models.CharField(max_length=15, choices=Item.METAL_CHOICES, blank=True, null=True)
+    cantidad_gemas = models.PositiveIntegerField(blank=True, null=True)
+    componentes_set = models.CharField(max_length=255, blank=True, null=True)
+    gema_principal = models.CharField(max_length=100, blank=True, null=True)
+    forma_gema = models.CharField(max_length=100, default='Ninguno')
+    peso_gema = models.DecimalField(max_digits=7, decimal_places=2, blank=True, null=True)
+    comentarios = models.TextField(blank=True, null=True)
+    
+    # Rutas de archivos (relativas a MEDIA_ROOT, los archivos no se mueven)
+    nombre_excel = models.CharField(max_length=255, blank=True, null=True)
+    qr_cargado = models.CharField(max_length=255, blank=True, null=True)
+    archivo_impresion = models.CharField(max_length=255, blank=True, null=True)
+    texto_para_copiar = models.TextField(blank=True, null=True)
+    
+    # Datos extraídos del Excel (si existían)
+    numero_certificado = models.CharField(max_length=100, blank=True, null=True, db_index=True)
+    datos_excel = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        ordering = ['numero_item']
+        verbose_name = "Ítem Archivado"
+        verbose_name_plural = "Ítems Archivados"
+    
+    def __str__(self):
+        return f"Item archivado {self.numero_item} - Orden {self.orden.numero_orden_facturacion}"
+
+
+class FotoItemArchivada(models.Model):
+    """Modelo para las fotos de los ítems archivados"""
+    
+    item = models.ForeignKey(ItemArchivado, related_name='fotos', on_delete=models.CASCADE)
+    imagen = models.CharField(max_length=255)
+    fecha_subida = models.DateTimeField()
+    descripcion = models.CharField(max_length=255, blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-fecha_subida']
@@ -0,0 +1,105 @@
+# certificacion/plantillas.py
+
+import os
+import hashlib
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PlantillaInfo = namedtuple('PlantillaInfo', ['nombre', 'tamano', 'mtime', 'hash'])
+
+INTERVALO_VERIFICACION = 2  # Segundos mínimos entre verificaciones del directorio
+
+
+class CatalogoPlantillas:
+    """
+    Índice en memoria de las plantillas Excel de PLANTILLAS_ROOT.
+
+    Solo se vuelve a escanear el directorio cuando cambia su mtime, y el hash
+    de contenido solo se recalcula para archivos cuyo tamaño o mtime cambió.
+    """
+
+    def __init__(self, ruta=None):
+        self._ruta = ruta
+        self._plantillas = {}
+        self._mtime_directorio = None
+        self._ultima_verificacion = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ruta(self):
+        return self._ruta or getattr(settings, 'PLANTILLAS_ROOT', None)
+
+    def _calcular_hash(self, ruta_archivo):
+        """Calcula el hash SHA-256 del contenido de un archivo"""
+        sha = hashlib.sha256()
+        with open(ruta_archivo, 'rb') as f:
+            for bloque in iter(lambda: f.read(65536), b''):
+                sha.update(bloque)
+        return sha.hexdigest()
+
+    def _escanear(self, ruta):
+        """Reconstruye el índice reutilizando entradas sin cambios"""
+        plantillas = {}
+        with os.scandir(ruta) as entradas:
+            for entrada in entradas:
+                nombre = entrada.name
+                if not entrada.is_file() or not nombre.lower().endswith('.xlsx') or nombre.startswith('~'):
+                    continue
+
+                stat = entrada.stat()
+                anterior = self._plantillas.get(nombre)
+                if anterior and anterior.tamano == stat.st_size and anterior.mtime == stat.st_mtime:
+                    plantillas[nombre] = anterior
+                    continue
+
+                try:
+                    hash_contenido = self._calcular_hash(entrada.path)
+                except OSError as e:
+                    logger.warning(f"No se pudo leer la plantilla {nombre}: {str(e)}")
+                    continue
+
+                plantillas[nombre] = PlantillaInfo(nombre, stat.st_size, stat.st_mtime, hash_contenido)
+
+        self._plantillas = plantillas
+        logger.info(f"Catálogo de plantillas actualizado: {len(plantillas)} plantillas")
+
+    def refrescar(self, forzar=False):
+        """Actualiza el índice si el mtime del directorio cambió"""
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultima_verificacion < INTERVALO_VERIFICACION:
+            return
+
+        with self._lock:
+            self._ultima_verificacion = ahora
+            ruta = self.ruta
+            if not ruta or not os.path.isdir(ruta):
+                self._plantillas = {}
+                self._mtime_directorio = None
+                return
+
+            mtime_directorio = os.stat(ruta).st_mtime
+            if forzar or mtime_directorio != self._mtime_directorio:
+                self._escanear(ruta)
+                self._mtime_directorio = mtime_directorio
+
+    def nombres(self):
+        """Devuelve los nombres de plantillas ordenados"""
+        self.refrescar()
+        return sorted(self._plantillas)
+
+    def obtener(self, nombre):
+        """Devuelve la PlantillaInfo de una plantilla o None si no existe"""
+        self.refrescar()
+        return self._plantillas.get(nombre)
+
+    def __contains__(self, nombre):
+        return self.obtener(nombre) is not None
+
+
+catalogo_plantillas = CatalogoPlantillas()
@@ -0,0 +1,282 @@
+# certificacion/plazos.py
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Sum, Value, When
+from django.db.models.expressions import Window
+from django.utils import timezone
+
+from .base_datos import transaccion_escritura
+from .models import Orden, Item, RecalculoPlazos, ETAPAS_ACTIVAS
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500  # Órdenes por transacción
+
+
+def registrar_cambios(anteriores, nuevos):
+    """
+    Crea un RecalculoPlazos con las diferencias entre dos estados de la
+    configuración de tiempos. Llamar dentro de la misma transacción que guarda
+    los cambios.
+
+    Args:
+        anteriores, nuevos: {(tipo_item, tipo_certificado): {etapa: segundos}}
+
+    Returns:
+        RecalculoPlazos | None: None si ningún tiempo cambió
+    """
+    cambios = {}
+    for par, tiempos_nuevos in nuevos.items():
+        tiempos_anteriores = anteriores.get(par, {})
+        diferencias = {
+            etapa: [tiempos_anteriores.get(etapa), segundos]
+            for etapa, segundos in tiempos_nuevos.items()
+            if tiempos_anteriores.get(etapa) is not None and tiempos_anteriores.get(etapa) != segundos
+        }
+        if diferencias:
+            cambios[':'.join(par)] = diferencias
+
+    if not cambios:
+        return None
+    return RecalculoPlazos.objects.create(cambios=cambios)
+
+
+def expresion_tipo_item():
+    """Clasificación del ítem en SQL, la misma que usan la creación de órdenes y avanzar_etapa"""
+    return Case(
+        When(que_es='JOYA', tipo_joya='SET', then=Value('SET')),
+        When(que_es='PIEDRA', then=Value('PIEDRA')),
+        When(que_es='LOTE', then=Value('LOTE')),
+        default=Value('JOYA'),
+    )
+
+
+class MotorRecalculoPlazos:
+    """
+    Aplica un RecalculoPlazos a las fechas límite de los ítems en curso.
+
+    Al crear una orden, la fecha límite del ítem k es el punto de partida más la
+    duración total de los ítems 1..k, y cuando un ítem termina una etapa se
+    resta su tiempo en ella de él y de los ítems siguientes (ver flujo.py). Por
+    eso, si cambia el tiempo de una etapa aún pendiente, el ítem k se desplaza
+    la suma de las diferencias de los ítems 1..k de su orden. Ese desplazamiento se calcula en
+    SQL (CASE por tipo y etapa + suma acumulada con función ventana) y se
+    aplica con un UPDATE por cada desplazamiento distinto del lote.
+
+    Solo se tocan órdenes creadas antes del cambio: las posteriores ya usaron
+    los tiempos nuevos. Las órdenes posteriores en la cola no se desplazan.
+    """
+
+    def __init__(self, recalculo, tamano_lote=TAMANO_LOTE):
+        self.recalculo = recalculo
+        self.tamano_lote = tamano_lote
+        self.resumen = {'ordenes': 0, 'items': 0}
+
+    def _diferencias(self):
+        """
+        Returns:
+            dict: {(tipo_item, tipo_certificado): {etapa: segundos nuevo - anterior}}
+        """
+        diferencias = {}
+        for clave, etapas in self.recalculo.cambios.items():
+            tipo_item, tipo_certificado = clave.split(':')
+            diferencias[(tipo_item, tipo_certificado)] = {
+                etapa: nuevo - anterior for etapa, (anterior, nuevo) in etapas.items()
+            }
+        return diferencias
+
+    def _desplazamiento_propio(self):
+        """
+        Expresión con los segundos que cambia el trabajo pendiente de cada ítem:
+        la suma de las diferencias de las etapas que aún no ha terminado.
+
+        Returns:
+            tuple: (expresión Case, etapas de ítem con algún desplazamiento)
+        """
+        condiciones = []
+        etapas_afectadas = set()
+        for (tipo_item, tipo_certificado), etapas in self._diferencias().items():
+            for i, etapa_item in enumerate(ETAPAS_ACTIVAS):
+                segundos = sum(etapas.get(etapa, 0) for etapa in ETAPAS_ACTIVAS[i:])
+                if segundos:
+                    etapas_afectadas.add(etapa_item)
+                    condiciones.append(When(
+                        tipo_item_calculado=tipo_item,
+                        tipo_certificado=tipo_certificado,
+                        etapa=etapa_item,
+                        then=Value(segundos),
+                    ))
+
+        expresion = Case(*condiciones, default=Value(0), output_field=IntegerField()) if condiciones else Value(0)
+        return expresion, etapas_afectadas
+
+    def ordenes_afectadas(self):
+        """QuerySet de órdenes en curso, creadas antes del cambio y con ítems de tipos modificados pendientes"""
+        _, etapas_afectadas = self._desplazamiento_propio()
+        certificados = {clave.split(':')[1] for clave in self.recalculo.cambios}
+        # La etapa de la orden es la menor de sus ítems: se filtra por la de los ítems
+        return Orden.objects.filter(
+            fecha_creacion__lt=self.recalculo.fecha_creacion,
+            fecha_cierre__isnull=True,
+        ).filter(
+            Exists(Item.objects.filter(
+                orden=OuterRef('pk'), etapa__in=etapas_afectadas, tipo_certificado__in=certificados
+            ))
+        ).order_by('id')
+
+    def _desplazamientos(self, orden_ids):
+        """
+        Desplazamiento acumulado de cada ítem de las órdenes indicadas.
+
+        Returns:
+            list: dicts con id, orden_id, fecha_limite_etapa y desplazamiento (segundos)
+        """
+        desplazamiento, _ = self._desplazamiento_propio()
+        return list(
+            Item.objects.filter(
+                orden_id__in=orden_ids,
+                fecha_limite_etapa__isnull=False,
+            ).annotate(
+                tipo_item_calculado=expresion_tipo_item(),
+            ).annotate(
+                desplazamiento_propio=desplazamiento,
+            ).annotate(
+                desplazamiento=Window(
+                    Sum('desplazamiento_propio'),
+                    partition_by=[F('orden_id')],
+                    order_by=F('numero_item').asc(),
+                ),
+            ).values('id', 'orden_id', 'fecha_limite_etapa', 'desplazamiento')
+        )
+
+    def _procesar_lote(self):
+        """
+        Reclama el siguiente lote de órdenes, desplaza sus fechas límite y guarda
+        el punto de reanudación en la misma transacción.
+
+        Returns:
+            int: Órdenes procesadas en el lote (0 si no quedan)
+        """
+        with transaccion_escritura():
+            recalculo = RecalculoPlazos.objects.select_for_update().get(pk=self.recalculo.pk)
+            # Bloquea las órdenes frente a avanzar_etapa mientras se desplazan
+            orden_ids = list(
+                self.ordenes_afectadas().filter(id__gt=recalculo.ultima_orden_id)
+                .select_for_update().values_list('id', flat=True)[:self.tamano_lote]
+            )
+            if not orden_ids:
+                return 0
+
+            por_desplazamiento = defaultdict(list)
+            for fila in self._desplazamientos(orden_ids):
+                if fila['desplazamiento']:
+                    por_desplazamiento[fila['desplazamiento']].append(fila['id'])
+
+            items = 0
+            for segundos, item_ids in por_desplazamiento.items():
+                items += Item.objects.filter(id__in=item_ids).update(
+                    fecha_limite_etapa=F('fecha_limite_etapa') + timedelta(seconds=segundos)
+                )
+
+            recalculo.ultima_orden_id = orden_ids[-1]
+            recalculo.ordenes_procesadas += len(orden_ids)
+            recalculo.items_actualizados += items
+            recalculo.estado = 'EN_CURSO'
+            recalculo.save(update_fields=['ultima_orden_id', 'ordenes_procesadas', 'items_actualizados', 'estado'])
+            self.recalculo = recalculo
+
+        self.resumen['ordenes'] += len(orden_ids)
+        self.resumen['items'] += items
+        return len(orden_ids)
+
+    def ejecutar(self):
+        """
+        Procesa todas las órdenes afectadas desde el último punto de reanudación.
+
+        Returns:
+            dict: Resumen con órdenes procesadas e ítems actualizados en esta ejecución
+        """
+        if self.recalculo.estado == 'COMPLETADO':
+            return self.resumen
+
+        while True:
+            procesadas = self._procesar_lote()
+            if not procesadas:
+                break
+            logger.info(
+                f"Recálculo {self.recalculo.id}: {self.resumen['ordenes']} órdenes, "
+                f"{self.resumen['items']} ítems desplazados"
+            )
+
+        with transaction.atomic():
+            RecalculoPlazos.objects.filter(pk=self.recalculo.pk).update(
+                estado='COMPLETADO', fecha_fin=timezone.now()
+            )
+        self.recalculo.refresh_from_db()
+        return self.resumen
+
+    def simular(self, muestra=10):
+        """
+        Calcula sin escribir los cambios de ETA (última fecha límite) por orden.
+
+        Returns:
+            dict: órdenes e ítems afectados, deltas mínimo/máximo/medio en segundos
+                  y las órdenes con mayor cambio
+        """
+        ultima = self.recalculo.ultima_orden_id
+        orden_ids = list(self.ordenes_afectadas().filter(id__gt=ultima).values_list('id', flat=True))
+
+        etas = {}
+        items = 0
+        for inicio in range(0, len(orden_ids), self.tamano_lote):
+            for fila in self._desplazamientos(orden_ids[inicio:inicio + self.tamano_lote]):
+                anterior = fila['fecha_limite_etapa']
+                nueva = anterior + timedelta(seconds=fila['desplazamiento'])
+                items += 1 if fila['desplazamiento'] else 0
+                eta_anterior, eta_nueva = etas.get(fila['orden_id'], (anterior, nueva))
+                etas[fila['orden_id']] = (max(eta_anterior, anterior), max(eta_nueva, nueva))
+
+        deltas = {
+            orden_id: (nueva - anterior).total_seconds()
+            for orden_id, (anterior, nueva) in etas.items()
+            if nueva != anterior
+        }
+        numeros = dict(Orden.objects.filter(id__in=deltas).values_list('id', 'numero_orden_facturacion'))
+        mayores = sorted(deltas, key=lambda orden_id: abs(deltas[orden_id]), reverse=True)[:muestra]
+
+        return {
+            'ordenes': len(deltas),
+            'items': items,
+            'delta_min_s': min(deltas.values()) if deltas else 0,
+            'delta_max_s': max(deltas.values()) if deltas else 0,
+            'delta_medio_s': round(sum(deltas.values()) / len(deltas), 1) if deltas else 0,
+            'muestra': [
+                {
+                    'orden': numeros.get(orden_id, orden_id),
+                    'eta_anterior': etas[orden_id][0],
+                    'eta_nueva': etas[orden_id][1],
+                    'delta_s': deltas[orden_id],
+                }
+                for orden_id in mayores
+            ],
+        }
+
+
+def recalcular_pendientes(tamano_lote=TAMANO_LOTE):
+    """
+    Ejecuta en orden de creación todos los recálculos pendientes o interrumpidos.
+
+    Returns:
+        dict: Resumen acumulado con recálculos, órdenes e ítems
+    """
+    resumen = {'recalculos': 0, 'ordenes': 0, 'items': 0}
+    for recalculo in RecalculoPlazos.objects.exclude(estado='COMPLETADO').order_by('id'):
+        parcial = MotorRecalculoPlazos(recalculo, tamano_lote).ejecutar()
+        resumen['recalculos'] += 1
+        resumen['ordenes'] += parcial['ordenes']
+        resumen['items'] += parcial['items']
+    return resumen
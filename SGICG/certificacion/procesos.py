@@ -0,0 +1,48 @@
+# certificacion/procesos.py
+"""
+Pools de procesos para el trabajo pesado (extracción de Excel, PDF, QR).
+
+Este módulo no importa modelos al cargarse: con el método de arranque
+'spawn' (el de Windows) cada proceso hijo empieza sin Django inicializado y
+debe poder importar el inicializador antes de cargar los módulos que usan
+el ORM.
+
+Las vistas usan pool_compartido(): arrancar un pool en cada petición cuesta
+más que el propio trabajo, sobre todo con 'spawn'.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pool = None
+_pool_pid = None
+_bloqueo = threading.Lock()
+
+
+def inicializar_django():
+    """Inicializador de los procesos de trabajo: deja Django listo (no-op tras fork)"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def crear_pool(max_workers=None):
+    """ProcessPoolExecutor cuyos procesos inicializan Django al arrancar"""
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=inicializar_django)
+
+
+def pool_compartido():
+    """
+    Pool de procesos reutilizado durante toda la vida del proceso. Se crea
+    al primer uso y se vuelve a crear tras un fork (workers con preload) o si
+    un proceso hijo murió y el pool quedó roto. No debe cerrarse con 'with'.
+    """
+    global _pool, _pool_pid
+    with _bloqueo:
+        if _pool is None or _pool_pid != os.getpid() or getattr(_pool, '_broken', False):
+            _pool = crear_pool()
+            _pool_pid = os.getpid()
+        return _pool
@@ -0,0 +1,237 @@
+# certificacion/servidor_medios.py
+
+import io
+import os
+import re
+import hashlib
+import mimetypes
+import posixpath
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .models import Orden, OrdenArchivada
+from .impresion import CARPETA_IMPRESIONES
+
+CARPETA_ORDEN = re.compile(r'^ORDEN-(\d+)$')
+RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+TAMANO_BLOQUE = 64 * 1024
+MAX_AGE = 3600
+
+
+def resolver_medio(nombre):
+    """
+    Comprueba que el archivo pedido pertenece a una carpeta gestionada (una
+    orden activa o archivada, o las impresiones) y devuelve su ruta, la del
+    spool si aún no se replicó.
+
+    Raises:
+        Http404: Ruta fuera de MEDIA_ROOT, carpeta no gestionada o archivo inexistente
+    """
+    nombre = posixpath.normpath(nombre.replace('\\', '/'))
+    if nombre.startswith(('..', '/')):
+        raise Http404("Archivo no encontrado")
+    try:
+        safe_join(str(settings.MEDIA_ROOT), nombre)
+    except Exception:
+        raise Http404("Archivo no encontrado")
+
+    carpeta = nombre.split('/', 1)[0]
+    coincidencia = CARPETA_ORDEN.match(carpeta)
+    if coincidencia:
+        orden_id = int(coincidencia.group(1))
+        if not (Orden.objects.filter(id=orden_id).exists()
+                or OrdenArchivada.objects.filter(id_original=orden_id).exists()):
+            raise Http404("Archivo no encontrado")
+    elif carpeta != CARPETA_IMPRESIONES:
+        raise Http404("Archivo no encontrado")
+
+    ruta = default_storage.path(nombre)
+    if not os.path.isfile(ruta):
+        raise Http404("Archivo no encontrado")
+    return ruta
+
+
+def etag_archivo(ruta, info):
+    """
+    ETag fuerte a partir del nombre, tamaño y mtime en nanosegundos, sin leer
+    el archivo. No usa la ruta completa: la copia del spool y la replicada
+    conservan la misma fecha (ver almacenamiento.py).
+    """
+    firma = f"{os.path.basename(ruta)}:{info.st_size}:{info.st_mtime_ns}".encode('utf-8')
+    return f'"{hashlib.sha1(firma).hexdigest()[:20]}"'
+
+
+def _rango_solicitado(request, tamano, etag, ultima_modificacion):
+    """
+    Interpreta la cabecera Range (un solo rango; varios rangos se responden
+    completos, como permite la RFC 9110).
+
+    Returns:
+        tuple | None: (inicio, fin inclusive), None para responder completo
+                      o 'invalido' si el rango no es satisfacible
+    """
+    cabecera = request.META.get('HTTP_RANGE', '')
+    coincidencia = RANGO.match(cabecera.strip())
+    if not coincidencia or request.method != 'GET':
+        return None
+
+    # If-Range: solo se responde parcial si el archivo no cambió
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range:
+        if if_range.startswith('"'):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != ultima_modificacion:
+            return None
+
+    inicio, fin = coincidencia.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        # Sufijo: los últimos N bytes
+        longitud = int(fin)
+        if longitud == 0:
+            return 'invalido'
+        return max(0, tamano - longitud), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return 'invalido'
+    return inicio, fin
+
+
+class _Tramo(io.RawIOBase):
+    """
+    Vista de solo lectura de un tramo de un archivo. Expone fileno() y la
+    posición real, así el wsgi.file_wrapper del servidor (sendfile en gunicorn)
+    envía el tramo sin copiarlo a Python.
+    """
+
+    def __init__(self, archivo, inicio, longitud):
+        super().__init__()
+        self._archivo = archivo
+        self._fin = inicio + longitud
+        self.name = archivo.name
+        archivo.seek(inicio)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        return self._archivo.fileno()
+
+    def tell(self):
+        return self._archivo.tell()
+
+    def seek(self, posicion, desde=io.SEEK_SET):
+        if desde == io.SEEK_END:
+            return self._archivo.seek(self._fin + posicion)
+        return self._archivo.seek(posicion, desde)
+
+    def read(self, tamano=-1):
+        restante = max(0, self._fin - self._archivo.tell())
+        if tamano is None or tamano < 0 or tamano > restante:
+            tamano = restante
+        return self._archivo.read(tamano)
+
+    def close(self):
+        self._archivo.close()
+        super().close()
+
+
+async def _bloques_async(archivo):
+    try:
+        while True:
+            bloque = await sync_to_async(archivo.read, thread_sensitive=False)(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def _cabeceras_comunes(respuesta, etag, ultima_modificacion):
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(ultima_modificacion)
+    respuesta['Accept-Ranges'] = 'bytes'
+    respuesta['Cache-Control'] = f'private, max-age={MAX_AGE}'
+    return respuesta
+
+
+def _delegar(ruta, tipo):
+    """
+    Respuesta vacía con la cabecera para que el servidor web envíe el archivo
+    (él atiende Range y condicionales). None si no hay servidor configurado o
+    el archivo está en una ubicación que no conoce.
+    """
+    servidor = getattr(settings, 'MEDIA_SERVIDOR', '')
+    if servidor == 'apache':
+        respuesta = HttpResponse(content_type=tipo)
+        respuesta['X-Sendfile'] = ruta
+        return respuesta
+    if servidor != 'nginx':
+        return None
+
+    ubicaciones = [(str(settings.MEDIA_ROOT), settings.MEDIA_ACCEL_PREFIJO)]
+    spool = getattr(default_storage, 'spool', None)
+    if spool is not None and getattr(settings, 'MEDIA_ACCEL_PREFIJO_SPOOL', None):
+        ubicaciones.insert(0, (spool.location, settings.MEDIA_ACCEL_PREFIJO_SPOOL))
+    for raiz, prefijo in ubicaciones:
+        relativa = os.path.relpath(ruta, raiz)
+        if not relativa.startswith('..'):
+            respuesta = HttpResponse(content_type=tipo)
+            respuesta['X-Accel-Redirect'] = prefijo.rstrip('/') + '/' + relativa.replace(os.sep, '/')
+            return respuesta
+    return None
+
+
+def respuesta_medio(request, ruta):
+    """
+    Construye la respuesta para un archivo de medios: 304/412 según las
+    cabeceras condicionales, delegación al servidor web si está configurada
+    o FileResponse con soporte de Range.
+    """
+    info = os.stat(ruta)
+    etag = etag_archivo(ruta, info)
+    ultima_modificacion = int(info.st_mtime)
+
+    condicional = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if condicional is not None:
+        return _cabeceras_comunes(condicional, etag, ultima_modificacion)
+
+    tipo = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+    delegada = _delegar(ruta, tipo)
+    if delegada is not None:
+        return _cabeceras_comunes(delegada, etag, ultima_modificacion)
+
+    rango = _rango_solicitado(request, info.st_size, etag, ultima_modificacion)
+    if rango == 'invalido':
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{info.st_size}'
+        return _cabeceras_comunes(respuesta, etag, ultima_modificacion)
+
+    archivo = open(ruta, 'rb')
+    if rango:
+        inicio, fin = rango
+        archivo = _Tramo(archivo, inicio, fin - inicio + 1)
+
+    if settings.ASGI:
+        # Bajo ASGI Django leería un iterador síncrono completo antes de enviarlo
+        respuesta = StreamingHttpResponse(_bloques_async(archivo), content_type=tipo)
+        respuesta['Content-Length'] = (fin - inicio + 1) if rango else info.st_size
+    else:
+        respuesta = FileResponse(archivo, content_type=tipo)
+
+    if rango:
+        respuesta.status_code = 206
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{info.st_size}'
+    return _cabeceras_comunes(respuesta, etag, ultima_modificacion)
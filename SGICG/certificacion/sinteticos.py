@@ -0,0 +1,232 @@
+# certificacion/sinteticos.py
+
+import re
+import random
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import IntegerField, Max
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+
+from .models import Orden, Item, FotoItem, OrdenArchivada, GEMAS_PRINCIPALES, FORMAS_GEMA
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_DEFAULT = 'SINT'
+TAMANO_LOTE = 2000  # Órdenes por transacción
+
+# Proporción de órdenes en cada etapa (por defecto dominan las finalizadas, como en producción)
+DISTRIBUCION_ETAPAS_DEFAULT = {
+    'INGRESO': 0.05,
+    'FOTOGRAFIA': 0.04,
+    'REVISION': 0.03,
+    'IMPRESION': 0.03,
+    'FINALIZADA': 0.85,
+}
+
+# Proporción de cada tipo de ítem
+DISTRIBUCION_QUE_ES = {
+    'JOYA': 0.45,
+    'PIEDRA': 0.35,
+    'LOTE': 0.10,
+    'VERBAL_A_GC': 0.05,
+    'REIMPRESION': 0.05,
+}
+
+COMPONENTES_SET = ['Anillo', 'Dije', 'Topos', 'Pulsera', 'Cadena']
+
+
+def parsear_distribucion(texto):
+    """
+    Convierte 'INGRESO=0.3,FINALIZADA=0.7' en un diccionario de pesos por etapa.
+
+    Raises:
+        ValueError: Si el formato o alguna etapa no es válida
+    """
+    etapas_validas = dict(Orden.ETAPAS)
+    distribucion = {}
+    for parte in texto.split(','):
+        if not parte.strip():
+            continue
+        try:
+            etapa, peso = parte.split('=')
+            etapa = etapa.strip().upper()
+            peso = float(peso)
+        except ValueError:
+            raise ValueError(f"Formato no válido: '{parte}' (se espera ETAPA=peso)")
+        if etapa not in etapas_validas:
+            raise ValueError(f"Etapa no válida: {etapa}")
+        if peso < 0:
+            raise ValueError(f"El peso de {etapa} no puede ser negativo")
+        distribucion[etapa] = peso
+
+    if not distribucion or sum(distribucion.values()) <= 0:
+        raise ValueError("La distribución debe tener al menos un peso positivo")
+    return distribucion
+
+
+class GeneradorDatosSinteticos:
+    """Clase para poblar la base de datos con órdenes, ítems y fotos sintéticos"""
+
+    def __init__(self, semilla=42, items_por_orden=(1, 5), fotos_por_item=(0, 3),
+                 distribucion=None, fraccion_retrasados=0.2, prefijo=PREFIJO_DEFAULT,
+                 tamano_lote=TAMANO_LOTE):
+        self.aleatorio = random.Random(semilla)
+        self.items_por_orden = items_por_orden
+        self.fotos_por_item = fotos_por_item
+        self.distribucion = distribucion or DISTRIBUCION_ETAPAS_DEFAULT
+        self.fraccion_retrasados = fraccion_retrasados
+        self.prefijo = prefijo
+        self.tamano_lote = tamano_lote
+        self.resumen = {'ordenes': 0, 'items': 0, 'fotos': 0, 'retrasados': 0}
+
+    def _elegir(self, pesos):
+        return self.aleatorio.choices(list(pesos), weights=list(pesos.values()))[0]
+
+    def _datos_item(self):
+        """Campos aleatorios de un ítem, tomados de las listas de opciones reales"""
+        que_es = self._elegir(DISTRIBUCION_QUE_ES)
+        datos = {
+            'tipo_certificado': self.aleatorio.choice(Item.TIPO_CERT_CHOICES)[0],
+            'que_es': que_es,
+            'forma_gema': 'Ninguno',
+        }
+
+        if que_es in ['VERBAL_A_GC', 'REIMPRESION']:
+            datos['codigo_referencia'] = f"GC-{self.aleatorio.randint(1, 999999):06d}"
+            return datos
+
+        datos['gema_principal'] = self.aleatorio.choice(GEMAS_PRINCIPALES)
+        datos['forma_gema'] = self.aleatorio.choice(FORMAS_GEMA)
+        datos['peso_gema'] = Decimal(self.aleatorio.randint(5, 2500)) / 100
+        datos['cantidad_gemas'] = self.aleatorio.choice([1, 1, 1, 2, 3, 5])
+
+        if que_es == 'JOYA':
+            datos['tipo_joya'] = self.aleatorio.choice(Item.TIPO_JOYA_CHOICES)[0]
+            datos['metal'] = self.aleatorio.choice(Item.METAL_CHOICES)[0]
+            if datos['tipo_joya'] == 'SET':
+                datos['componentes_set'] = ','.join(
+                    self.aleatorio.sample(COMPONENTES_SET, self.aleatorio.randint(2, 3))
+                )
+        elif que_es == 'LOTE':
+            datos['cantidad_gemas'] = self.aleatorio.randint(5, 60)
+
+        return datos
+
+    def _generar_lote(self, indices, ahora):
+        """Crea un lote de órdenes con sus ítems y fotos"""
+        with transaction.atomic():
+            ordenes = []
+            for n in indices:
+                etapa = self._elegir(self.distribucion)
+                if etapa == 'FINALIZADA':
+                    creacion = ahora - timedelta(minutes=self.aleatorio.randint(60 * 24, 60 * 24 * 365))
+                    cierre = creacion + timedelta(minutes=self.aleatorio.randint(60 * 8, 60 * 24 * 10))
+                else:
+                    creacion = ahora - timedelta(minutes=self.aleatorio.randint(1, 60 * 24 * 14))
+                    cierre = None
+                ordenes.append(Orden(
+                    numero_orden_facturacion=f"{self.prefijo}-{n:08d}",
+                    estado_actual=etapa,
+                    fecha_creacion=creacion,
+                    fecha_cierre=cierre,
+                ))
+            Orden.objects.bulk_create(ordenes)
+
+            # bulk_create no devuelve PK en todos los backends: se releen por número
+            creadas = Orden.objects.filter(
+                numero_orden_facturacion__in=[o.numero_orden_facturacion for o in ordenes]
+            ).in_bulk(field_name='numero_orden_facturacion')
+
+            # auto_now_add sobrescribe fecha_creacion al insertar; bulk_update la respeta
+            for orden in ordenes:
+                orden.id = creadas[orden.numero_orden_facturacion].id
+            Orden.objects.bulk_update(ordenes, ['fecha_creacion'], batch_size=500)
+
+            items = []
+            for orden in ordenes:
+                activa = orden.estado_actual != 'FINALIZADA'
+                for numero in range(1, self.aleatorio.randint(*self.items_por_orden) + 1):
+                    fecha_limite = None
+                    if activa:
+                        if self.aleatorio.random() < self.fraccion_retrasados:
+                            fecha_limite = ahora - timedelta(minutes=self.aleatorio.randint(10, 60 * 72))
+                            self.resumen['retrasados'] += 1
+                        else:
+                            fecha_limite = ahora + timedelta(minutes=self.aleatorio.randint(10, 60 * 24 * 10))
+
+                    item = Item(orden_id=orden.id, numero_item=numero, etapa=orden.estado_actual,
+                                fecha_limite_etapa=fecha_limite, **self._datos_item())
+                    item.texto_para_copiar = item.descripcion_texto
+                    items.append(item)
+            Item.objects.bulk_create(items, batch_size=500)
+
+            item_ids = dict(
+                ((orden_id, numero), item_id)
+                for item_id, orden_id, numero in Item.objects.filter(
+                    orden_id__in=[o.id for o in ordenes]
+                ).values_list('id', 'orden_id', 'numero_item')
+            )
+
+            fotos = []
+            for item in items:
+                for k in range(1, self.aleatorio.randint(*self.fotos_por_item) + 1):
+                    fotos.append(FotoItem(
+                        item_id=item_ids[(item.orden_id, item.numero_item)],
+                        imagen=f"ORDEN-{item.orden_id:04d}/ITEM-{item.numero_item}/sintetica_{k}.jpg",
+                        descripcion='Foto sintética',
+                    ))
+            FotoItem.objects.bulk_create(fotos, batch_size=500)
+
+        self.resumen['ordenes'] += len(ordenes)
+        self.resumen['items'] += len(items)
+        self.resumen['fotos'] += len(fotos)
+
+    def _siguiente_numero(self):
+        """
+        Primer número libre para el prefijo: el mayor sufijo entre las órdenes
+        activas y las archivadas, más uno (contar colisiona tras archivar o borrar).
+        """
+        mayor = None
+        for modelo in (Orden, OrdenArchivada):
+            valor = modelo.objects.filter(
+                numero_orden_facturacion__regex=rf'^{re.escape(self.prefijo)}-[0-9]+$'
+            ).aggregate(mayor=Max(Cast(
+                Substr('numero_orden_facturacion', len(self.prefijo) + 2), IntegerField()
+            )))['mayor']
+            if valor is not None and (mayor is None or valor > mayor):
+                mayor = valor
+        return 0 if mayor is None else mayor + 1
+
+    def ejecutar(self, total_ordenes):
+        """
+        Agrega órdenes sintéticas en lotes. La numeración continúa después de las
+        órdenes sintéticas existentes, así que se puede crecer de una escala a otra.
+
+        Returns:
+            dict: Resumen con los contadores creados
+        """
+        inicio = self._siguiente_numero()
+        ahora = timezone.now()
+
+        for desde in range(inicio, inicio + total_ordenes, self.tamano_lote):
+            hasta = min(desde + self.tamano_lote, inicio + total_ordenes)
+            self._generar_lote(range(desde, hasta), ahora)
+            logger.info(f"Generadas {self.resumen['ordenes']} órdenes sintéticas")
+
+        return self.resumen
+
+    def limpiar(self):
+        """
+        Elimina las órdenes sintéticas (y en cascada sus ítems y fotos).
+
+        Returns:
+            int: Número de órdenes eliminadas
+        """
+        queryset = Orden.objects.filter(numero_orden_facturacion__startswith=f"{self.prefijo}-")
+        total = queryset.count()
+        queryset.delete()
+        return total
@@ -0,0 +1,12 @@
+# certificacion/templatetags/recursos.py
+from django import template
+
+from certificacion.estaticos import url_recurso
+
+register = template.Library()
+
+
+@register.simple_tag
+def recurso(clave):
+    """URL de una librería de terceros (local si está vendorizada, ver estaticos.py)"""
+    return url_recurso(clave)
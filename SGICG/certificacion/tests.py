@@ -1,3 +1,252 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .flujo import avanzar_items
+from .historial import acumular, percentil_histograma
+from .models import (
+    Orden, Item, ConfiguracionTiempos, RecalculoPlazos, ResumenDiarioEtapa, TransicionEtapa,
+)
+from .plazos import MotorRecalculoPlazos, registrar_cambios
+
+# Cache en memoria: los tiempos cacheados no deben pasar de una prueba a otra
+CACHES_PRUEBAS = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-l2'},
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pruebas-l1'},
+}
+
+TIEMPOS = {'INGRESO': 3600, 'FOTOGRAFIA': 7200, 'REVISION': 1800, 'IMPRESION': 900}
+
+
+def crear_configuracion(tipo_item='JOYA', tipo_certificado='GC_SENCILLA', **tiempos):
+    tiempos = dict(TIEMPOS, **tiempos)
+    return ConfiguracionTiempos.objects.create(
+        tipo_item=tipo_item,
+        tipo_certificado=tipo_certificado,
+        **{f'tiempo_{etapa.lower()}': segundos for etapa, segundos in tiempos.items()}
+    )
+
+
+def crear_orden(numero, etapas, inicio):
+    """
+    Orden con un ítem por etapa indicada. Las fechas límite siguen la regla de
+    crear_orden: inicio más el trabajo pendiente de los ítems 1..k.
+    """
+    orden = Orden.objects.create(numero_orden_facturacion=numero, estado_actual=min(
+        etapas, key=[clave for clave, _ in Orden.ETAPAS].index
+    ))
+    acumulado = 0
+    for numero_item, etapa in enumerate(etapas, start=1):
+        pendientes = list(TIEMPOS)[list(TIEMPOS).index(etapa):] if etapa in TIEMPOS else []
+        acumulado += sum(TIEMPOS[e] for e in pendientes)
+        Item.objects.create(
+            orden=orden,
+            numero_item=numero_item,
+            etapa=etapa,
+            fecha_limite_etapa=inicio + timedelta(seconds=acumulado) if pendientes else None,
+        )
+    return orden
+
+
+def limites(orden):
+    return list(orden.items.order_by('numero_item').values_list('fecha_limite_etapa', flat=True))
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class AvanceItemsTests(TestCase):
+
+    def setUp(self):
+        crear_configuracion()
+        self.inicio = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def test_avance_por_item_desplaza_los_siguientes(self):
+        orden = crear_orden('T-1', ['INGRESO', 'INGRESO'], self.inicio)
+        primero, segundo = orden.items.order_by('numero_item')
+        antes = limites(orden)
+
+        resultado = avanzar_items(orden, [segundo.id])
+        self.assertEqual(resultado['items'], 1)
+        self.assertEqual(resultado['etapa'], 'INGRESO')
+        self.assertEqual(limites(orden), [antes[0], antes[1] - timedelta(seconds=TIEMPOS['INGRESO'])])
+
+        resultado = avanzar_items(orden, [primero.id])
+        self.assertEqual(resultado['etapa'], 'FOTOGRAFIA')
+        self.assertEqual(limites(orden), [
+            antes[0] - timedelta(seconds=TIEMPOS['INGRESO']),
+            antes[1] - timedelta(seconds=2 * TIEMPOS['INGRESO']),
+        ])
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado_actual, 'FOTOGRAFIA')
+        self.assertEqual(
+            TransicionEtapa.objects.filter(orden=orden, item__isnull=False).count(), 2
+        )
+
+    def test_ultimo_item_finaliza_la_orden(self):
+        orden = crear_orden('T-2', ['IMPRESION', 'FINALIZADA'], self.inicio)
+        item = orden.items.get(numero_item=1)
+
+        resultado = avanzar_items(orden, [item.id])
+
+        self.assertEqual(resultado['etapa'], 'FINALIZADA')
+        orden.refresh_from_db()
+        item.refresh_from_db()
+        self.assertEqual(orden.estado_actual, 'FINALIZADA')
+        self.assertIsNotNone(orden.fecha_cierre)
+        self.assertEqual(item.etapa, 'FINALIZADA')
+        self.assertIsNone(item.fecha_limite_etapa)
+
+    def test_avance_orden_completa(self):
+        orden = crear_orden('T-3', ['INGRESO', 'INGRESO', 'FOTOGRAFIA'], self.inicio)
+
+        resultado = avanzar_items(orden)
+
+        self.assertEqual(resultado['items'], 2)
+        self.assertEqual(resultado['etapa'], 'FOTOGRAFIA')
+        self.assertEqual(
+            list(orden.items.order_by('numero_item').values_list('etapa', flat=True)),
+            ['FOTOGRAFIA'] * 3,
+        )
+        self.assertEqual(
+            ResumenDiarioEtapa.objects.get(etapa='INGRESO', tipo_item='JOYA').conteo, 3
+        )
+
+        for _ in range(3):
+            avanzar_items(orden)
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado_actual, 'FINALIZADA')
+        self.assertIsNotNone(orden.fecha_cierre)
+        self.assertEqual(limites(orden), [None] * 3)
+        self.assertEqual(avanzar_items(orden)['items'], 0)
+
+    def test_no_avanza_si_el_item_ya_dejo_la_etapa(self):
+        orden = crear_orden('T-4', ['INGRESO', 'INGRESO'], self.inicio)
+        item = orden.items.get(numero_item=1)
+        avanzar_items(orden, [item.id], etapa='INGRESO')
+
+        resultado = avanzar_items(orden, [item.id], etapa='INGRESO')
+
+        self.assertEqual(resultado['items'], 0)
+        item.refresh_from_db()
+        self.assertEqual(item.etapa, 'FOTOGRAFIA')
+
+    def test_vista_avanzar_item_con_doble_envio(self):
+        orden = crear_orden('T-5', ['INGRESO', 'INGRESO'], self.inicio)
+        item = orden.items.get(numero_item=1)
+        url = reverse('avanzar_item', args=[item.id])
+
+        self.client.post(url, {'etapa': 'INGRESO'})
+        respuesta = self.client.post(url, {'etapa': 'INGRESO'}, follow=True)
+
+        item.refresh_from_db()
+        self.assertEqual(item.etapa, 'FOTOGRAFIA')
+        self.assertIn(
+            'El ítem 1 ya está en Fotografía',
+            [str(mensaje) for mensaje in respuesta.context['messages']],
+        )
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class RecalculoPlazosTests(TestCase):
+
+    def setUp(self):
+        crear_configuracion()
+        self.inicio = timezone.now().replace(microsecond=0) + timedelta(days=1)
+
+    def registrar(self, **nuevos):
+        anteriores = {('JOYA', 'GC_SENCILLA'): dict(TIEMPOS)}
+        return registrar_cambios(anteriores, {('JOYA', 'GC_SENCILLA'): dict(TIEMPOS, **nuevos)})
+
+    def test_sin_cambios_no_registra(self):
+        self.assertIsNone(self.registrar())
+
+    def test_desplaza_el_trabajo_pendiente_acumulado(self):
+        orden = crear_orden('R-1', ['INGRESO', 'REVISION', 'INGRESO', 'FINALIZADA'], self.inicio)
+        antes = limites(orden)
+
+        recalculo = self.registrar(FOTOGRAFIA=TIEMPOS['FOTOGRAFIA'] + 600)
+        resumen = MotorRecalculoPlazos(recalculo).ejecutar()
+
+        # El ítem 2 ya pasó FOTOGRAFIA, pero lo desplaza el trabajo pendiente del ítem 1
+        self.assertEqual(limites(orden), [
+            antes[0] + timedelta(seconds=600),
+            antes[1] + timedelta(seconds=600),
+            antes[2] + timedelta(seconds=1200),
+            None,
+        ])
+        self.assertEqual(resumen, {'ordenes': 1, 'items': 3})
+        recalculo.refresh_from_db()
+        self.assertEqual(recalculo.estado, 'COMPLETADO')
+
+    def test_reanuda_tras_un_lote_interrumpido(self):
+        ordenes = [crear_orden(f'R-{n}', ['INGRESO'], self.inicio) for n in range(3)]
+        antes = [limites(orden) for orden in ordenes]
+        recalculo = self.registrar(REVISION=TIEMPOS['REVISION'] - 300)
+
+        # Primer lote confirmado y el proceso se interrumpe antes del siguiente
+        MotorRecalculoPlazos(recalculo, tamano_lote=1)._procesar_lote()
+        recalculo.refresh_from_db()
+        self.assertEqual(recalculo.ultima_orden_id, ordenes[0].id)
+        self.assertEqual(recalculo.estado, 'EN_CURSO')
+
+        resumen = MotorRecalculoPlazos(recalculo, tamano_lote=1).ejecutar()
+
+        self.assertEqual(resumen['ordenes'], 2)
+        for orden, limites_antes in zip(ordenes, antes):
+            self.assertEqual(limites(orden), [limites_antes[0] - timedelta(seconds=300)])
+        recalculo.refresh_from_db()
+        self.assertEqual(recalculo.ordenes_procesadas, 3)
+        self.assertEqual(RecalculoPlazos.objects.get().estado, 'COMPLETADO')
+
+    def test_no_toca_ordenes_creadas_despues_del_cambio(self):
+        recalculo = self.registrar(INGRESO=TIEMPOS['INGRESO'] + 60)
+        orden = crear_orden('R-9', ['INGRESO'], self.inicio)
+        antes = limites(orden)
+
+        MotorRecalculoPlazos(recalculo).ejecutar()
+
+        self.assertEqual(limites(orden), antes)
+
+
+class HistogramaTests(TestCase):
+
+    def test_percentil_histograma_vacio(self):
+        self.assertIsNone(percentil_histograma({}, 90))
+
+    def test_p90_dentro_del_error_de_cubeta(self):
+        valores = list(range(100, 10100, 10))
+        hoy = timezone.localdate()
+        # En dos llamadas, como dos transiciones del mismo día
+        acumular(hoy, 'REVISION', [('PIEDRA', 'DIAMANTE', v) for v in valores[:400]])
+        acumular(hoy, 'REVISION', [('PIEDRA', 'DIAMANTE', v) for v in valores[400:]])
+
+        resumen = ResumenDiarioEtapa.objects.get(fecha=hoy, etapa='REVISION')
+        real = valores[int(0.9 * len(valores)) - 1]
+        self.assertEqual(resumen.conteo, len(valores))
+        self.assertEqual((resumen.minimo_segundos, resumen.maximo_segundos), (100, 10090))
+        self.assertLessEqual(abs(resumen.p90_segundos - real) / real, 0.05)
+
+    def test_p90_acotado_al_minimo_y_maximo(self):
+        hoy = timezone.localdate()
+        acumular(hoy, 'INGRESO', [('LOTE', 'ESCRITO', 1000)] * 5)
+
+        resumen = ResumenDiarioEtapa.objects.get(fecha=hoy, etapa='INGRESO')
+        self.assertEqual(resumen.p90_segundos, 1000)
+        self.assertEqual(percentil_histograma(resumen.histograma, 90, maximo=990), 990)
+
+
+@override_settings(CACHES=CACHES_PRUEBAS)
+class DashboardTests(TestCase):
+
+    def test_cuenta_regresiva_con_el_ultimo_item_finalizado(self):
+        inicio = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        orden = crear_orden('D-1', ['FOTOGRAFIA', 'FINALIZADA'], inicio)
+        limite = orden.items.get(numero_item=1).fecha_limite_etapa
+
+        respuesta = self.client.get(reverse('dashboard'))
+
+        self.assertContains(
+            respuesta,
+            f'data-deadline="{timezone.localtime(limite).isoformat()}"',
+        )
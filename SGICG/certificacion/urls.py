@@ -1,14 +1,42 @@
 # certificacion/urls.py
-from django.urls import path
+import re
+
+from django.conf import settings
+from django.urls import path, re_path
 from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
     path('orden/nueva/', views.CrearOrdenView.as_view(), name='crear_orden'),
+    path('orden/importar/', views.importar_ordenes, name='importar_ordenes'),
+    path('ordenes/exportar/', views.exportar_ordenes, name='exportar_ordenes'),
     path('orden/creada/<int:orden_id>/', views.orden_creada_exito, name='orden_creada_exito'),
     path('orden/<int:orden_id>/', views.detalle_orden, name='detalle_orden'),
     path('item/<int:item_id>/asignar_excel/', views.asignar_excel, name='asignar_excel'),
+    path('orden/<int:orden_id>/asignar_excel/', views.asignar_excel_orden, name='asignar_excel_orden'),
+    path('qr/generar/', views.generar_qrs, name='generar_qrs'),
+    path('etapa/impresion/generar/', views.imprimir_etapa, name='imprimir_etapa'),
     path('etapa/<str:etapa>/', views.vista_por_etapa, name='vista_etapa'),
     path('orden/<int:orden_id>/avanzar/', views.avanzar_etapa, name='avanzar_etapa'),
+    path('item/<int:item_id>/avanzar/', views.avanzar_item, name='avanzar_item'),
+    path('api/dashboard/', views.api_dashboard, name='api_dashboard'),
+    path('api/estadisticas/', views.api_estadisticas_dashboard, name='api_estadisticas_dashboard'),
+    path('api/estadisticas/etapas/', views.api_estadisticas_etapas, name='api_estadisticas_etapas'),
+    path('api/orden/<int:orden_id>/estado/', views.api_orden_status, name='api_orden_status'),
+    path('api/plantillas/', views.api_plantillas, name='api_plantillas'),
+    path('api/cache/', views.api_estadisticas_cache, name='api_estadisticas_cache'),
+    path('api/historico/<str:numero_orden>/', views.api_orden_historica, name='api_orden_historica'),
     path('configuracion/', views.configuracion_tiempos, name='configuracion_tiempos'),
-]
\ No newline at end of file
+    # Estáticos de STATIC_ROOT con caché de un año para los nombres con hash (ver estaticos.py)
+    re_path(
+        r'^%s(?P<nombre>.+)$' % re.escape(settings.STATIC_URL.lstrip('/')),
+        views.servir_estatico,
+        name='servir_estatico',
+    ),
+    # Archivos de MEDIA_ROOT con control de acceso (ver servidor_medios.py)
+    re_path(
+        r'^%s(?P<nombre>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        views.servir_medio,
+        name='servir_medio',
+    ),
+]
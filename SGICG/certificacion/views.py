@@ -1,26 +1,44 @@
 # certificacion/views.py
 
+import asyncio
 import os
-import shutil
 import logging
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 from decimal import Decimal, InvalidOperation
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.utils import timezone
 from django.conf import settings
-from django.db.models import Max, F, Q
+from django.db.models import Count, Exists, Max, OuterRef, F, Q
 from django.contrib import messages
-from django.core.cache import cache
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseForbidden, HttpResponseNotAllowed
 from django.core.paginator import Paginator
 from django.utils.text import slugify
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 
-from .models import Orden, Item, FotoItem, ConfiguracionTiempos
+from .models import (
+    Orden, Item, FotoItem, ConfiguracionTiempos, OrdenArchivada, ResumenDiarioEtapa, ETAPAS_ACTIVAS,
+    GEMAS_PRINCIPALES, FORMAS_GEMA,
+)
 from .forms import OrdenForm
+from .plantillas import catalogo_plantillas
+from .impresion import RenderizadorCertificados
+from .generador_qr import GeneradorQR, eliminar_archivos
+from .archivo import buscar_orden_historica
+from .base_datos import transaccion_escritura
+from .cache_niveles import cache_niveles
+from .plazos import MotorRecalculoPlazos, registrar_cambios
+from .historial import combinar_resumenes
+from .flujo import avanzar_items
+from .procesos import pool_compartido
+from .servidor_medios import resolver_medio, respuesta_medio
+from .estaticos import respuesta_estatico
+from .filas import CAMPOS_ORDEN_DASHBOARD, anotar_limite_entrega, filas_ordenes, filas_etapa
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -29,6 +47,9 @@ logger = logging.getLogger(__name__)
 TIEMPO_DEFAULT_SEGUNDOS = 28800  # 8 horas por defecto
 CACHE_TIMEOUT = 3600  # 1 hora
 MAX_ITEMS_PER_ORDER = 50
+MAX_WORKERS_ARCHIVOS = 8  # Hilos para copias de archivos en lote
+MAX_TAMANO_IMPORTACION_MB = 20
+ORDENES_POR_PAGINA = 10
 
 # --- FUNCIONES AUXILIARES MEJORADAS ---
 
@@ -49,7 +70,7 @@ class TiempoCalculator:
             int: Tiempo en segundos
         """
         cache_key = f"tiempo_{tipo_item_key}_{tipo_cert_key}_{etapa_key}"
-        tiempo = cache.get(cache_key)
+        tiempo = cache_niveles.get('tiempos', cache_key)
         
         if tiempo is None:
             try:
@@ -73,7 +94,7 @@ class TiempoCalculator:
                     )
                 
                 # Cache por 1 hora
-                cache.set(cache_key, tiempo, CACHE_TIMEOUT)
+                cache_niveles.set('tiempos', cache_key, tiempo, CACHE_TIMEOUT)
                 
             except ConfiguracionTiempos.DoesNotExist:
                 tiempo = TIEMPO_DEFAULT_SEGUNDOS
@@ -81,7 +102,7 @@ class TiempoCalculator:
                     f"Configuración no encontrada: {tipo_item_key}-{tipo_cert_key}-{etapa_key}"
                 )
                 # Cache el default también
-                cache.set(cache_key, tiempo, CACHE_TIMEOUT)
+                cache_niveles.set('tiempos', cache_key, tiempo, CACHE_TIMEOUT)
             
             except AttributeError:
                 tiempo = TIEMPO_DEFAULT_SEGUNDOS
@@ -91,6 +112,19 @@ class TiempoCalculator:
         
         return int(tiempo) if tiempo else TIEMPO_DEFAULT_SEGUNDOS
     
+    @staticmethod
+    def tiempos_config(config):
+        """
+        Tiempos efectivos de una configuración, con el default para etapas sin valor.
+
+        Returns:
+            dict: {etapa: segundos}
+        """
+        return {
+            etapa: int(getattr(config, f'tiempo_{etapa.lower()}') or TIEMPO_DEFAULT_SEGUNDOS)
+            for etapa in ETAPAS_ACTIVAS
+        }
+
     @staticmethod
     def calcular_duracion_total_item(tipo_item_key, tipo_cert_key):
         """Calcula la duración total de un ítem sumando todas las etapas"""
@@ -116,7 +150,7 @@ class OrdenManager:
         """
         try:
             resultado = Item.objects.filter(
-                orden__estado_actual__in=['INGRESO', 'FOTOGRAFIA', 'REVISION', 'IMPRESION'],
+                etapa__in=ETAPAS_ACTIVAS,
                 fecha_limite_etapa__isnull=False
             ).aggregate(max_fecha=Max('fecha_limite_etapa'))
             
@@ -131,13 +165,32 @@ class OrdenManager:
             return timezone.now()
     
     @staticmethod
-    def get_ordenes_con_filtros(search=None, etapa_filter=None):
-        """Obtiene órdenes aplicando filtros con optimizaciones"""
-        queryset = Orden.objects.select_related().prefetch_related(
-            'items__fotos'
-        ).filter(
-            estado_actual__in=['INGRESO', 'FOTOGRAFIA', 'REVISION', 'IMPRESION']
-        )
+    def get_ordenes_con_filtros(search=None, etapa_filter=None, incluir_finalizadas=False,
+                                desde=None, hasta=None, tipo_certificado=None):
+        """
+        Obtiene órdenes aplicando filtros con optimizaciones.
+        
+        Args:
+            incluir_finalizadas: Si es True incluye también las órdenes finalizadas (no archivadas)
+            desde, hasta: Rango de fecha de creación (desde inclusive, hasta exclusivo)
+            tipo_certificado: Solo órdenes con algún ítem de ese tipo
+        """
+        queryset = Orden.objects.all()
+        if not incluir_finalizadas:
+            queryset = queryset.filter(
+                estado_actual__in=['INGRESO', 'FOTOGRAFIA', 'REVISION', 'IMPRESION'],
+                fecha_cierre__isnull=True  # Permite usar el índice parcial de órdenes activas
+            )
+        
+        if desde:
+            queryset = queryset.filter(fecha_creacion__gte=desde)
+        if hasta:
+            queryset = queryset.filter(fecha_creacion__lt=hasta)
+        
+        if tipo_certificado:
+            queryset = queryset.filter(
+                Exists(Item.objects.filter(orden=OuterRef('pk'), tipo_certificado=tipo_certificado))
+            )
         
         if search:
             queryset = queryset.filter(
@@ -196,6 +249,52 @@ class FileManager:
         os.makedirs(ruta_orden, exist_ok=True)
         return ruta_orden
 
+    @staticmethod
+    def listar_plantillas():
+        """
+        Obtiene la lista de plantillas Excel disponibles en PLANTILLAS_ROOT.
+
+        Returns:
+            list: Nombres de archivo ordenados
+        """
+        return catalogo_plantillas.nombres()
+
+    @staticmethod
+    def listar_plantillas_info():
+        """
+        Obtiene nombre, tamaño y fecha de modificación de cada plantilla.
+
+        Returns:
+            list: Diccionarios ordenados por nombre
+        """
+        plantillas = []
+        for nombre in catalogo_plantillas.nombres():
+            info = catalogo_plantillas.obtener(nombre)
+            if info:
+                plantillas.append({
+                    'nombre': info.nombre,
+                    'tamano': info.tamano,
+                    'modificada': datetime.fromtimestamp(info.mtime, tz=timezone.get_current_timezone()).isoformat(),
+                })
+        return plantillas
+
+    @staticmethod
+    def copiar_plantilla(plantilla_nombre, orden_id, numero_item, item_id):
+        """
+        Copia una plantilla a la carpeta del ítem como datos_item_<id>.xlsx.
+
+        Returns:
+            str: Nombre del archivo Excel destino
+        """
+        ruta_origen = os.path.join(settings.PLANTILLAS_ROOT, plantilla_nombre)
+        nombre_excel_destino = f"datos_item_{item_id}.xlsx"
+        # Con spool local la copia no espera al recurso compartido (ver almacenamiento.py)
+        default_storage.guardar_copia(
+            ruta_origen,
+            os.path.join(f"ORDEN-{orden_id:04d}", f"ITEM-{numero_item}", nombre_excel_destino)
+        )
+        return nombre_excel_destino
+
 
 # --- VISTAS PRINCIPALES ---
 
@@ -210,30 +309,30 @@ def dashboard(request):
         # Obtener órdenes con filtros
         ordenes_queryset = OrdenManager.get_ordenes_con_filtros(search, etapa_filter)
         
-        # Ordenar por fecha de entrega más próxima
-        def get_fecha_ordenamiento(orden):
-            ultimo_item = orden.items.order_by('fecha_limite_etapa').last()
-            if ultimo_item and ultimo_item.fecha_limite_etapa:
-                return ultimo_item.fecha_limite_etapa
-            return timezone.now() + timedelta(days=9999)
-        
-        ordenes_list = sorted(list(ordenes_queryset), key=get_fecha_ordenamiento)
-        
-        # Paginación
-        paginator = Paginator(ordenes_list, 10)
-        ordenes_page = paginator.get_page(page_number)
-        
-        # Estadísticas
-        stats = {
-            'total_activas': len(ordenes_list),
-            'retrasadas': len([o for o in ordenes_list if o.tiene_items_retrasados()]),
+        # Ordenar por fecha de entrega más próxima (sin fecha al final) y
+        # paginar en la base de datos: solo se proyecta la página visible
+        ordenes_ordenadas = anotar_limite_entrega(ordenes_queryset).order_by(
+            F('limite_entrega').asc(nulls_last=True), '-fecha_creacion'
+        ).values_list(*CAMPOS_ORDEN_DASHBOARD)
+        
+        # Estadísticas en una sola consulta
+        ahora = timezone.now()
+        agregados = {
+            'total_activas': Count('id'),
+            'retrasadas': Count('id', filter=Q(retrasada=True)),
         }
-        
-        # Estadísticas por etapa
         for etapa_key, etapa_label in Orden.ETAPAS:
             if etapa_key != 'FINALIZADA':
-                count = ordenes_queryset.filter(estado_actual=etapa_key).count()
-                stats[etapa_key.lower()] = count
+                agregados[etapa_key.lower()] = Count('id', filter=Q(estado_actual=etapa_key))
+        stats = ordenes_queryset.annotate(
+            retrasada=Exists(Item.objects.filter(orden=OuterRef('pk'), fecha_limite_etapa__lt=ahora))
+        ).aggregate(**agregados)
+        
+        # Paginación
+        paginator = Paginator(ordenes_ordenadas, ORDENES_POR_PAGINA)
+        paginator.count = stats['total_activas']
+        ordenes_page = paginator.get_page(page_number)
+        ordenes_page.object_list = filas_ordenes(ordenes_page.object_list)
         
         context = {
             'ordenes_activas': ordenes_page,
@@ -255,6 +354,45 @@ def dashboard(request):
         })
 
 
+def validar_datos_items(items):
+    """
+    Reglas de los ítems de una orden, compartidas por el formulario de creación
+    y la importación masiva (ver importacion.py).
+
+    Args:
+        items: lista de dicts con tipo_certificado, que_es, gema_principal y codigo_referencia
+
+    Returns:
+        dict: valido y error (mensaje del primer problema encontrado)
+    """
+    if not items:
+        return {'valido': False, 'error': 'Debe agregar al menos un ítem'}
+    
+    if len(items) > MAX_ITEMS_PER_ORDER:
+        return {'valido': False, 'error': f'Máximo {MAX_ITEMS_PER_ORDER} ítems por orden'}
+    
+    for i, item in enumerate(items, start=1):
+        tipo_cert = item.get('tipo_certificado')
+        que_es = item.get('que_es')
+        gema_ppal = item.get('gema_principal')
+        codigo_ref = item.get('codigo_referencia')
+        
+        if not tipo_cert or not tipo_cert.strip():
+            return {'valido': False, 'error': f'El ítem {i} debe tener tipo de certificado'}
+        
+        if not que_es or not que_es.strip():
+            return {'valido': False, 'error': f'El ítem {i} debe tener definido "qué es"'}
+        
+        if que_es in ['VERBAL_A_GC', 'REIMPRESION']:
+            if not codigo_ref or not codigo_ref.strip():
+                return {'valido': False, 'error': f'El ítem {i} requiere código de referencia'}
+        else:
+            if not gema_ppal or not gema_ppal.strip():
+                return {'valido': False, 'error': f'El ítem {i} requiere gema principal'}
+    
+    return {'valido': True, 'error': ''}
+
+
 class CrearOrdenView(View):
     """Vista optimizada para crear órdenes con captura completa de datos"""
     
@@ -297,8 +435,8 @@ class CrearOrdenView(View):
                 if items_count == 0:
                     raise Exception("No se crearon ítems para la orden")
                 
-                # Limpiar cache
-                cache.clear()
+                # Invalidar estadísticas en todos los workers
+                transaction.on_commit(lambda: cache_niveles.invalidar('estadisticas'))
                 
                 message = f"Orden {orden.numero_orden_facturacion} creada exitosamente con {items_count} ítems"
                 messages.success(request, message)
@@ -321,36 +459,18 @@ class CrearOrdenView(View):
         gemas_principales = post_data.getlist('gema_principal')
         codigos_referencia = post_data.getlist('codigo_referencia')
         
-        if not tipos_cert:
-            return {'valido': False, 'error': 'Debe agregar al menos un ítem'}
-        
-        if len(tipos_cert) > MAX_ITEMS_PER_ORDER:
-            return {'valido': False, 'error': f'Máximo {MAX_ITEMS_PER_ORDER} ítems por orden'}
-        
         # Validar que las listas tengan la misma longitud
         listas = [tipos_cert, que_es_list, gemas_principales, codigos_referencia]
         longitudes = [len(lista) for lista in listas]
-        if not all(l == longitudes[0] for l in longitudes):
+        if tipos_cert and len(tipos_cert) <= MAX_ITEMS_PER_ORDER and not all(l == longitudes[0] for l in longitudes):
             return {'valido': False, 'error': 'Error en datos de ítems: listas con longitudes diferentes'}
         
-        for i, (tipo_cert, que_es, gema_ppal, codigo_ref) in enumerate(zip(
-            tipos_cert, que_es_list, gemas_principales, codigos_referencia
-        ), start=1):
-            
-            if not tipo_cert or not tipo_cert.strip():
-                return {'valido': False, 'error': f'El ítem {i} debe tener tipo de certificado'}
-            
-            if not que_es or not que_es.strip():
-                return {'valido': False, 'error': f'El ítem {i} debe tener definido "qué es"'}
-            
-            if que_es in ['VERBAL_A_GC', 'REIMPRESION']:
-                if not codigo_ref or not codigo_ref.strip():
-                    return {'valido': False, 'error': f'El ítem {i} requiere código de referencia'}
-            else:
-                if not gema_ppal or not gema_ppal.strip():
-                    return {'valido': False, 'error': f'El ítem {i} requiere gema principal'}
-        
-        return {'valido': True, 'error': ''}
+        return validar_datos_items([
+            {'tipo_certificado': tipo_cert, 'que_es': que_es, 'gema_principal': gema_ppal, 'codigo_referencia': codigo_ref}
+            for tipo_cert, que_es, gema_ppal, codigo_ref in zip(
+                tipos_cert, que_es_list, gemas_principales, codigos_referencia
+            )
+        ])
     
     def _crear_orden_con_items(self, form, post_data):
         """Crea la orden y todos sus ítems de forma transaccional"""
@@ -691,37 +811,15 @@ class CrearOrdenView(View):
         gemas_cache_key = 'gemas_principales_list'
         formas_cache_key = 'formas_gema_list'
         
-        gemas_principales = cache.get(gemas_cache_key)
+        gemas_principales = cache_niveles.get('catalogos', gemas_cache_key)
         if gemas_principales is None:
-            gemas_principales = [
-                'Ágata', 'Aguamarina', 'Alejandrita', 'Almandino - Espesartina', 'Amatista', 
-                'Amazonita', 'Ankerita', 'Antracita', 'Apatito', 'Azabache', 'Berilo', 
-                'Calcedonia', 'Calcopirita', 'Carbón', 'Citrino', 'Coral', 'Cordierita', 
-                'Corindón', 'Crisoberilo', 'Cristal de roca', 'Cuarzo', 'Dolomita', 'Espinela', 
-                'Euclasa', 'Feldespato', 'Fluorita', 'Fuchsita', 'Granate', 'Grosular', 
-                'Grosularia - Andradita', 'Grosularia', 'Jacinta', 'Jaspe', 'Malaquita', 
-                'Mica', 'Microclina', 'Moissanita', 'Obsidiana', 'Ónix', 'Ópalo', 'Paraiba', 
-                'Perla Cultivada', 'Pirita', 'Piropo - Almandino', 'Rubí Glassfilled', 'Rubí', 
-                'Rubí Estrella', 'Tanzanita', 'Trilitionita', 'Tsavorita', 'Turmalina', 'Vidrio', 
-                'Zafiro', 'Zafiro cambio de color', 'Zafiro estrella', 'Zircón', 'Zoisita', 
-                'Vivianita', 'Topacio', 'Cuarzo ahumado', 'Almandino - Piropo', 
-                'Espesartita - Piropo', 'Zirconia cubica', 'Diamante', 'Esmeralda'
-            ]
-            gemas_principales = sorted(gemas_principales)
-            cache.set(gemas_cache_key, gemas_principales, CACHE_TIMEOUT * 24)
-        
-        formas_gema = cache.get(formas_cache_key)
+            gemas_principales = sorted(GEMAS_PRINCIPALES)
+            cache_niveles.set('catalogos', gemas_cache_key, gemas_principales, CACHE_TIMEOUT * 24)
+        
+        formas_gema = cache_niveles.get('catalogos', formas_cache_key)
         if formas_gema is None:
-            formas_gema = [
-                'Baguette', 'Barroco', 'Briolette', 'Caballo', 'Cilíndrica', 'Circular', 
-                'Cojín', 'Corazón', 'Cuadrada', 'Esfera', 'Esmeralda', 'Fantasía', 
-                'Hexagonal', 'Lágrima', 'Marquis', 'Ninguno', 'Óvalo', 'Prisma ditrigonal', 
-                'Prisma hexagonal', 'Prisma Piramidal', 'Prisma Tetragonal', 'Rectangular', 
-                'Redonda', 'Rostro', 'Trapecio', 'Trillion', 'Hoja', 'Cabuchon', 
-                'Prisma dihexagonal', 'Caballo de Mar', 'Varios'
-            ]
-            formas_gema = sorted(formas_gema)
-            cache.set(formas_cache_key, formas_gema, CACHE_TIMEOUT * 24)
+            formas_gema = sorted(FORMAS_GEMA)
+            cache_niveles.set('catalogos', formas_cache_key, formas_gema, CACHE_TIMEOUT * 24)
         
         return {
             'form': form,
@@ -731,6 +829,98 @@ class CrearOrdenView(View):
         }
 
 
+def importar_ordenes(request):
+    """Crea en lote las órdenes de una exportación CSV/XLSX del sistema de facturación"""
+    if request.method != 'POST':
+        messages.error(request, "Método no permitido")
+        return redirect('crear_orden')
+
+    from .importacion import ImportadorOrdenes  # importacion usa este módulo
+
+    archivo = request.FILES.get('archivo')
+    if not archivo:
+        messages.error(request, "Seleccione un archivo CSV o XLSX")
+        return redirect('crear_orden')
+    if archivo.size > MAX_TAMANO_IMPORTACION_MB * 1024 * 1024:
+        messages.error(request, f"El archivo es muy grande. Máximo {MAX_TAMANO_IMPORTACION_MB}MB")
+        return redirect('crear_orden')
+
+    try:
+        resumen = ImportadorOrdenes().ejecutar(archivo.file, archivo.name)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('crear_orden')
+    except Exception as e:
+        logger.error(f"Error al importar órdenes: {str(e)}")
+        messages.error(request, "Error al importar el archivo. Intente nuevamente.")
+        return redirect('crear_orden')
+
+    if resumen['ordenes']:
+        messages.success(
+            request,
+            f"Importadas {resumen['ordenes']} órdenes con {resumen['items']} ítems"
+        )
+    for error in resumen['errores'][:10]:
+        messages.warning(request, f"Fila {error['fila']} ({error['orden']}): {error['error']}")
+    if len(resumen['errores']) > 10:
+        messages.warning(request, f"... y {len(resumen['errores']) - 10} errores más")
+    if not resumen['filas']:
+        messages.info(request, "El archivo no tiene filas para importar")
+
+    return redirect('dashboard' if resumen['ordenes'] else 'crear_orden')
+
+
+def exportar_ordenes(request):
+    """Descarga las órdenes filtradas con sus ítems en CSV o XLSX, generado por bloques"""
+    from .exportacion import ExportadorOrdenes, FORMATOS, filtros_exportacion, respuesta_streaming, respuesta_xlsx
+
+    formato = request.GET.get('formato', 'csv').lower()
+    if formato not in FORMATOS:
+        messages.error(request, "Formato de exportación no válido")
+        return redirect('dashboard')
+    try:
+        filtros = filtros_exportacion(request.GET)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('dashboard')
+
+    exportador = ExportadorOrdenes(**filtros)
+    nombre = f"ordenes_{timezone.localtime():%Y%m%d_%H%M}.{formato}"
+    try:
+        if formato == 'xlsx':
+            return respuesta_xlsx(exportador, nombre)
+        return respuesta_streaming(exportador.csv(), 'text/csv; charset=utf-8', nombre)
+    except Exception as e:
+        logger.error(f"Error al exportar órdenes: {str(e)}")
+        messages.error(request, "Error al generar la exportación. Intente nuevamente.")
+        return redirect('dashboard')
+
+
+def servir_medio(request, nombre):
+    """Entrega un archivo de MEDIA_ROOT tras comprobar el acceso (ver servidor_medios.py)"""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if getattr(settings, 'MEDIA_REQUIERE_LOGIN', False) and not request.user.is_authenticated:
+        return HttpResponseForbidden("Acceso no autorizado")
+
+    return respuesta_medio(request, resolver_medio(nombre))
+
+
+def servir_estatico(request, nombre):
+    """Entrega un estático de STATIC_ROOT, precomprimido si el cliente lo acepta"""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    return respuesta_estatico(request, nombre)
+
+
+def _actor(request):
+    """Usuario autenticado o, si no hay sesión, la IP de la estación que hizo la petición"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.get_username()
+    return request.META.get('REMOTE_ADDR', '')
+
+
 def avanzar_etapa(request, orden_id):
     """Avanza una orden a la siguiente etapa con validaciones mejoradas"""
     if request.method != 'POST':
@@ -738,62 +928,25 @@ def avanzar_etapa(request, orden_id):
         return redirect('dashboard')
         
     try:
-        with transaction.atomic():
+        with transaccion_escritura():
             orden = get_object_or_404(
                 Orden.objects.select_for_update(),
                 id=orden_id
             )
             
-            etapa_anterior = orden.estado_actual
-            proxima_etapa = orden.get_proxima_etapa()
-            
-            if not proxima_etapa:
+            if not orden.get_proxima_etapa():
                 messages.warning(
                     request,
                     f"La orden {orden.numero_orden_facturacion} ya está finalizada"
                 )
                 return redirect('dashboard')
             
-            # Calcular tiempo total a restar de todos los ítems
-            tiempo_total_a_restar = 0
-            
-            for item in orden.items.all():
-                # Determinar el tipo de ítem correctamente
-                if item.que_es == 'JOYA' and item.tipo_joya == 'SET':
-                    item_type_key = 'SET'
-                elif item.que_es == 'PIEDRA':
-                    item_type_key = 'PIEDRA'
-                elif item.que_es == 'LOTE':
-                    item_type_key = 'LOTE'
-                else:
-                    item_type_key = 'JOYA'
-                
-                duracion_etapa = TiempoCalculator.get_tiempo_estimado(
-                    item_type_key, 
-                    item.tipo_certificado, 
-                    etapa_anterior
-                )
-                tiempo_total_a_restar += duracion_etapa
-            
-            # Actualizar fechas límite de todos los ítems
-            if tiempo_total_a_restar > 0:
-                tiempo_delta = timedelta(seconds=tiempo_total_a_restar)
-                orden.items.update(
-                    fecha_limite_etapa=F('fecha_limite_etapa') - tiempo_delta
-                )
-            
-            # Avanzar la etapa
-            orden.estado_actual = proxima_etapa
-            
-            # Si se finaliza, limpiar fechas límite
-            if proxima_etapa == 'FINALIZADA':
-                orden.fecha_cierre = timezone.now()
-                orden.items.update(fecha_limite_etapa=None)
+            # Avanzan los ítems que están en la etapa de la orden; fechas límite,
+            # etapa de la orden e historial se actualizan en la misma transacción
+            avanzar_items(orden, actor=_actor(request))
             
-            orden.save()
-            
-            # Limpiar cache relacionado (usando cache.clear() que sí existe)
-            cache.clear()
+            # Invalidar estadísticas en todos los workers
+            transaction.on_commit(lambda: cache_niveles.invalidar('estadisticas'))
             
             # Mensaje de éxito
             messages.success(
@@ -808,6 +961,55 @@ def avanzar_etapa(request, orden_id):
         return redirect('dashboard')
 
 
+def avanzar_item(request, item_id):
+    """
+    Avanza un ítem a su siguiente etapa sin esperar al resto de la orden. El
+    formulario envía la etapa en la que se mostró el ítem; si ya no está en
+    ella (doble envío u otro usuario lo avanzó), no se avanza de nuevo.
+    """
+    item = get_object_or_404(Item.objects.select_related('orden'), id=item_id)
+    etapa_esperada = request.POST.get('etapa') or None
+    if etapa_esperada not in dict(Orden.ETAPAS):
+        etapa_esperada = None
+    etapa_vista = (etapa_esperada or item.etapa).lower()
+
+    if request.method != 'POST':
+        messages.error(request, "Método no permitido")
+        return redirect('vista_etapa', etapa=etapa_vista)
+
+    try:
+        with transaccion_escritura():
+            orden = get_object_or_404(Orden.objects.select_for_update(), id=item.orden_id)
+            resultado = avanzar_items(orden, [item.id], actor=_actor(request), etapa=etapa_esperada)
+            transaction.on_commit(lambda: cache_niveles.invalidar('estadisticas'))
+
+        if not resultado['items']:
+            item.refresh_from_db(fields=['etapa'])
+            if item.etapa == 'FINALIZADA':
+                messages.warning(request, f"El ítem {item.numero_item} ya está finalizado")
+            else:
+                messages.warning(
+                    request,
+                    f"El ítem {item.numero_item} ya está en {item.get_etapa_display()}"
+                )
+            return redirect('vista_etapa', etapa=etapa_vista)
+
+        messages.success(
+            request,
+            f"Ítem {item.numero_item} de la orden {orden.numero_orden_facturacion} avanzado"
+        )
+        if resultado['etapa'] != resultado['etapa_anterior']:
+            messages.info(
+                request,
+                f"La orden {orden.numero_orden_facturacion} pasó a {orden.get_estado_actual_display()}"
+            )
+
+    except Exception as e:
+        messages.error(request, f"Error al avanzar el ítem: {str(e)}")
+
+    return redirect('vista_etapa', etapa=etapa_vista)
+
+
 def configuracion_tiempos(request):
     """Vista optimizada para configurar tiempos con validaciones mejoradas"""
     if request.method == 'POST':
@@ -815,10 +1017,14 @@ def configuracion_tiempos(request):
             with transaction.atomic():
                 cambios_realizados = 0
                 errores = []
+                tiempos_anteriores = {}
+                tiempos_nuevos = {}
                 
                 configs = ConfiguracionTiempos.objects.select_for_update()
                 
                 for config in configs:
+                    par = (config.tipo_item, config.tipo_certificado)
+                    tiempos_anteriores[par] = TiempoCalculator.tiempos_config(config)
                     etapa_map = {
                         'ingreso': 'tiempo_ingreso',
                         'foto': 'tiempo_fotografia',
@@ -861,11 +1067,15 @@ def configuracion_tiempos(request):
                             config.full_clean()
                             config.save()
                             cambios_realizados += 1
+                            tiempos_nuevos[par] = TiempoCalculator.tiempos_config(config)
                         except ValidationError as e:
                             errores.append(f"Error en {config}: {e}")
                 
-                # Limpiar cache después de los cambios
-                cache.clear()
+                # Diferencias para ajustar las fechas límite de los ítems en curso
+                recalculo = registrar_cambios(tiempos_anteriores, tiempos_nuevos)
+                
+                # Invalidar tiempos y estadísticas en todos los workers
+                transaction.on_commit(lambda: cache_niveles.invalidar('tiempos', 'estadisticas'))
                 
                 # Mostrar resultados
                 if errores:
@@ -881,6 +1091,21 @@ def configuracion_tiempos(request):
                 elif not errores:
                     messages.info(request, "No se realizaron cambios")
             
+            if recalculo:
+                if request.POST.get('recalcular_plazos'):
+                    resumen = MotorRecalculoPlazos(recalculo).ejecutar()
+                    transaction.on_commit(lambda: cache_niveles.invalidar('estadisticas'))
+                    messages.success(
+                        request,
+                        f"Fechas límite recalculadas: {resumen['items']} ítems de {resumen['ordenes']} órdenes"
+                    )
+                else:
+                    messages.info(
+                        request,
+                        "Las órdenes en curso conservan sus fechas límite. "
+                        "Ejecute 'manage.py recalcular_plazos' para ajustarlas."
+                    )
+            
             return redirect('configuracion_tiempos')
             
         except Exception as e:
@@ -916,12 +1141,9 @@ def vista_por_etapa(request, etapa):
             messages.error(request, "Etapa no válida")
             return redirect('dashboard')
         
-        # Obtener órdenes de la etapa con optimizaciones
-        ordenes = Orden.objects.select_related().prefetch_related(
-            'items__fotos'
-        ).filter(
-            estado_actual=etapa_upper
-        ).order_by('fecha_creacion')
+        # Cola de la etapa: recorre el índice (etapa, fecha_limite_etapa) y
+        # agrupa los ítems por orden, empezando por la del ítem más urgente
+        ordenes = filas_etapa(etapa_upper)
         
         context = {
             'ordenes': ordenes,
@@ -931,23 +1153,13 @@ def vista_por_etapa(request, etapa):
         
         # Para la etapa de ingreso, cargar plantillas con cache
         if etapa_upper == 'INGRESO':
-            plantillas_cache_key = 'plantillas_disponibles'
-            plantillas_disponibles = cache.get(plantillas_cache_key)
-            
-            if plantillas_disponibles is None:
-                plantillas_disponibles = []
-                try:
-                    if hasattr(settings, 'PLANTILLAS_ROOT') and os.path.exists(settings.PLANTILLAS_ROOT):
-                        archivos = os.listdir(settings.PLANTILLAS_ROOT)
-                        plantillas_disponibles = sorted([
-                            f for f in archivos 
-                            if f.lower().endswith('.xlsx') and not f.startswith('~')
-                        ])
-                        cache.set(plantillas_cache_key, plantillas_disponibles, CACHE_TIMEOUT)
-                except (FileNotFoundError, PermissionError, OSError) as e:
-                    logger.warning(f"Error al cargar plantillas: {str(e)}")
-                    messages.warning(request, "No se pudieron cargar las plantillas Excel")
-            
+            plantillas_disponibles = []
+            try:
+                plantillas_disponibles = FileManager.listar_plantillas()
+            except (FileNotFoundError, PermissionError, OSError) as e:
+                logger.warning(f"Error al cargar plantillas: {str(e)}")
+                messages.warning(request, "No se pudieron cargar las plantillas Excel")
+
             context['plantillas_disponibles'] = plantillas_disponibles
         
         return render(request, 'vista_etapa.html', context)
@@ -965,7 +1177,7 @@ def asignar_excel(request, item_id):
         return redirect('vista_etapa', etapa='ingreso')
     
     try:
-        with transaction.atomic():
+        with transaccion_escritura():
             item = get_object_or_404(Item.objects.select_for_update(), id=item_id)
             plantilla_nombre = request.POST.get('plantilla_seleccionada', '').strip()
             
@@ -983,30 +1195,15 @@ def asignar_excel(request, item_id):
                 messages.error(request, "Nombre de plantilla inválido")
                 return redirect('vista_etapa', etapa='ingreso')
             
-            ruta_origen = os.path.join(settings.PLANTILLAS_ROOT, plantilla_nombre)
-            
-            if not os.path.exists(ruta_origen):
+            if plantilla_nombre not in catalogo_plantillas:
                 messages.error(request, f"Plantilla {plantilla_nombre} no encontrada")
                 return redirect('vista_etapa', etapa='ingreso')
             
-            # Crear estructura de carpetas
-            nombre_carpeta_orden = f"ORDEN-{item.orden.id:04d}"
-            nombre_subcarpeta = f"ITEM-{item.numero_item}"
-            ruta_subcarpeta = os.path.join(
-                settings.MEDIA_ROOT, 
-                nombre_carpeta_orden, 
-                nombre_subcarpeta
+            # Copiar plantilla a la carpeta del ítem
+            nombre_excel_destino = FileManager.copiar_plantilla(
+                plantilla_nombre, item.orden.id, item.numero_item, item.id
             )
-            
-            os.makedirs(ruta_subcarpeta, exist_ok=True)
-            
-            # Generar nombre seguro para el archivo destino
-            nombre_excel_destino = f"datos_item_{item.id}.xlsx"
-            ruta_destino = os.path.join(ruta_subcarpeta, nombre_excel_destino)
-            
-            # Copiar archivo de forma segura
-            shutil.copy2(ruta_origen, ruta_destino)
-            
+
             # Actualizar item
             item.nombre_excel = nombre_excel_destino
             item.save(update_fields=['nombre_excel'])
@@ -1027,6 +1224,114 @@ def asignar_excel(request, item_id):
     return redirect('vista_etapa', etapa='ingreso')
 
 
+def asignar_excel_orden(request, orden_id):
+    """Asigna plantillas Excel a varios ítems de una orden en una sola petición"""
+    if request.method != 'POST':
+        messages.error(request, "Método no permitido")
+        return redirect('vista_etapa', etapa='ingreso')
+
+    orden = get_object_or_404(Orden, id=orden_id)
+
+    # Mapa item_id -> plantilla a partir de los campos plantilla_<item_id>
+    asignaciones = {}
+    for key, valor in request.POST.items():
+        if key.startswith('plantilla_') and valor.strip():
+            try:
+                asignaciones[int(key[len('plantilla_'):])] = valor.strip()
+            except ValueError:
+                continue
+
+    if not asignaciones:
+        messages.error(request, "Debe seleccionar al menos una plantilla")
+        return redirect('vista_etapa', etapa='ingreso')
+
+    if not hasattr(settings, 'PLANTILLAS_ROOT'):
+        messages.error(request, "Ruta de plantillas no configurada")
+        return redirect('vista_etapa', etapa='ingreso')
+
+    # Validar todos los nombres contra el catálogo de plantillas
+    try:
+        invalidas = sorted({p for p in asignaciones.values() if p not in catalogo_plantillas})
+    except (PermissionError, OSError) as e:
+        logger.warning(f"Error al cargar plantillas: {str(e)}")
+        invalidas = sorted(set(asignaciones.values()))
+
+    if invalidas:
+        messages.error(request, f"Plantillas no encontradas: {', '.join(invalidas)}")
+        return redirect('vista_etapa', etapa='ingreso')
+
+    items = {
+        item.id: item
+        for item in orden.items.filter(id__in=asignaciones.keys())
+    }
+
+    # Copiar archivos en paralelo, fuera de la transacción
+    items_copiados = []
+    errores = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS_ARCHIVOS) as executor:
+        futuros = {
+            executor.submit(
+                FileManager.copiar_plantilla,
+                asignaciones[item.id], orden.id, item.numero_item, item.id
+            ): item
+            for item in items.values()
+        }
+        for futuro in as_completed(futuros):
+            item = futuros[futuro]
+            try:
+                item.nombre_excel = futuro.result()
+                items_copiados.append(item)
+            except Exception as e:
+                errores.append(f"Ítem {item.numero_item}: error al copiar plantilla")
+                logger.error(f"Error al asignar Excel al item {item.id}: {str(e)}")
+
+    if items_copiados:
+        try:
+            with transaction.atomic():
+                Item.objects.bulk_update(items_copiados, ['nombre_excel'])
+            messages.success(
+                request,
+                f"Plantillas asignadas a {len(items_copiados)} ítems de la orden {orden.numero_orden_facturacion}"
+            )
+            logger.info(f"Asignación masiva de plantillas: {len(items_copiados)} ítems -> Orden {orden.id}")
+        except Exception as e:
+            messages.error(request, "Error al asignar plantillas. Intente nuevamente.")
+            logger.error(f"Error en asignación masiva para orden {orden.id}: {str(e)}")
+
+    for error in errores[:5]:  # Mostrar máximo 5 errores
+        messages.warning(request, error)
+
+    return redirect('vista_etapa', etapa='ingreso')
+
+
+def imprimir_etapa(request):
+    """Genera en lote los PDF de impresión de las órdenes en etapa IMPRESION"""
+    if request.method != 'POST':
+        messages.error(request, "Método no permitido")
+        return redirect('vista_etapa', etapa='impresion')
+
+    items = Item.objects.filter(etapa='IMPRESION')
+    orden_id = request.POST.get('orden_id', '').strip()
+    if orden_id.isdigit():
+        items = items.filter(orden_id=int(orden_id))
+
+    try:
+        resumen = RenderizadorCertificados(executor=pool_compartido()).ejecutar(items)
+    except Exception as e:
+        logger.error(f"Error al generar impresiones: {str(e)}")
+        messages.error(request, "Error al generar los PDF de impresión. Intente nuevamente.")
+        return redirect('vista_etapa', etapa='impresion')
+
+    messages.success(
+        request,
+        f"PDF generados: {resumen['renderizados']}, reutilizados: {resumen['en_cache']}"
+    )
+    if resumen['errores']:
+        messages.warning(request, f"No se pudieron generar {len(resumen['errores'])} PDF")
+
+    return redirect('vista_etapa', etapa='impresion')
+
+
 def detalle_orden(request, orden_id):
     """Vista mejorada de detalle de orden con manejo optimizado de archivos"""
     try:
@@ -1068,20 +1373,17 @@ def _manejar_subida_qr(request, item, orden):
             messages.error(request, mensaje_error)
             return redirect('detalle_orden', orden_id=orden.id)
         
-        with transaction.atomic():
-            # Eliminar QR anterior si existe
+        with transaccion_escritura():
+            # Eliminar QR anterior después de confirmar la transacción
             if item.qr_cargado:
-                try:
-                    if os.path.exists(item.qr_cargado.path):
-                        os.remove(item.qr_cargado.path)
-                        logger.info(f"QR anterior eliminado para item {item.id}")
-                except Exception as e:
-                    logger.warning(f"No se pudo eliminar QR anterior: {str(e)}")
+                nombre_anterior = item.qr_cargado.name
+                transaction.on_commit(lambda: eliminar_archivos([nombre_anterior]))
             
             # Asignar nuevo QR con nombre seguro
             qr_file.name = FileManager.safe_filename(qr_file.name)
             item.qr_cargado = qr_file
-            item.save(update_fields=['qr_cargado'])
+            item.qr_payload_hash = None
+            item.save(update_fields=['qr_cargado', 'qr_payload_hash'])
             
             messages.success(request, f"Código QR actualizado para el ítem {item.numero_item}")
             logger.info(f"QR actualizado para item {item.id}")
@@ -1109,7 +1411,7 @@ def _manejar_subida_fotos(request, item, orden):
         fotos_subidas = 0
         errores = []
         
-        with transaction.atomic():
+        with transaccion_escritura():
             for foto in fotos:
                 try:
                     # Validar cada foto
@@ -1148,6 +1450,43 @@ def _manejar_subida_fotos(request, item, orden):
     return redirect('detalle_orden', orden_id=orden.id)
 
 
+def generar_qrs(request):
+    """Genera en lote los códigos QR de una orden o de una etapa completa"""
+    if request.method != 'POST':
+        messages.error(request, "Método no permitido")
+        return redirect('dashboard')
+
+    orden_id = request.POST.get('orden_id', '').strip()
+    etapa = request.POST.get('etapa', '').strip().upper()
+
+    if orden_id.isdigit():
+        items = Item.objects.filter(orden_id=int(orden_id))
+        destino = redirect('detalle_orden', orden_id=int(orden_id))
+    elif etapa in dict(Orden.ETAPAS).keys():
+        items = Item.objects.filter(etapa=etapa)
+        destino = redirect('vista_etapa', etapa=etapa.lower())
+    else:
+        messages.error(request, "Debe indicar una orden o una etapa")
+        return redirect('dashboard')
+
+    try:
+        resumen = GeneradorQR(executor=pool_compartido()).ejecutar(items)
+    except Exception as e:
+        logger.error(f"Error al generar QR: {str(e)}")
+        messages.error(request, "Error al generar los códigos QR. Intente nuevamente.")
+        return destino
+
+    messages.success(
+        request,
+        f"QR generados: {resumen['generados']}, sin cambios: {resumen['sin_cambios']}, "
+        f"cargados a mano conservados: {resumen['conservados']}"
+    )
+    if resumen['errores']:
+        messages.warning(request, f"No se pudieron generar {len(resumen['errores'])} QR")
+
+    return destino
+
+
 def orden_creada_exito(request, orden_id):
     """Vista de confirmación optimizada"""
     try:
@@ -1176,127 +1515,244 @@ def orden_creada_exito(request, orden_id):
         return redirect('crear_orden')  # Redirigir de vuelta al formulario
 
 
-def api_estadisticas_dashboard(request):
-    """API endpoint optimizado para estadísticas del dashboard"""
+# --- VISTAS DE API/AJAX ---
+# Las vistas de solo lectura consultadas por polling son asíncronas: bajo ASGI
+# no ocupan un hilo del servidor mientras esperan a la base de datos o al disco.
+
+async def api_dashboard(request):
+    """API endpoint asíncrono con los datos del dashboard (filtros, paginación y estadísticas)."""
     if request.method != 'GET':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
-    
+
+    try:
+        search = request.GET.get('search', '').strip()
+        etapa_filter = request.GET.get('etapa', '')
+        try:
+            pagina = max(1, int(request.GET.get('page', 1)))
+        except ValueError:
+            pagina = 1
+
+        ahora = timezone.now()
+        # Subconsulta por id: los filtros de búsqueda sobre ítems no deben alterar los conteos anotados
+        ordenes = Orden.objects.filter(
+            id__in=OrdenManager.get_ordenes_con_filtros(search, etapa_filter).values('id')
+        )
+
+        total = await ordenes.acount()
+        conteos = await ordenes.aaggregate(
+            retrasadas=Count('id', filter=Exists(
+                Item.objects.filter(orden=OuterRef('pk'), fecha_limite_etapa__lt=ahora)
+            )),
+            **{etapa.lower(): Count('id', filter=Q(estado_actual=etapa)) for etapa in ETAPAS_ACTIVAS}
+        )
+
+        # Mismo orden que el dashboard: fecha de entrega (última fecha límite) más próxima primero
+        inicio = (pagina - 1) * ORDENES_POR_PAGINA
+        filas = ordenes.annotate(
+            fecha_entrega=Max('items__fecha_limite_etapa'),
+            items_count=Count('items'),
+            items_retrasados=Count('items', filter=Q(items__fecha_limite_etapa__lt=ahora)),
+        ).order_by(F('fecha_entrega').asc(nulls_last=True), 'id').values(
+            'id', 'numero_orden_facturacion', 'estado_actual', 'fecha_entrega', 'items_count', 'items_retrasados'
+        )[inicio:inicio + ORDENES_POR_PAGINA]
+
+        etiquetas = dict(Orden.ETAPAS)
+        datos_ordenes = [
+            {
+                'id': fila['id'],
+                'numero_orden_facturacion': fila['numero_orden_facturacion'],
+                'estado_actual': fila['estado_actual'],
+                'estado_display': etiquetas.get(fila['estado_actual']),
+                'fecha_entrega': fila['fecha_entrega'].isoformat() if fila['fecha_entrega'] else None,
+                'items_count': fila['items_count'],
+                'retrasada': fila['items_retrasados'] > 0,
+            }
+            async for fila in filas
+        ]
+
+        return JsonResponse({
+            'ordenes': datos_ordenes,
+            'pagina': pagina,
+            'paginas': max(1, -(-total // ORDENES_POR_PAGINA)),
+            'stats': dict(conteos, total_activas=total),
+        })
+
+    except Exception as e:
+        logger.error(f"Error en API dashboard: {str(e)}")
+        return JsonResponse({'error': 'Error interno'}, status=500)
+
+
+async def api_orden_status(request, orden_id):
+    """API endpoint asíncrono para obtener estado de orden (para actualizaciones en tiempo real)."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    try:
+        try:
+            orden = await Orden.objects.aget(id=orden_id)
+        except Orden.DoesNotExist:
+            return JsonResponse({'error': 'Orden no encontrada'}, status=404)
+
+        items = await orden.items.aaggregate(total=Count('id'), fecha_limite=Max('fecha_limite_etapa'))
+
+        data = {
+            'id': orden.id,
+            'numero_orden_facturacion': orden.numero_orden_facturacion,
+            'estado_actual': orden.estado_actual,
+            'estado_display': orden.get_estado_actual_display(),
+            'items_count': items['total'],
+            'fecha_limite': items['fecha_limite'].isoformat() if items['fecha_limite'] else None,
+        }
+
+        return JsonResponse(data)
+
+    except Exception as e:
+        logger.error(f"Error en API orden status {orden_id}: {str(e)}")
+        return JsonResponse({'error': 'Error interno'}, status=500)
+
+
+async def api_estadisticas_dashboard(request):
+    """API endpoint asíncrono para estadísticas del dashboard (cache de 5 minutos)."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
     try:
-        # Cache de estadísticas por 5 minutos
         stats_cache_key = 'dashboard_stats'
-        stats = cache.get(stats_cache_key)
-        
+        stats = await cache_niveles.aget('estadisticas', stats_cache_key)
+
         if stats is None:
-            ordenes_activas = Orden.objects.filter(
-                estado_actual__in=['INGRESO', 'FOTOGRAFIA', 'REVISION', 'IMPRESION']
+            ahora = timezone.now()
+            conteos = await Orden.objects.filter(estado_actual__in=ETAPAS_ACTIVAS).aaggregate(
+                total=Count('id'),
+                **{etapa: Count('id', filter=Q(estado_actual=etapa)) for etapa in ETAPAS_ACTIVAS}
             )
-            
+            items = await Item.objects.filter(etapa__in=ETAPAS_ACTIVAS).aaggregate(
+                retrasados=Count('id', filter=Q(fecha_limite_etapa__lt=ahora)),
+                ultima_fecha=Max('fecha_limite_etapa'),
+            )
+
+            etiquetas = dict(Orden.ETAPAS)
             stats = {
-                'ordenes_activas': ordenes_activas.count(),
-                'por_etapa': {},
-                'items_retrasados': 0,
-                'fin_cola': None
+                'ordenes_activas': conteos['total'],
+                'por_etapa': {
+                    etapa: {'count': conteos[etapa], 'label': etiquetas[etapa]}
+                    for etapa in ETAPAS_ACTIVAS
+                },
+                'items_retrasados': items['retrasados'],
+                'fin_cola': items['ultima_fecha'].isoformat() if items['ultima_fecha'] and items['ultima_fecha'] > ahora else None,
             }
-            
-            # Contar por etapa
-            for etapa_key, etapa_label in Orden.ETAPAS:
-                if etapa_key != 'FINALIZADA':
-                    count = ordenes_activas.filter(estado_actual=etapa_key).count()
-                    stats['por_etapa'][etapa_key] = {
-                        'count': count,
-                        'label': etapa_label
-                    }
-            
-            # Ítems retrasados
-            items_retrasados = Item.objects.filter(
-                orden__estado_actual__in=['INGRESO', 'FOTOGRAFIA', 'REVISION', 'IMPRESION'],
-                fecha_limite_etapa__lt=timezone.now()
-            ).count()
-            stats['items_retrasados'] = items_retrasados
-            
-            # Fin de cola
-            ultimo_tiempo = OrdenManager.get_ultimo_tiempo_ocupado()
-            if ultimo_tiempo > timezone.now():
-                stats['fin_cola'] = ultimo_tiempo.isoformat()
-            
-            cache.set(stats_cache_key, stats, 300)  # 5 minutos
-        
+
+            await cache_niveles.aset('estadisticas', stats_cache_key, stats, 300)  # 5 minutos
+
         return JsonResponse(stats)
-        
+
     except Exception as e:
         logger.error(f"Error en API estadísticas: {str(e)}")
         return JsonResponse({'error': 'Error interno'}, status=500)
-        context = {'orden': orden}
-        return render(request, 'orden_creada_exito.html', context)
+
+
+async def api_plantillas(request):
+    """API endpoint asíncrono con las plantillas Excel disponibles."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    try:
+        # El escaneo del directorio y el hash de plantillas nuevas bloquean: se hacen en otro hilo
+        plantillas = await asyncio.to_thread(FileManager.listar_plantillas_info)
+        return JsonResponse({'plantillas': plantillas})
+
+    except (FileNotFoundError, PermissionError, OSError) as e:
+        logger.warning(f"Error al cargar plantillas: {str(e)}")
+        return JsonResponse({'error': 'No se pudieron cargar las plantillas Excel'}, status=503)
     except Exception as e:
-        logger.error(f"Error en orden creada éxito {orden_id}: {str(e)}")
-        messages.error(request, "Error al mostrar confirmación")
-        return redirect('dashboard')
+        logger.error(f"Error en API plantillas: {str(e)}")
+        return JsonResponse({'error': 'Error interno'}, status=500)
+
+
+async def api_estadisticas_etapas(request):
+    """
+    API endpoint asíncrono con la duración por etapa (conteo, media, p90) en un
+    rango de días, calculada solo con el resumen diario.
+    Parámetros: desde y hasta (AAAA-MM-DD, por defecto los últimos 30 días).
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    try:
+        hoy = timezone.localdate()
+        try:
+            desde = date.fromisoformat(request.GET['desde']) if request.GET.get('desde') else hoy - timedelta(days=30)
+            hasta = date.fromisoformat(request.GET['hasta']) if request.GET.get('hasta') else hoy
+        except ValueError:
+            return JsonResponse({'error': 'Fechas inválidas (use AAAA-MM-DD)'}, status=400)
+
+        por_etapa = defaultdict(list)
+        por_tipo = defaultdict(list)
+        async for resumen in ResumenDiarioEtapa.objects.filter(fecha__range=(desde, hasta)):
+            por_etapa[resumen.etapa].append(resumen)
+            por_tipo[(resumen.etapa, resumen.tipo_item, resumen.tipo_certificado)].append(resumen)
+
+        return JsonResponse({
+            'desde': desde.isoformat(),
+            'hasta': hasta.isoformat(),
+            'por_etapa': {
+                etapa: combinar_resumenes(por_etapa[etapa]) for etapa in ETAPAS_ACTIVAS if etapa in por_etapa
+            },
+            'por_tipo': [
+                dict(combinar_resumenes(resumenes), etapa=etapa, tipo_item=tipo_item, tipo_certificado=tipo_certificado)
+                for (etapa, tipo_item, tipo_certificado), resumenes in sorted(por_tipo.items())
+            ],
+        })
+
+    except Exception as e:
+        logger.error(f"Error en API estadísticas por etapa: {str(e)}")
+        return JsonResponse({'error': 'Error interno'}, status=500)
 
-# --- VISTAS DE API/AJAX (OPCIONALES) ---
 
-def api_orden_status(request, orden_id):
-    """API endpoint para obtener estado de orden (para actualizaciones en tiempo real)."""
+def api_orden_historica(request, numero_orden):
+    """API endpoint para consultar una orden activa o archivada por número de facturación."""
     if request.method != 'GET':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
     
     try:
-        orden = get_object_or_404(Orden, id=orden_id)
-        ultimo_item = orden.items.last()
+        orden = buscar_orden_historica(numero_orden)
+        if orden is None:
+            return JsonResponse({'error': 'Orden no encontrada'}, status=404)
         
         data = {
-            'id': orden.id,
             'numero_orden_facturacion': orden.numero_orden_facturacion,
+            'archivada': isinstance(orden, OrdenArchivada),
             'estado_actual': orden.estado_actual,
             'estado_display': orden.get_estado_actual_display(),
-            'items_count': orden.items.count(),
-            'fecha_limite': ultimo_item.fecha_limite_etapa.isoformat() if ultimo_item and ultimo_item.fecha_limite_etapa else None,
+            'fecha_creacion': orden.fecha_creacion.isoformat(),
+            'fecha_cierre': orden.fecha_cierre.isoformat() if orden.fecha_cierre else None,
+            'items': [
+                {
+                    'numero_item': item.numero_item,
+                    'tipo_certificado': item.tipo_certificado,
+                    'que_es': item.que_es,
+                    'gema_principal': item.gema_principal,
+                    'texto': item.texto_para_copiar,
+                    'fotos': len(item.fotos.all()),
+                }
+                for item in orden.items.all()
+            ],
         }
         
         return JsonResponse(data)
         
     except Exception as e:
-        logger.error(f"Error en API orden status {orden_id}: {str(e)}")
+        logger.error(f"Error en API orden histórica {numero_orden}: {str(e)}")
         return JsonResponse({'error': 'Error interno'}, status=500)
 
-def api_estadisticas_dashboard(request):
-    """API endpoint para estadísticas del dashboard."""
+
+def api_estadisticas_cache(request):
+    """API endpoint con aciertos y fallos de la cache por espacio de nombres."""
     if request.method != 'GET':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
-    
+
     try:
-        stats = {
-            'ordenes_activas': Orden.objects.filter(
-                estado_actual__in=['INGRESO', 'FOTOGRAFIA', 'REVISION', 'IMPRESION']
-            ).count(),
-            'por_etapa': {},
-            'items_retrasados': 0,
-            'fin_cola': None
-        }
-        
-        # Contar por etapa
-        for etapa_key, etapa_label in Orden.ETAPAS:
-            if etapa_key != 'FINALIZADA':
-                count = Orden.objects.filter(estado_actual=etapa_key).count()
-                stats['por_etapa'][etapa_key] = {
-                    'count': count,
-                    'label': etapa_label
-                }
-        
-        # Ítems retrasados
-        items_retrasados = Item.objects.filter(
-            orden__estado_actual__in=['INGRESO', 'FOTOGRAFIA', 'REVISION', 'IMPRESION'],
-            fecha_limite_etapa__lt=timezone.now()
-        ).count()
-        stats['items_retrasados'] = items_retrasados
-        
-        # Fin de cola
-        ultimo_tiempo = get_ultimo_tiempo_ocupado()
-        if ultimo_tiempo > timezone.now():
-            stats['fin_cola'] = ultimo_tiempo.isoformat()
-        
-        return JsonResponse(stats)
-        
+        return JsonResponse(cache_niveles.estadisticas())
     except Exception as e:
-        logger.error(f"Error en API estadísticas: {str(e)}")
-        return JsonResponse({'error': 'Error interno'}, status=500)
\ No newline at end of file
+        logger.error(f"Error en API estadísticas de cache: {str(e)}")
+        return JsonResponse({'error': 'Error interno'}, status=500)
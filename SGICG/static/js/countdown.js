@@ -1,38 +1,130 @@
+// Cuentas regresivas de las fechas límite (.countdown[data-deadline]).
+// Cada fecha se interpreta una sola vez y el DOM del badge se crea al inicio:
+// en cada segundo solo se cambia el texto de los contadores visibles cuyo
+// valor cambió. Un único temporizador alineado al segundo agenda la
+// actualización en requestAnimationFrame y se detiene con la pestaña oculta.
 document.addEventListener('DOMContentLoaded', function() {
-    const countdownElements = document.querySelectorAll('.countdown');
-
-    function updateCountdown() {
-        countdownElements.forEach(el => {
-            const deadline = el.dataset.deadline;
-            if (!deadline) {
-                el.innerHTML = '<span class="badge bg-secondary">N/A</span>';
-                return;
-            }
+    const MS_SEGUNDO = 1000;
+    const MS_DIA = 24 * 60 * 60 * MS_SEGUNDO;
+
+    const contadores = [];
+    let temporizador = null;
+    let cuadro = null;
 
-            const deadlineDate = new Date(deadline).getTime();
-            const now = new Date().getTime();
-            const distance = deadlineDate - now;
+    function crearBadge(el, clase, texto) {
+        const badge = document.createElement('span');
+        badge.className = `badge ${clase}`;
+        const nodoTexto = document.createTextNode(texto);
+        badge.appendChild(nodoTexto);
+        el.replaceChildren(badge);
+        return { badge, nodoTexto };
+    }
+
+    function formatear(distancia) {
+        const dias = Math.floor(distancia / MS_DIA);
+        const resto = Math.floor((distancia % MS_DIA) / MS_SEGUNDO);
+        const horas = Math.floor(resto / 3600);
+        const minutos = Math.floor((resto % 3600) / 60);
+        const segundos = resto % 60;
+        const reloj = `${String(horas).padStart(2, '0')}:${String(minutos).padStart(2, '0')}:${String(segundos).padStart(2, '0')}`;
+        return dias > 0 ? `${dias}d ${reloj}` : reloj;
+    }
+
+    function actualizar(contador, ahora) {
+        const distancia = contador.limite - ahora;
+        if (distancia < 0) {
+            // Retrasado es definitivo: el contador deja de actualizarse
+            contador.badge.className = 'badge bg-danger';
+            contador.nodoTexto.nodeValue = 'Retrasado';
+            contador.activo = false;
+            return;
+        }
+        const texto = formatear(distancia);
+        if (texto !== contador.texto) {
+            contador.texto = texto;
+            contador.nodoTexto.nodeValue = texto;
+        }
+    }
+
+    function pintar() {
+        cuadro = null;
+        const ahora = Date.now();
+        let activos = 0;
+        for (const contador of contadores) {
+            if (contador.activo && contador.visible) {
+                actualizar(contador, ahora);
+            }
+            if (contador.activo) {
+                activos++;
+            }
+        }
+        if (activos === 0) {
+            detener();
+        }
+    }
 
-            if (distance < 0) {
-                el.innerHTML = '<span class="badge bg-danger">Retrasado</span>';
-                return;
+    function programar() {
+        clearTimeout(temporizador);
+        // Alineado al cambio de segundo del reloj para que todos cambien a la vez
+        temporizador = setTimeout(function() {
+            if (cuadro === null) {
+                cuadro = requestAnimationFrame(pintar);
             }
+            programar();
+        }, MS_SEGUNDO - (Date.now() % MS_SEGUNDO));
+    }
+
+    function detener() {
+        clearTimeout(temporizador);
+        temporizador = null;
+        if (cuadro !== null) {
+            cancelAnimationFrame(cuadro);
+            cuadro = null;
+        }
+    }
 
-            const days = Math.floor(distance / (1000 * 60 * 60 * 24));
-            const hours = Math.floor((distance % (1000 * 60 * 60 * 24)) / (1000 * 60 * 60));
-            const minutes = Math.floor((distance % (1000 * 60 * 60)) / (1000 * 60));
-            const seconds = Math.floor((distance % (1000 * 60)) / 1000);
+    document.querySelectorAll('.countdown').forEach(el => {
+        const limite = Date.parse(el.dataset.deadline || '');
+        if (Number.isNaN(limite)) {
+            crearBadge(el, 'bg-secondary', 'N/A');
+            return;
+        }
+        const { badge, nodoTexto } = crearBadge(el, 'bg-success', '');
+        const contador = { el, limite, badge, nodoTexto, texto: '', activo: true, visible: true };
+        actualizar(contador, Date.now());
+        contadores.push(contador);
+    });
 
-            let output = '';
-            if (days > 0) output += `${days}d `;
-            output += `${String(hours).padStart(2, '0')}:${String(minutes).padStart(2, '0')}:${String(seconds).padStart(2, '0')}`;
-            
-            el.innerHTML = `<span class="badge bg-success">${output}</span>`;
+    if (contadores.length === 0) {
+        return;
+    }
+
+    // Las filas fuera de pantalla no se actualizan; al volver a verse se ponen al día
+    if ('IntersectionObserver' in window) {
+        const porElemento = new Map(contadores.map(contador => [contador.el, contador]));
+        const observador = new IntersectionObserver(entradas => {
+            const ahora = Date.now();
+            for (const entrada of entradas) {
+                const contador = porElemento.get(entrada.target);
+                contador.visible = entrada.isIntersecting;
+                if (contador.visible && contador.activo) {
+                    actualizar(contador, ahora);
+                }
+            }
         });
+        contadores.forEach(contador => observador.observe(contador.el));
     }
 
-    if (countdownElements.length > 0) {
-        updateCountdown();
-        setInterval(updateCountdown, 1000);
+    document.addEventListener('visibilitychange', function() {
+        if (document.hidden) {
+            detener();
+        } else {
+            pintar();
+            programar();
+        }
+    });
+
+    if (!document.hidden) {
+        programar();
     }
-});
\ No newline at end of file
+});